@@ -1,8 +1,7 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
-import io
 import json
 import uuid
 import os
@@ -12,8 +11,31 @@ from datetime import datetime
 from functools import wraps
 import logging
 from werkzeug.exceptions import RequestEntityTooLarge
-from sklearn.preprocessing import StandardScaler, MinMaxScaler, LabelEncoder
-from sklearn.impute import SimpleImputer, KNNImputer
+from sklearn.preprocessing import StandardScaler, MinMaxScaler
+from sklearn.impute import SimpleImputer
+from utils.summary_engine import SummaryCache
+from utils.row_index import DUPLICATE_KEEP
+from utils.sampler import RowSampler
+from utils.correlation_engine import CorrelationEngine, CorrelationCache
+from utils.data_profiler import ProfileCache
+from utils.data_analyzer import DataAnalyzer
+from utils.knn_imputer import KNNImputation
+from utils.encoding import LabelMapping, LabelEncodings, CategoricalEncoder, ENCODING_METHODS, MISSING_CODE
+from utils.outlier_engine import OutlierEngine, OUTLIER_METHODS, OUTLIER_MODES, FLAG_COLUMN
+from utils.ingestion import fillna_preserving_categories, iter_file_chunks, read_csv_chunked, read_excel_chunked
+from utils.data_validator import ChunkValidator
+from utils.sketches import DatasetSketch
+from utils.exporter import DatasetExporter
+from utils.serializer import json_response, frame_json, FRAME_SHAPES
+from utils.recipe import Recipe
+from utils.operation_plan import OperationPlan
+from utils.job_executor import JobExecutor, JobCancelledError, JobQueueFullError, checkpoint, current_job
+from utils.progress import ProgressChannel, sse_response, stream_snapshots
+from models.version_chain import VersionChain
+from models.dataset_store import DatasetStore
+from models.shared_store import SharedFrameStore
+from models.upload_cache import UploadCache
+from config.config import Config
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -34,12 +56,33 @@ CORS(app, origins=["http://localhost:3000", "http://127.0.0.1:3000"])
 # Configuration
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
 
-# Thread-safe storage
-datasets = {}
-processing_status = {}
-dataset_lock = threading.Lock()
-# Add cache for random samples to prevent regeneration
-random_sample_cache = {}
+# Bounded background executor; operations of one dataset run one at a time
+job_executor = JobExecutor(
+    max_workers=Config.JOB_WORKERS,
+    max_pending=Config.JOB_QUEUE_LIMIT,
+    result_ttl=Config.JOB_RESULT_TTL
+)
+
+# Parsed uploads shared by the datasets of identical files, freed with the last of them
+upload_cache = UploadCache() if Config.UPLOAD_CACHE else None
+
+def forget_dataset(dataset_id):
+    """Drop per-dataset state once a dataset leaves the store"""
+    job_executor.cancel_dataset(dataset_id)
+    if upload_cache is not None:
+        upload_cache.release(dataset_id)
+
+# Datasets beyond the memory budget are spilled to disk; expired ones are removed.
+# With a shared folder, every worker process serves every dataset from memory-mapped frames
+datasets = DatasetStore(
+    Config.DATASET_MEMORY_BUDGET,
+    Config.SPILL_FOLDER,
+    expiry=Config.DATASET_EXPIRY,
+    cleanup_interval=Config.CLEANUP_INTERVAL,
+    on_remove=forget_dataset,
+    shared=SharedFrameStore(Config.SHARED_STORE_FOLDER) if Config.SHARED_STORE_FOLDER else None,
+    loader=lambda *args: EnhancedDataPreprocessor.from_shared(*args)
+)
 
 class ProcessingStatus:
     def __init__(self):
@@ -64,7 +107,7 @@ def standardize_response(success=True, data=None, message="", error=None, status
     else:
         response["error"] = error or message
         
-    return jsonify(response), status_code
+    return json_response(response, status_code)
 
 def handle_errors(f):
     """Decorator for consistent error handling"""
@@ -78,6 +121,11 @@ def handle_errors(f):
         except FileNotFoundError as e:
             logger.error(f"File not found in {f.__name__}: {str(e)}")
             return standardize_response(False, error="Dataset not found", status_code=404)
+        except JobQueueFullError as e:
+            logger.warning(f"Job queue full in {f.__name__}: {str(e)}")
+            return standardize_response(False, error=str(e), status_code=503)
+        except JobCancelledError:
+            return standardize_response(False, error="Operation was cancelled", status_code=409)
         except Exception as e:
             logger.error(f"Unexpected error in {f.__name__}: {str(e)}")
             return standardize_response(False, error="Internal server error", status_code=500)
@@ -89,6 +137,56 @@ def validate_dataset_exists(dataset_id):
         raise FileNotFoundError(f"Dataset {dataset_id} not found")
     return datasets[dataset_id]
 
+def run_async_operation(operation, dataset_id, label):
+    """Queue operation(preprocessor) as a background job of the dataset.
+    
+    The job result holds the operation results and the refreshed summary. A
+    cancelled job discards the uncommitted changes of its operation.
+    """
+    def task():
+        # Writers of the dataset in other worker processes wait; the copy read here is current
+        with datasets.locked(dataset_id):
+            preprocessor = validate_dataset_exists(dataset_id)
+            with preprocessor.lock:
+                try:
+                    results = operation(preprocessor)
+                except JobCancelledError:
+                    preprocessor.versions.rollback()
+                    preprocessor.summary_cache.invalidate_all()
+                    preprocessor.update_status("idle", 0, f"{label} cancelled")
+                    raise
+                datasets.sync(dataset_id)
+                return operation_outcome(preprocessor, results)
+    
+    return job_executor.submit(dataset_id, label, task)
+
+def operation_outcome(preprocessor, results):
+    """Job result of an operation: its results and the refreshed summary"""
+    if preprocessor.plan.pending:
+        # Lazy datasets are summarized once the plan runs, not after each planned step
+        return {'results': results, 'pending_operations': preprocessor.plan.pending}
+    return {
+        'results': results,
+        'summary': preprocessor.get_comprehensive_summary()
+    }
+
+def job_started_response(job, message):
+    """Response for an operation that continues in the background"""
+    return standardize_response(True, {
+        'processing': True,
+        'job_id': job.job_id,
+        'job': job.to_dict(include_result=False),
+        'message': 'Processing started. Check the job endpoint for progress.'
+    }, message)
+
+def recipe_response(recipe, basename):
+    """Stream the uploaded file transformed by the recipe, one chunk at a time"""
+    file = request.files.get('file')
+    if file is None or file.filename == '':
+        raise ValueError('No file provided')
+    chunks = iter_file_chunks(file.stream, file.filename)
+    return DatasetExporter.frames_response(recipe.apply(chunks), request.args.get('format', 'csv'), basename)
+
 def safe_convert_to_json(obj):
     """Safely convert numpy/pandas objects to JSON serializable format"""
     if isinstance(obj, (np.integer, np.floating)):
@@ -105,51 +203,131 @@ def safe_convert_to_json(obj):
         return obj
 
 class EnhancedDataPreprocessor:
-    def __init__(self, df, dataset_id):
-        self.df = df.copy()
-        self.original_df = df.copy()
+    def __init__(self, df, dataset_id, sketch=None, lazy=None):
+        # Working and original frames share column buffers until an operation rewrites them
+        self.versions = VersionChain(df, Config.MAX_DATASET_VERSIONS)
         self.dataset_id = dataset_id
         self.operations_log = []
         self.processing_status = ProcessingStatus()
-        # Cache for random samples
-        self.cached_random_sample = None
-        self.random_sample_timestamp = None
-        
-    def get_random_sample(self, n=5, force_refresh=False):
-        """Get cached random sample or generate new one"""
-        current_time = datetime.now()
-        
-        # Check if we need to refresh the cache (force refresh or cache is older than 30 seconds)
-        if (force_refresh or 
-            self.cached_random_sample is None or 
-            self.random_sample_timestamp is None or
-            (current_time - self.random_sample_timestamp).seconds > 30):
-            
-            # Generate new random sample
-            sample_size = min(n, len(self.df))
-            if sample_size > 0:
-                # Use timestamp as seed for different results each time cache refreshes
-                random_seed = int(current_time.timestamp() * 1000000) % 2**32
-                self.cached_random_sample = self.df.sample(n=sample_size, random_state=random_seed)
-                self.random_sample_timestamp = current_time
-                logger.info(f"Generated new random sample for dataset {self.dataset_id}")
-            else:
-                self.cached_random_sample = self.df.head(0)
+        self.progress_channel = ProgressChannel()
+        # Held while an operation runs, so the store does not spill the dataset mid-operation
+        self.lock = threading.RLock()
+        self.last_access = datetime.now()
+        # Per-column summary pieces, invalidated by the operations that touch them
+        self.summary_cache = SummaryCache()
+        if sketch is not None:
+            # Ingestion sketches answer summaries of large datasets until columns are rewritten
+            self.summary_cache.attach_sketches(sketch, df)
+        # Correlation matrices of the current version
+        self.correlation_cache = CorrelationCache()
+        # Column profile behind the quality report, of the current version
+        self.profile_cache = ProfileCache()
+        # Class mappings of label-encoded columns, for new data and decoded exports
+        self.label_encodings = LabelEncodings()
+        # Seeded row permutations behind random previews and samples
+        self.sampler = RowSampler()
+        # Operations recorded while lazy, run when the data is next read
+        self.plan = OperationPlan(Config.LAZY_OPERATIONS if lazy is None else lazy)
         
-        return self.cached_random_sample
+    @property
+    def df(self):
+        """Working frame of the dataset"""
+        return self.versions.working
+    
+    @df.setter
+    def df(self, value):
+        self.versions.working = value
+    
+    @property
+    def original_df(self):
+        """Frame as uploaded"""
+        return self.versions.original
+        
+    def update_access_time(self):
+        """Update the last access time"""
+        self.last_access = datetime.now()
+    
+    def shared_state(self):
+        """What other worker processes need besides the frames: operations, label classes and the lazy plan"""
+        return {
+            'operations_log': self.operations_log,
+            'label_classes': {col: mapping.classes.tolist()
+                              for col, mapping in self.label_encodings.mappings(self.df).items()},
+            'lazy': self.plan.lazy,
+            'plan': [step.to_dict() for step in self.plan.steps]
+        }
+    
+    @classmethod
+    def from_shared(cls, dataset_id, original, working, state):
+        """Preprocessor over frames published by another worker.
+
+        Its history is original -> working, one version applying every logged
+        operation, so undo returns to the original with an empty log.
+        """
+        preprocessor = cls(original, dataset_id, lazy=state['lazy'])
+        preprocessor.operations_log = state['operations_log']
+        if preprocessor.operations_log:
+            preprocessor.versions.working = working
+            preprocessor.versions.commit(preprocessor.operations_log[-1]['operation'],
+                                         operations=len(preprocessor.operations_log))
+        for col, classes in state['label_classes'].items():
+            preprocessor.label_encodings.record(col, LabelMapping(classes), working[col])
+        for step in state['plan']:
+            preprocessor.plan.record(**step)
+        return preprocessor
+    
+    def materialize(self, columns=None):
+        """Working frame with the pending operation plan applied.
+        
+        With columns, only those columns are computed, on a scratch copy, and
+        the plan stays pending.
+        """
+        with self.lock:
+            if self.plan.pending:
+                if columns is not None:
+                    return self.plan.project(self.df, columns, self._scratch)
+                self.plan.execute(self)
+            return self.df if columns is None else self.df[self.validate_columns(columns)]
+    
+    def _scratch(self, df):
+        """Eager preprocessor over df, for computing columns of the plan without committing them"""
+        return EnhancedDataPreprocessor(df, self.dataset_id, lazy=False)
+    
+    def set_lazy(self, lazy):
+        """Switch lazy mode; leaving it runs the pending plan and returns the executed steps"""
+        with self.lock:
+            self.plan.lazy = lazy
+            return [] if lazy else self.plan.execute(self)
+        
+    def get_random_sample(self, n=5, page=1, seed=None):
+        """Page of the dataset's random row order; the same seed always gives the same pages"""
+        return self.sampler.page(self.df, page, n, seed)
+    
+    def get_stratified_sample(self, n, column, seed=None):
+        """Random sample of n rows stratified by column, with the rows drawn per value"""
+        return self.sampler.stratified(self.df, n, column, seed)
         
     def update_status(self, status, progress=None, message=""):
         """Update processing status"""
-        with dataset_lock:
-            self.processing_status.status = status
-            if progress is not None:
-                self.processing_status.progress = progress
-            self.processing_status.message = message
-            processing_status[self.dataset_id] = {
-                "status": status,
-                "progress": progress or self.processing_status.progress,
-                "message": message
-            }
+        if status == "processing":
+            # Lets a background job stop between steps once it was cancelled
+            checkpoint(progress, message)
+        self.processing_status.status = status
+        if progress is not None:
+            self.processing_status.progress = progress
+        self.processing_status.message = message
+        # Lock-free and coalesced; status requests and event streams read the channel
+        job = current_job()
+        self.progress_channel.publish(status, self.processing_status.progress, message,
+                                      job_id=job.job_id if job else None)
+    
+    def get_comprehensive_summary(self, exact=None):
+        """Get comprehensive data summary; exact=True never uses approximate statistics"""
+        try:
+            return self.summary_cache.build(self.materialize(), exact)
+        except Exception as e:
+            logger.error(f"Error generating summary: {str(e)}")
+            raise
     
     def validate_columns(self, columns, required_type=None):
         """Validate column names and types"""
@@ -175,14 +353,35 @@ class EnhancedDataPreprocessor:
         
         return columns
     
-    def handle_missing_values(self, strategy='mean', columns=None):
-        """Handle missing values with progress tracking"""
+    def handle_missing_values(self, strategy='mean', columns=None, features=None, n_neighbors=None, max_donors=None):
+        """Handle missing values with progress tracking.
+        
+        strategy='knn' fills numerical columns from their nearest rows over the
+        numerical feature columns (default: all), averaging n_neighbors donors
+        out of at most max_donors sampled rows.
+        """
+        if self.plan.recording:
+            return self.plan.record('handle_missing_values', strategy=strategy, columns=columns, features=features,
+                                    n_neighbors=n_neighbors, max_donors=max_donors)
         self.update_status("processing", 0, "Starting missing value imputation...")
         
         columns = self.validate_columns(columns)
         results = {}
         total_columns = len(columns)
         
+        knn_filled, knn_results = {}, {}
+        if strategy == 'knn':
+            if features is not None:
+                features = self.validate_columns(features, 'numeric')
+            knn_filled, knn_results = KNNImputation.impute(
+                self.df,
+                [col for col in columns if pd.api.types.is_numeric_dtype(self.df[col]) and self.df[col].isnull().any()],
+                features, n_neighbors, max_donors,
+                progress=lambda done, total: self.update_status(
+                    "processing", int(done / total * 100), f"Imputed {done} of {total} missing values"
+                )
+            )
+        
         for i, col in enumerate(columns):
             progress = int((i / total_columns) * 100)
             self.update_status("processing", progress, f"Processing column: {col}")
@@ -193,6 +392,12 @@ class EnhancedDataPreprocessor:
                 results[col] = {'status': 'no_missing', 'filled': 0}
                 continue
             
+            if col in knn_results:
+                if col in knn_filled:
+                    self.df[col] = knn_filled[col]
+                results[col] = knn_results[col]
+                continue
+            
             try:
                 if pd.api.types.is_numeric_dtype(self.df[col]):
                     # Numerical data
@@ -205,16 +410,11 @@ class EnhancedDataPreprocessor:
                         fill_value = mode_series.iloc[0] if not mode_series.empty else 0
                     elif strategy == 'constant':
                         fill_value = 0
-                    elif strategy == 'knn':
-                        # KNN imputation
-                        imputer = KNNImputer(n_neighbors=min(5, len(self.df) - 1))
-                        self.df[col] = imputer.fit_transform(self.df[[col]]).flatten()
-                        fill_value = None
                     else:
                         fill_value = self.df[col].mean()
                     
                     if fill_value is not None:
-                        self.df[col].fillna(fill_value, inplace=True)
+                        self.df[col] = self.df[col].fillna(fill_value)
                 else:
                     # Categorical data
                     if strategy == 'mode':
@@ -224,11 +424,11 @@ class EnhancedDataPreprocessor:
                         fill_value = 'Unknown'
                     else:
                         # Forward fill for categorical
-                        self.df[col].fillna(method='ffill', inplace=True)
+                        self.df[col] = self.df[col].ffill()
                         fill_value = 'Unknown'
                     
                     if fill_value is not None:
-                        self.df[col].fillna(fill_value, inplace=True)
+                        self.df[col] = fillna_preserving_categories(self.df[col], fill_value)
                 
                 missing_count_after = self.df[col].isnull().sum()
                 filled_count = missing_count_before - missing_count_after
@@ -247,9 +447,7 @@ class EnhancedDataPreprocessor:
                     'error': str(e)
                 }
         
-        # Clear random sample cache when data changes
-        self.cached_random_sample = None
-        self.random_sample_timestamp = None
+        self.summary_cache.invalidate([col for col, result in results.items() if result['status'] != 'no_missing'])
         
         self.update_status("completed", 100, "Missing value imputation completed")
         
@@ -261,12 +459,21 @@ class EnhancedDataPreprocessor:
             'results': results,
             'timestamp': datetime.now().isoformat()
         }
+        if strategy == 'knn':
+            operation_log.update(features=features, n_neighbors=n_neighbors, max_donors=max_donors)
         self.operations_log.append(operation_log)
+        self.versions.commit(operation_log['operation'])
         
         return results
     
-    def encode_categorical(self, method='label', columns=None):
-        """Encode categorical variables with progress tracking"""
+    def encode_categorical(self, method='label', columns=None, n_buckets=None):
+        """Encode categorical variables with progress tracking.
+        
+        label rewrites columns in place; onehot, hashing (n_buckets indicator
+        columns) and binary replace them with new columns, added in one concat.
+        """
+        if self.plan.recording:
+            return self.plan.record('encode_categorical', method=method, columns=columns, n_buckets=n_buckets)
         self.update_status("processing", 0, "Starting categorical encoding...")
         
         if columns is None:
@@ -274,27 +481,33 @@ class EnhancedDataPreprocessor:
         else:
             columns = self.validate_columns(columns, 'categorical')
         
+        if method not in ENCODING_METHODS:
+            raise ValueError(f"Invalid method. Must be one of: {list(ENCODING_METHODS)}")
+        n_buckets = n_buckets or Config.HASHING_BUCKETS
+        
         results = {}
         total_columns = len(columns)
+        touched_columns = list(columns)
+        new_blocks = []
         
         for i, col in enumerate(columns):
             progress = int((i / total_columns) * 100)
             self.update_status("processing", progress, f"Encoding column: {col}")
             
             try:
-                unique_values = self.df[col].nunique()
-                
                 if method == 'label':
-                    le = LabelEncoder()
-                    # Handle NaN values
-                    mask = self.df[col].notna()
-                    if mask.sum() > 0:
-                        self.df.loc[mask, col] = le.fit_transform(self.df.loc[mask, col])
+                    # Compact integer codes; missing values get MISSING_CODE
+                    mapping, codes = LabelMapping.fit_transform(self.df[col])
+                    if len(mapping.classes) > 0:
+                        self.df[col] = pd.Series(codes, index=self.df.index)
+                        self.label_encodings.record(col, mapping, self.df[col])
                         results[col] = {
                             'status': 'success',
                             'method': 'label',
-                            'unique_values': unique_values,
-                            'classes': le.classes_.tolist()
+                            'unique_values': len(mapping.classes),
+                            'classes': mapping.classes.tolist(),
+                            'dtype': mapping.dtype.name,
+                            'missing_code': MISSING_CODE
                         }
                     else:
                         results[col] = {
@@ -303,24 +516,51 @@ class EnhancedDataPreprocessor:
                         }
                         
                 elif method == 'onehot':
-                    # One-hot encoding
-                    if unique_values <= 20:  # Reasonable limit for one-hot
-                        dummies = pd.get_dummies(self.df[col], prefix=col, dummy_na=True)
-                        self.df = pd.concat([self.df.drop(col, axis=1), dummies], axis=1)
+                    # Sparse indicators, added with every other new column in one concat
+                    unique_values = self.df[col].nunique()
+                    if unique_values <= Config.ONEHOT_MAX_CATEGORIES:
+                        block = CategoricalEncoder.onehot(self.df[col])
+                        new_blocks.append(block)
                         results[col] = {
                             'status': 'success',
                             'method': 'onehot',
                             'unique_values': unique_values,
-                            'new_columns': dummies.columns.tolist()
+                            'new_columns': block.columns.tolist(),
+                            'sparse': True
                         }
                     else:
                         results[col] = {
                             'status': 'skipped',
                             'reason': 'too_many_categories',
                             'unique_values': unique_values,
-                            'recommendation': 'Use label encoding or reduce categories'
+                            'recommendation': 'Use hashing or binary encoding'
                         }
-                        
+                
+                elif method == 'hashing':
+                    block, buckets_used = CategoricalEncoder.hashing(self.df[col], n_buckets)
+                    new_blocks.append(block)
+                    results[col] = {
+                        'status': 'success',
+                        'method': 'hashing',
+                        'unique_values': int(self.df[col].nunique()),
+                        'n_buckets': n_buckets,
+                        'buckets_used': buckets_used,
+                        'new_columns': block.columns.tolist(),
+                        'sparse': True
+                    }
+                
+                elif method == 'binary':
+                    block, mapping = CategoricalEncoder.binary(self.df[col])
+                    new_blocks.append(block)
+                    results[col] = {
+                        'status': 'success',
+                        'method': 'binary',
+                        'unique_values': len(mapping.classes),
+                        # Bits of code + 1 encode classes[code]; all zeros is missing
+                        'classes': mapping.classes.tolist(),
+                        'new_columns': block.columns.tolist()
+                    }
+                
             except Exception as e:
                 logger.error(f"Error encoding column {col}: {str(e)}")
                 results[col] = {
@@ -328,9 +568,13 @@ class EnhancedDataPreprocessor:
                     'error': str(e)
                 }
         
-        # Clear random sample cache when data changes
-        self.cached_random_sample = None
-        self.random_sample_timestamp = None
+        if new_blocks:
+            encoded = [col for col in columns if results.get(col, {}).get('status') == 'success']
+            self.df = pd.concat([self.df.drop(columns=encoded), *new_blocks], axis=1)
+            for block in new_blocks:
+                touched_columns.extend(block.columns)
+        # Only label codes map values 1:1; other methods drop the source column and hashing merges values
+        self.summary_cache.invalidate(touched_columns, preserves_duplicates=(method == 'label'))
         
         self.update_status("completed", 100, "Categorical encoding completed")
         
@@ -339,104 +583,100 @@ class EnhancedDataPreprocessor:
             'operation': 'encode_categorical',
             'method': method,
             'columns': columns,
+            'n_buckets': n_buckets if method == 'hashing' else None,
             'results': results,
             'timestamp': datetime.now().isoformat()
         }
         self.operations_log.append(operation_log)
+        self.versions.commit(operation_log['operation'])
         
         return results
     
-    def remove_outliers(self, method='iqr', columns=None, threshold=1.5):
-        """Remove outliers with progress tracking"""
-        self.update_status("processing", 0, "Starting outlier removal...")
-        
+    def remove_outliers(self, method='iqr', columns=None, threshold=1.5, mode='remove'):
+        """Remove or flag outliers with progress tracking.
+
+        Every column's bounds come from the same rows and the column masks are
+        combined, so rows are filtered once; mode='flag' keeps all rows and writes
+        the combined mask to the 'is_outlier' column instead.
+        """
+        if self.plan.recording:
+            return self.plan.record('remove_outliers', method=method, columns=columns, threshold=threshold, mode=mode)
+        self.update_status("processing", 0, "Starting outlier detection...")
+
         if columns is None:
             columns = self.df.select_dtypes(include=[np.number]).columns.tolist()
         else:
             columns = self.validate_columns(columns, 'numeric')
-        
-        results = {}
-        initial_rows = len(self.df)
+
         total_columns = len(columns)
-        
-        for i, col in enumerate(columns):
-            progress = int((i / total_columns) * 100)
-            self.update_status("processing", progress, f"Processing column: {col}")
-            
-            try:
-                if method == 'iqr':
-                    Q1 = self.df[col].quantile(0.25)
-                    Q3 = self.df[col].quantile(0.75)
-                    IQR = Q3 - Q1
-                    lower_bound = Q1 - threshold * IQR
-                    upper_bound = Q3 + threshold * IQR
-                    
-                    outliers_mask = (self.df[col] < lower_bound) | (self.df[col] > upper_bound)
-                    outliers_count = outliers_mask.sum()
-                    
-                    self.df = self.df[~outliers_mask]
-                    
-                elif method == 'zscore':
-                    z_scores = np.abs((self.df[col] - self.df[col].mean()) / self.df[col].std())
-                    outliers_mask = z_scores > threshold
-                    outliers_count = outliers_mask.sum()
-                    
-                    self.df = self.df[~outliers_mask]
-                
-                results[col] = {
-                    'status': 'success',
-                    'method': method,
-                    'outliers_removed': int(outliers_count),
-                    'threshold': threshold
-                }
-                
-            except Exception as e:
-                logger.error(f"Error removing outliers from column {col}: {str(e)}")
-                results[col] = {
-                    'status': 'error',
-                    'error': str(e)
-                }
-        
-        final_rows = len(self.df)
-        total_removed = initial_rows - final_rows
-        
-        # Clear random sample cache when data changes
-        self.cached_random_sample = None
-        self.random_sample_timestamp = None
-        
-        self.update_status("completed", 100, f"Outlier removal completed. Removed {total_removed} rows")
-        
+        mask, results = OutlierEngine.detect(
+            self.df, columns, method, threshold, mode,
+            progress=lambda done: self.update_status(
+                "processing", int(done / total_columns * 100), f"Checked {done} of {total_columns} columns"
+            )
+        )
+        flagged = int(mask.sum())
+
+        if mode == 'flag':
+            self.df[FLAG_COLUMN] = mask
+            total_removed = 0
+            self.summary_cache.invalidate([FLAG_COLUMN], preserves_duplicates=True)
+            self.update_status("completed", 100, f"Outlier detection completed. Flagged {flagged} rows")
+        else:
+            total_removed = flagged
+            if total_removed:
+                self.df = self.df[~mask]
+                self.summary_cache.invalidate_rows()
+            self.update_status("completed", 100, f"Outlier removal completed. Removed {total_removed} rows")
+
         # Log operation
         operation_log = {
             'operation': 'remove_outliers',
             'method': method,
+            'mode': mode,
             'columns': columns,
             'threshold': threshold,
             'total_rows_removed': total_removed,
+            'total_rows_flagged': flagged,
             'results': results,
             'timestamp': datetime.now().isoformat()
         }
         self.operations_log.append(operation_log)
-        
-        return {'total_removed': total_removed, 'column_results': results}
+        self.versions.commit(operation_log['operation'])
+
+        response = {'total_removed': total_removed, 'column_results': results, 'mode': mode}
+        if mode == 'flag':
+            response['total_flagged'] = flagged
+        return response
     
-    def remove_duplicates(self):
-        """Remove duplicate rows with progress tracking"""
+    def remove_duplicates(self, subset=None, keep='first'):
+        """Remove duplicate rows with progress tracking.
+        
+        Duplicates are found from the row-hash index; subset compares only the
+        given columns and keep is 'first', 'last' or False (drop every copy).
+        """
+        if self.plan.recording:
+            return self.plan.record('remove_duplicates', subset=subset, keep=keep)
         self.update_status("processing", 50, "Removing duplicate rows...")
         
+        if subset is not None:
+            subset = self.validate_columns(subset)
         initial_rows = len(self.df)
-        self.df.drop_duplicates(inplace=True)
+        duplicates = self.summary_cache.row_index.duplicated(self.df, subset, keep)
+        removed_count = int(duplicates.sum())
+        if removed_count:
+            self.df = self.df[~duplicates]
         final_rows = len(self.df)
-        removed_count = initial_rows - final_rows
         
-        # Clear random sample cache when data changes
-        self.cached_random_sample = None
-        self.random_sample_timestamp = None
+        if removed_count:
+            self.summary_cache.invalidate_rows()
         
         result = {
             'initial_rows': initial_rows,
             'final_rows': final_rows,
-            'removed_count': removed_count
+            'removed_count': removed_count,
+            'subset': subset,
+            'keep': keep
         }
         
         self.update_status("completed", 100, f"Removed {removed_count} duplicate rows")
@@ -448,184 +688,494 @@ class EnhancedDataPreprocessor:
             'timestamp': datetime.now().isoformat()
         }
         self.operations_log.append(operation_log)
+        self.versions.commit(operation_log['operation'])
         
         return result
+    
+    def reset(self):
+        """Reset dataset to original state"""
+        self.versions.reset()
+        self.plan.clear()
+        self.operations_log = []
+        self.summary_cache.invalidate_all()
+        self.update_status("idle", 0, "Dataset reset to original state")
+    
+    def undo(self):
+        """Undo the last operation by restoring the previous version, or drop the last planned one"""
+        if self.plan.pending:
+            undone = self.plan.pop()
+            self.update_status("idle", 0, f"Dropped planned operation: {undone}")
+            return {
+                'undone_operation': undone,
+                'remaining_operations': len(self.operations_log),
+                'pending_operations': self.plan.pending,
+                'can_undo': self.plan.pending > 0 or self.versions.can_undo()
+            }
+        # A version can stand for several logged operations (see VersionChain.commit)
+        undone_count = self.versions.head_operations
+        undone = self.versions.undo()
+        del self.operations_log[max(0, len(self.operations_log) - undone_count):]
+        self.summary_cache.invalidate_all()
+        self.update_status("idle", 0, f"Undid operation: {undone}")
+        
+        return {
+            'undone_operation': undone,
+            'remaining_operations': len(self.operations_log),
+            'can_undo': self.versions.can_undo()
+        }
+
+@app.route('/api/dataset/upload', methods=['POST'])
+@handle_errors
+def upload_dataset():
+    """Parse an uploaded CSV or Excel file into a new dataset.
+    
+    Form fields: file; sheets and range for workbooks (see read_excel_chunked);
+    lazy=true to record operations until the data is read. An identical
+    earlier upload still in use is reused without parsing.
+    """
+    file = request.files.get('file')
+    if file is None or file.filename == '':
+        raise ValueError('No file provided')
+    extension = file.filename.lower().rsplit('.', 1)[-1]
+    if extension not in ('csv', 'xlsx', 'xls'):
+        raise ValueError('Invalid file format. Please upload CSV, XLSX, or XLS files.')
+    sheets, cell_range = request.form.get('sheets'), request.form.get('range')
+    lazy = request.form.get('lazy')
+    lazy = None if lazy is None else lazy.lower() == 'true'
+    dataset_id = str(uuid.uuid4())
+    
+    cache_key = cached = None
+    if upload_cache is not None:
+        # Identical bytes parsed with the same options give the same frame
+        cache_key = UploadCache.content_key(file.stream, extension, sheets, cell_range)
+        cached = upload_cache.acquire(cache_key, dataset_id)
+    
+    try:
+        if cached is not None:
+            # A shallow copy: the dataset replaces columns of its own frame, never the cached buffers
+            preprocessor = EnhancedDataPreprocessor(cached.frame.copy(deep=False), dataset_id, lazy=lazy)
+            preprocessor.summary_cache = cached.summary_cache.copy()
+            summary, warnings = cached.summary, cached.warnings
+        else:
+            # Stream the upload in chunks, validating and compacting each chunk as it is parsed
+            validator = ChunkValidator(large_rows=Config.MAX_ROWS, many_columns=Config.MAX_COLUMNS)
+            sketch = DatasetSketch()
+            if extension == 'csv':
+                df = read_csv_chunked(file.stream, validator=validator, max_rows=Config.MAX_ROWS,
+                                      max_columns=Config.MAX_COLUMNS, sketch=sketch)
+            else:
+                df = read_excel_chunked(file.stream, file.filename, sheets=sheets, cell_range=cell_range,
+                                        validator=validator, max_rows=Config.MAX_ROWS,
+                                        max_columns=Config.MAX_COLUMNS, sketch=sketch)
+            errors, warnings = validator.finish()
+            if errors:
+                raise ValueError('; '.join(errors))
+            if df.empty:
+                raise ValueError('File is empty')
+            preprocessor = EnhancedDataPreprocessor(df, dataset_id, sketch=sketch, lazy=lazy)
+            summary = preprocessor.get_comprehensive_summary()
+            if cache_key is not None:
+                upload_cache.add(cache_key, dataset_id, df, summary, preprocessor.summary_cache.copy(), warnings)
+        datasets[dataset_id] = preprocessor
+    except Exception:
+        if upload_cache is not None:
+            upload_cache.release(dataset_id)
+        raise
+    
+    logger.info(f"Dataset {dataset_id} uploaded{' from cache' if cached is not None else ''}: {file.filename}")
+    
+    return standardize_response(True, {
+        'dataset_id': dataset_id,
+        'filename': file.filename,
+        'summary': summary,
+        'sample_data': frame_json(preprocessor.df.head(10)),
+        'warnings': warnings,
+        'cached': cached is not None
+    }, f'File "{file.filename}" uploaded successfully')
+
+@app.route('/api/dataset/<dataset_id>/missing-values', methods=['POST'])
+@handle_errors
+def handle_missing_values(dataset_id):
+    """Impute missing values"""
+    validate_dataset_exists(dataset_id)
+    
+    data = request.get_json() or {}
+    strategy = data.get('strategy', 'mean')
+    columns = data.get('columns', None)
+    async_processing = data.get('async', False)
+    # KNN options: numerical feature columns, donors averaged and donor sample cap
+    features = data.get('features', None)
+    n_neighbors = int(data['n_neighbors']) if data.get('n_neighbors') is not None else None
+    max_donors = int(data['max_donors']) if data.get('max_donors') is not None else None
+    
+    # Validate strategy
+    valid_strategies = ['mean', 'median', 'mode', 'constant', 'knn']
+    if strategy not in valid_strategies:
+        return standardize_response(False, error=f'Invalid strategy. Must be one of: {valid_strategies}', status_code=400)
+    
+    job = run_async_operation(
+        lambda p: p.handle_missing_values(strategy, columns, features, n_neighbors, max_donors),
+        dataset_id,
+        'handle_missing_values'
+    )
+    if async_processing:
+        return job_started_response(job, 'Missing value imputation started')
+    
+    return standardize_response(True, job.outcome(), f'Missing values handled using {strategy} strategy')
+
+@app.route('/api/dataset/<dataset_id>/encode', methods=['POST'])
+@handle_errors
+def encode_categorical(dataset_id):
+    """Encode categorical variables"""
+    validate_dataset_exists(dataset_id)
+    
+    data = request.get_json() or {}
+    method = data.get('method', 'label')
+    columns = data.get('columns', None)
+    async_processing = data.get('async', False)
+    # Indicator columns per hashed column
+    n_buckets = int(data['n_buckets']) if data.get('n_buckets') is not None else None
+    
+    # Validate method
+    if method not in ENCODING_METHODS:
+        return standardize_response(False, error=f'Invalid method. Must be one of: {list(ENCODING_METHODS)}', status_code=400)
+    if n_buckets is not None and n_buckets < 1:
+        return standardize_response(False, error='n_buckets must be positive', status_code=400)
+    
+    job = run_async_operation(
+        lambda p: p.encode_categorical(method, columns, n_buckets),
+        dataset_id,
+        'encode_categorical'
+    )
+    if async_processing:
+        return job_started_response(job, 'Categorical encoding started')
+    
+    return standardize_response(True, job.outcome(), f'Categorical variables encoded using {method} encoding')
+
+@app.route('/api/dataset/<dataset_id>/encodings', methods=['GET'])
+@handle_errors
+def get_label_encodings(dataset_id):
+    """Get the class mappings of the dataset's label-encoded columns"""
+    preprocessor = validate_dataset_exists(dataset_id)
+    mappings = preprocessor.label_encodings.mappings(preprocessor.materialize())
+    
+    return standardize_response(True, {col: mapping.to_dict() for col, mapping in mappings.items()},
+                                'Label encodings retrieved successfully')
+
+@app.route('/api/dataset/<dataset_id>/encodings/transform', methods=['POST'])
+@handle_errors
+def transform_with_label_encoding(dataset_id):
+    """Encode new values of a label-encoded column with its stored mapping"""
+    preprocessor = validate_dataset_exists(dataset_id)
+    
+    data = request.get_json() or {}
+    column = data.get('column')
+    values = data.get('values')
+    if column is None or not isinstance(values, list):
+        return standardize_response(False, error='column and a list of values are required', status_code=400)
+    
+    codes = preprocessor.label_encodings.transform(preprocessor.materialize(), column, values)
+    unknown = int(((codes == MISSING_CODE) & pd.notna(pd.Series(values, dtype=object)).to_numpy()).sum())
+    
+    return standardize_response(True, {
+        'column': column,
+        'codes': codes,
+        'unknown_values': unknown,
+        'missing_code': MISSING_CODE
+    }, 'Values encoded successfully')
 
 @app.route('/api/dataset/<dataset_id>/outliers', methods=['POST'])
 @handle_errors
 def remove_outliers(dataset_id):
     """Remove outliers from dataset"""
-    preprocessor = validate_dataset_exists(dataset_id)
+    validate_dataset_exists(dataset_id)
     
     data = request.get_json() or {}
     method = data.get('method', 'iqr')
     columns = data.get('columns', None)
     threshold = float(data.get('threshold', 1.5))
+    mode = data.get('mode', 'remove')
     async_processing = data.get('async', False)
     
-    # Validate method
-    valid_methods = ['iqr', 'zscore']
-    if method not in valid_methods:
-        return standardize_response(False, error=f'Invalid method. Must be one of: {valid_methods}', status_code=400)
+    # Validate method and mode
+    if method not in OUTLIER_METHODS:
+        return standardize_response(False, error=f'Invalid method. Must be one of: {list(OUTLIER_METHODS)}', status_code=400)
+    if mode not in OUTLIER_MODES:
+        return standardize_response(False, error=f'Invalid mode. Must be one of: {list(OUTLIER_MODES)}', status_code=400)
     
     # Validate threshold
     if threshold <= 0:
         return standardize_response(False, error='Threshold must be positive', status_code=400)
     
+    job = run_async_operation(
+        lambda p: p.remove_outliers(method, columns, threshold, mode),
+        dataset_id,
+        'remove_outliers'
+    )
     if async_processing:
-        run_async_operation(
-            lambda p: p.remove_outliers(method, columns, threshold),
-            dataset_id
-        )
-        return standardize_response(True, {
-            'processing': True,
-            'message': 'Processing started. Check status endpoint for progress.'
-        }, 'Outlier removal started')
-    else:
-        results = preprocessor.remove_outliers(method, columns, threshold)
-        summary = preprocessor.get_comprehensive_summary()
-        
-        return standardize_response(True, {
-            'results': results,
-            'summary': summary
-        }, f'Outliers removed using {method} method')
+        return job_started_response(job, 'Outlier removal started')
+    
+    action = 'flagged' if mode == 'flag' else 'removed'
+    return standardize_response(True, job.outcome(), f'Outliers {action} using {method} method')
 
 @app.route('/api/dataset/<dataset_id>/duplicates', methods=['DELETE'])
 @handle_errors
 def remove_duplicates(dataset_id):
     """Remove duplicate rows"""
+    validate_dataset_exists(dataset_id)
+    
+    async_processing = request.args.get('async', 'false').lower() == 'true'
+    # Comma-separated columns to compare; all columns by default
+    subset = request.args.get('subset')
+    subset = [col for col in subset.split(',') if col] if subset else None
+    # 'first', 'last', or 'none' to drop every copy of a duplicated row
+    keep = request.args.get('keep', 'first').lower()
+    keep = False if keep in ('none', 'false') else keep
+    if keep not in DUPLICATE_KEEP:
+        return standardize_response(False, error="Invalid keep. Must be one of: ['first', 'last', 'none']", status_code=400)
+    
+    job = run_async_operation(lambda p: p.remove_duplicates(subset, keep), dataset_id, 'remove_duplicates')
+    if async_processing:
+        return job_started_response(job, 'Duplicate removal started')
+    
+    outcome = job.outcome()
+    if 'removed_count' not in outcome['results']:
+        return standardize_response(True, outcome, 'Duplicate removal planned')
+    return standardize_response(True, outcome, f'Removed {outcome["results"]["removed_count"]} duplicate rows')
+
+@app.route('/api/dataset/<dataset_id>/status', methods=['GET'])
+@handle_errors
+def get_processing_status(dataset_id):
+    """Get the latest processing status"""
     preprocessor = validate_dataset_exists(dataset_id)
     
-    results = preprocessor.remove_duplicates()
-    summary = preprocessor.get_comprehensive_summary()
+    return standardize_response(True, preprocessor.progress_channel.latest, 'Status retrieved successfully')
+
+@app.route('/api/dataset/<dataset_id>/events', methods=['GET'])
+@handle_errors
+def stream_dataset_events(dataset_id):
+    """Stream processing progress of a dataset as server-sent events"""
+    preprocessor = validate_dataset_exists(dataset_id)
+    
+    last_event_id = request.headers.get('Last-Event-ID')
+    cursor = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else None
+    
+    return sse_response(preprocessor.progress_channel.stream(
+        cursor=cursor,
+        until=lambda: dataset_id not in datasets
+    ))
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@handle_errors
+def get_job(job_id):
+    """Get the state, progress and result of a background job"""
+    job = job_executor.get(job_id)
+    if job is None:
+        return standardize_response(False, error='Job not found', status_code=404)
+    
+    return standardize_response(True, job.to_dict(), 'Job status retrieved successfully')
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+@handle_errors
+def stream_job_events(job_id):
+    """Stream the state of a background job as server-sent events until it finishes"""
+    job = job_executor.get(job_id)
+    if job is None:
+        return standardize_response(False, error='Job not found', status_code=404)
     
+    return sse_response(stream_snapshots(
+        lambda: job.to_dict(include_result=job.finished),
+        lambda: job.finished
+    ))
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+@handle_errors
+def cancel_job(job_id):
+    """Cancel a queued or running background job"""
+    job = job_executor.cancel(job_id)
+    if job is None:
+        return standardize_response(False, error='Job not found', status_code=404)
+    
+    return standardize_response(True, job.to_dict(include_result=False), 'Job cancellation requested')
+
+@app.route('/api/dataset/<dataset_id>/jobs', methods=['GET'])
+@handle_errors
+def list_dataset_jobs(dataset_id):
+    """List the retained background jobs of a dataset"""
+    validate_dataset_exists(dataset_id)
+    
+    jobs = [job.to_dict(include_result=False) for job in job_executor.jobs_for(dataset_id)]
     return standardize_response(True, {
-        'results': results,
-        'summary': summary
-    }, f'Removed {results["removed_count"]} duplicate rows')
+        'jobs': jobs,
+        'total_jobs': len(jobs)
+    }, 'Jobs retrieved successfully')
 
 @app.route('/api/dataset/<dataset_id>/correlation', methods=['GET'])
 @handle_errors
 def get_correlation_analysis(dataset_id):
     """Get correlation analysis for numerical columns"""
     preprocessor = validate_dataset_exists(dataset_id)
-    df = preprocessor.df
     
-    # Get numerical columns
-    numerical_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-    
-    if len(numerical_cols) < 2:
-        return standardize_response(True, {
-            'numericalColumns': numerical_cols,
-            'correlationMatrix': [],
-            'strongCorrelations': [],
-            'insights': ['Not enough numerical columns for correlation analysis. Need at least 2 numerical columns.']
-        }, 'Insufficient numerical columns for correlation analysis')
-    
-    # Calculate correlation matrix
-    corr_matrix = df[numerical_cols].corr()
-    
-    # Convert to the format expected by frontend
-    correlation_matrix = []
-    for i, col1 in enumerate(numerical_cols):
-        row = []
-        for j, col2 in enumerate(numerical_cols):
-            corr_value = corr_matrix.iloc[i, j]
-            if pd.isna(corr_value):
-                corr_value = 0
-            
-            abs_corr = abs(corr_value)
-            if abs_corr >= 0.7:
-                strength = "strong"
-            elif abs_corr >= 0.5:
-                strength = "moderate"
-            else:
-                strength = "weak"
-            
-            row.append({
-                'value': safe_convert_to_json(corr_value),
-                'strength': strength,
-                'col1': col1,
-                'col2': col2
-            })
-        correlation_matrix.append(row)
-    
-    # Find strong correlations
-    strong_correlations = []
-    for i in range(len(numerical_cols)):
-        for j in range(i + 1, len(numerical_cols)):
-            corr_value = correlation_matrix[i][j]['value']
-            if abs(corr_value) >= 0.5:
-                strong_correlations.append({
-                    'col1': numerical_cols[i],
-                    'col2': numerical_cols[j],
-                    'correlation': corr_value,
-                    'strength': correlation_matrix[i][j]['strength'],
-                    'direction': 'positive' if corr_value > 0 else 'negative'
-                })
-    
-    # Generate insights
-    insights = []
-    if len(strong_correlations) == 0:
-        insights.append("No strong correlations found between variables.")
+    method = request.args.get('method', 'pearson').lower()
+    compact = request.args.get('format', 'legacy').lower() == 'compact'
+    top_k = request.args.get('top_k', type=int)
+    include_matrix = request.args.get('include_matrix', 'true').lower() != 'false'
+    
+    preprocessor.materialize()
+    # Read the version before the frame, so a concurrent commit cannot be cached under the old version
+    version = preprocessor.versions.version_id
+    columns, matrix = preprocessor.correlation_cache.get(preprocessor.df, version, method)
+    result = CorrelationEngine.analysis(columns, matrix, compact=compact, top_k=top_k, include_matrix=include_matrix)
+    
+    if len(columns) < 2:
+        return standardize_response(True, result, 'Insufficient numerical columns for correlation analysis')
+    
+    return standardize_response(True, result, 'Correlation analysis completed successfully')
+
+@app.route('/api/dataset/<dataset_id>/preview', methods=['GET'])
+@handle_errors
+def get_preview(dataset_id):
+    """Get a page of rows; shape=columns lists the column names once and sends rows as arrays.
+    
+    columns (comma-separated) limits the page to those columns; on a lazy
+    dataset only the planned steps they depend on are run.
+    """
+    preprocessor = validate_dataset_exists(dataset_id)
+    columns = request.args.get('columns')
+    df = preprocessor.materialize([col for col in columns.split(',') if col] if columns else None)
+    
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = min(50, max(1, request.args.get('per_page', 10, type=int)))
+    view_type = request.args.get('type', 'head').lower()
+    shape = request.args.get('shape', 'records').lower()
+    if shape not in FRAME_SHAPES:
+        return standardize_response(False, error=f'Invalid shape. Must be one of: {list(FRAME_SHAPES)}', status_code=400)
+    seed = request.args.get('seed', type=int)
+    
+    start_idx = (page - 1) * per_page
+    if view_type == 'tail':
+        sample_df = df.tail(per_page)
+    elif view_type == 'random':
+        # Pages of one seeded permutation; pass the returned seed back to keep paging it
+        seed = preprocessor.sampler.seed if seed is None else seed
+        sample_df = preprocessor.sampler.page(df, page, per_page, seed)
+    else:  # head
+        sample_df = df.iloc[start_idx:start_idx + per_page]
+    
+    result = {
+        # Encoded straight from the frame; missing values are null
+        'data': frame_json(sample_df, shape),
+        'total_rows': len(df),
+        'page': page,
+        'per_page': per_page,
+        'total_pages': (len(df) + per_page - 1) // per_page,
+        'view_type': view_type,
+        'shape': shape
+    }
+    if view_type == 'random':
+        result['seed'] = seed
+    return standardize_response(True, result, 'Preview data retrieved successfully')
+
+@app.route('/api/dataset/<dataset_id>/sample', methods=['GET'])
+@handle_errors
+def get_sample(dataset_id):
+    """Get a reproducible random sample, optionally stratified by a column"""
+    preprocessor = validate_dataset_exists(dataset_id)
+    preprocessor.materialize()
+    
+    n = min(Config.SAMPLE_MAX_ROWS, max(1, request.args.get('n', 100, type=int)))
+    seed = request.args.get('seed', type=int)
+    seed = preprocessor.sampler.seed if seed is None else seed
+    stratify = request.args.get('stratify')
+    shape = request.args.get('shape', 'records').lower()
+    if shape not in FRAME_SHAPES:
+        return standardize_response(False, error=f'Invalid shape. Must be one of: {list(FRAME_SHAPES)}', status_code=400)
+    
+    strata = None
+    if stratify:
+        sample_df, strata = preprocessor.get_stratified_sample(n, stratify, seed)
     else:
-        insights.append(f"Found {len(strong_correlations)} strong correlation(s).")
-        for corr in strong_correlations[:3]:
-            insights.append(
-                f"{corr['col1']} and {corr['col2']} have a {corr['strength']} {corr['direction']} correlation ({corr['correlation']:.3f})."
-            )
+        sample_df = preprocessor.get_random_sample(n, 1, seed)
     
     return standardize_response(True, {
-        'numericalColumns': numerical_cols,
-        'correlationMatrix': correlation_matrix,
-        'strongCorrelations': strong_correlations,
-        'insights': insights
-    }, 'Correlation analysis completed successfully')
+        'data': frame_json(sample_df, shape),
+        'sample_size': len(sample_df),
+        'total_rows': len(preprocessor.df),
+        'seed': seed,
+        'stratify': stratify,
+        'strata': strata,
+        'shape': shape
+    }, 'Sample retrieved successfully')
+
+@app.route('/api/dataset/<dataset_id>/summary', methods=['GET'])
+@handle_errors
+def get_dataset_summary(dataset_id):
+    """Get dataset summary; large datasets are summarized from sketches unless exact=true"""
+    preprocessor = validate_dataset_exists(dataset_id)
+    
+    exact = request.args.get('exact')
+    exact = None if exact is None else exact.lower() == 'true'
+    summary = preprocessor.get_comprehensive_summary(exact)
+    
+    return standardize_response(True, summary, 'Summary retrieved successfully')
+
+@app.route('/api/dataset/<dataset_id>/quality', methods=['GET'])
+@handle_errors
+def get_quality_report(dataset_id):
+    """Get data quality score, column insights and suggested preprocessing steps"""
+    preprocessor = validate_dataset_exists(dataset_id)
+    preprocessor.materialize()
+    
+    # Read the version before the frame, so a concurrent commit cannot be cached under the old version
+    version = preprocessor.versions.version_id
+    df = preprocessor.df
+    profile = preprocessor.profile_cache.get(df, version, preprocessor.summary_cache.row_index)
+    
+    return standardize_response(True, DataAnalyzer.report(df, profile), 'Data quality report generated successfully')
 
 @app.route('/api/dataset/<dataset_id>/export', methods=['GET'])
 @handle_errors
 def export_dataset(dataset_id):
-    """Export processed dataset as CSV"""
+    """Export processed dataset as CSV, gzip-compressed CSV, Parquet or Feather"""
     preprocessor = validate_dataset_exists(dataset_id)
-    df = preprocessor.df
+    # Shallow snapshot: operations replace columns rather than write into them,
+    # so the export is unaffected by operations that run while it streams
+    df = preprocessor.materialize().copy(deep=False)
+    if request.args.get('decode_labels', 'false').lower() == 'true':
+        # Label-encoded columns are written with their original values
+        df = preprocessor.label_encodings.decode(df)
     
-    # Create CSV in memory
-    output = io.StringIO()
-    df.to_csv(output, index=False)
-    output.seek(0)
-    
-    # Convert to bytes
-    csv_data = io.BytesIO()
-    csv_data.write(output.getvalue().encode('utf-8'))
-    csv_data.seek(0)
-    
-    return send_file(
-        csv_data,
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'processed_data_{dataset_id[:8]}.csv'
-    )
+    return DatasetExporter.response(df, request.args.get('format', 'csv'), f'processed_data_{dataset_id[:8]}')
 
 @app.route('/api/dataset/<dataset_id>/reset', methods=['POST'])
 @handle_errors
 def reset_dataset(dataset_id):
     """Reset dataset to original state"""
-    preprocessor = validate_dataset_exists(dataset_id)
-    
-    with dataset_lock:
-        preprocessor.df = preprocessor.original_df.copy()
-        preprocessor.operations_log = []
-        # Clear random sample cache when resetting
-        preprocessor.cached_random_sample = None
-        preprocessor.random_sample_timestamp = None
-        preprocessor.update_status("idle", 0, "Dataset reset to original state")
-    
+    with datasets.locked(dataset_id):
+        preprocessor = validate_dataset_exists(dataset_id)
+        preprocessor.reset()
+        datasets.sync(dataset_id)
     summary = preprocessor.get_comprehensive_summary()
     
     return standardize_response(True, {
         'summary': summary
     }, 'Dataset reset to original state')
 
+@app.route('/api/dataset/<dataset_id>/undo', methods=['POST'])
+@handle_errors
+def undo_operation(dataset_id):
+    """Undo the last preprocessing operation"""
+    with datasets.locked(dataset_id):
+        preprocessor = validate_dataset_exists(dataset_id)
+        results = preprocessor.undo()
+        datasets.sync(dataset_id)
+    summary = preprocessor.get_comprehensive_summary()
+    
+    return standardize_response(True, {
+        'results': results,
+        'summary': summary
+    }, f'Undid {results["undone_operation"]}')
+
 @app.route('/api/dataset/<dataset_id>/history', methods=['GET'])
 @handle_errors
 def get_processing_history(dataset_id):
@@ -634,9 +1184,71 @@ def get_processing_history(dataset_id):
     
     return standardize_response(True, {
         'operations': preprocessor.operations_log,
-        'total_operations': len(preprocessor.operations_log)
+        'total_operations': len(preprocessor.operations_log),
+        'pending_operations': preprocessor.plan.describe()['pending']
     }, 'Processing history retrieved successfully')
 
+@app.route('/api/dataset/<dataset_id>/plan', methods=['GET'])
+@handle_errors
+def get_operation_plan(dataset_id):
+    """Get the pending operations of a lazy dataset as recorded and in the order they will run"""
+    preprocessor = validate_dataset_exists(dataset_id)
+    
+    with preprocessor.lock:
+        plan = preprocessor.plan.describe()
+    return standardize_response(True, plan, f'{len(plan["pending"])} operations pending')
+
+@app.route('/api/dataset/<dataset_id>/plan', methods=['POST'])
+@handle_errors
+def set_operation_plan(dataset_id):
+    """Switch lazy mode ({"lazy": bool}); switching it off runs the pending operations"""
+    validate_dataset_exists(dataset_id)
+    
+    data = request.get_json() or {}
+    lazy = data.get('lazy')
+    if not isinstance(lazy, bool):
+        return standardize_response(False, error='lazy must be true or false', status_code=400)
+    
+    with datasets.locked(dataset_id):
+        preprocessor = validate_dataset_exists(dataset_id)
+        executed = preprocessor.set_lazy(lazy)
+        datasets.sync(dataset_id)
+    result = {'lazy': lazy, 'executed': executed}
+    if not lazy:
+        result['summary'] = preprocessor.get_comprehensive_summary()
+    return standardize_response(True, result, f'Lazy mode {"enabled" if lazy else "disabled"}')
+
+@app.route('/api/dataset/<dataset_id>/recipe', methods=['GET'])
+@handle_errors
+def get_recipe(dataset_id):
+    """Get the dataset's operations as a replayable recipe with their fitted parameters"""
+    preprocessor = validate_dataset_exists(dataset_id)
+    preprocessor.materialize()
+    recipe = Recipe.compile(list(preprocessor.operations_log))
+    
+    return standardize_response(True, recipe.to_dict(), f'Recipe of {len(recipe.steps)} steps compiled')
+
+@app.route('/api/dataset/<dataset_id>/recipe/apply', methods=['POST'])
+@handle_errors
+def apply_dataset_recipe(dataset_id):
+    """Apply the dataset's operations to an uploaded file and stream the result"""
+    preprocessor = validate_dataset_exists(dataset_id)
+    preprocessor.materialize()
+    recipe = Recipe.compile(list(preprocessor.operations_log))
+    
+    return recipe_response(recipe, f'processed_{dataset_id[:8]}')
+
+@app.route('/api/recipes/apply', methods=['POST'])
+@handle_errors
+def apply_recipe():
+    """Apply a recipe (form field 'recipe', as returned by the recipe endpoint) to an uploaded file"""
+    try:
+        data = json.loads(request.form.get('recipe') or 'null')
+    except json.JSONDecodeError:
+        raise ValueError('recipe must be valid JSON')
+    
+    return recipe_response(Recipe.from_dict(data), 'processed_data')
+
 # Error handlers
 @app.errorhandler(413)
 @app.errorhandler(RequestEntityTooLarge)
@@ -656,5 +1268,4 @@ if __name__ == '__main__':
     print("Starting Data Preprocessing API Server...")
     print("Server running on http://localhost:5000")
     print("Health check: http://localhost:5000/api/health")
-    print("Random sample caching enabled - samples refresh every 30 seconds")
     app.run(debug=False, host='0.0.0.0', port=5000, threaded=True)
@@ -0,0 +1,124 @@
+"""Benchmark the vectorized summary engine against the per-column loop.
+
+Run from the backend directory:
+    python -m benchmarks.benchmark_summary --rows 100000 --numeric 250 --categorical 50
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.summary_engine import SummaryEngine
+
+
+def legacy_summary(df):
+    """Per-column summary loop previously used by Dataset.get_comprehensive_summary"""
+    summary = {
+        'shape': df.shape,
+        'columns': df.columns.tolist(),
+        'dtypes': {col: str(dtype) for col, dtype in df.dtypes.items()},
+        'missing_values': {col: int(count) for col, count in df.isnull().sum().items()},
+        'memory_usage': f"{df.memory_usage(deep=True).sum() / 1024:.2f} KB",
+        'duplicate_rows': int(df.duplicated().sum())
+    }
+
+    numerical_cols = df.select_dtypes(include=[np.number]).columns
+    if len(numerical_cols) > 0:
+        numerical_stats = {}
+        for col in numerical_cols:
+            if df[col].notna().sum() > 0:
+                numerical_stats[col] = {
+                    'count': int(df[col].count()),
+                    'mean': float(df[col].mean()),
+                    'std': float(df[col].std()),
+                    'min': float(df[col].min()),
+                    '25%': float(df[col].quantile(0.25)),
+                    '50%': float(df[col].quantile(0.50)),
+                    '75%': float(df[col].quantile(0.75)),
+                    'max': float(df[col].max())
+                }
+        summary['numerical_stats'] = numerical_stats
+
+    categorical_cols = df.select_dtypes(include=['object', 'category']).columns
+    if len(categorical_cols) > 0:
+        categorical_stats = {}
+        for col in categorical_cols:
+            if df[col].notna().sum() > 0:
+                value_counts = df[col].value_counts().head(10)
+                categorical_stats[col] = {
+                    'unique_count': int(df[col].nunique()),
+                    'top_values': {str(k): int(v) for k, v in value_counts.items()}
+                }
+        summary['categorical_stats'] = categorical_stats
+
+    return summary
+
+
+def make_frame(rows, numeric, categorical, missing_rate, seed):
+    """Build a synthetic upload with numeric and string columns"""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(numeric):
+        values = rng.normal(loc=i, scale=1 + i % 7, size=rows)
+        values[rng.random(rows) < missing_rate] = np.nan
+        data[f'num_{i}'] = values
+    for i in range(categorical):
+        levels = np.array([f'level_{k}' for k in range(5 + i * 3)], dtype=object)
+        values = levels[rng.integers(0, len(levels), size=rows)]
+        values[rng.random(rows) < missing_rate] = None
+        data[f'cat_{i}'] = values
+    return pd.DataFrame(data)
+
+
+def time_call(func, df, repeat):
+    """Best wall-clock time over `repeat` runs"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def compare(legacy, vectorized):
+    """Return the largest relative difference between the two numerical summaries"""
+    assert legacy['missing_values'] == vectorized['missing_values']
+    assert legacy['duplicate_rows'] == vectorized['duplicate_rows']
+    assert legacy.get('categorical_stats') == vectorized.get('categorical_stats')
+
+    worst = 0.0
+    for col, expected in legacy.get('numerical_stats', {}).items():
+        actual = vectorized['numerical_stats'][col]
+        for key, value in expected.items():
+            if np.isnan(value) and np.isnan(actual[key]):
+                continue
+            worst = max(worst, abs(value - actual[key]) / max(1.0, abs(value)))
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--numeric', type=int, default=250)
+    parser.add_argument('--categorical', type=int, default=50)
+    parser.add_argument('--missing-rate', type=float, default=0.05)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows, args.numeric, args.categorical, args.missing_rate, args.seed)
+    print(f"Frame: {df.shape[0]} rows x {df.shape[1]} columns")
+
+    legacy_time, legacy = time_call(legacy_summary, df, args.repeat)
+    engine_time, vectorized = time_call(SummaryEngine.compute_summary, df, args.repeat)
+
+    print(f"Per-column loop:   {legacy_time:8.3f} s")
+    print(f"Summary engine:    {engine_time:8.3f} s")
+    print(f"Speedup:           {legacy_time / engine_time:8.2f}x")
+    print(f"Max relative diff: {compare(legacy, vectorized):.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Apply a preprocessing recipe to every CSV and Excel file of a directory.
+
+The recipe is the JSON returned by GET /api/dataset/<id>/recipe (the whole
+response or just its data). Files are processed in parallel, one per worker
+process, each streamed chunk by chunk into the output directory.
+
+Run from the backend directory:
+    python -m cli.apply_recipe recipe.json extracts/ processed/ --workers 4 --format csv.gz
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config.config import Config
+from utils.exporter import DatasetExporter, EXPORT_FORMATS
+from utils.recipe import Recipe, RECIPE_INPUT_EXTENSIONS
+
+
+def load_recipe(path):
+    with open(path) as f:
+        return Recipe.from_dict(json.load(f))
+
+
+def process_file(recipe_data, source, destination, fmt, chunk_rows):
+    """Apply the recipe to one file; runs in a worker process"""
+    started = time.perf_counter()
+    counts = Recipe.from_dict(recipe_data).apply_file(source, destination, fmt, chunk_rows)
+    counts['seconds'] = time.perf_counter() - started
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('recipe')
+    parser.add_argument('input_dir')
+    parser.add_argument('output_dir')
+    parser.add_argument('--workers', type=int, default=Config.RECIPE_WORKERS)
+    parser.add_argument('--format', default='csv', help='csv or csv.gz')
+    parser.add_argument('--chunk-rows', type=int, default=Config.INGEST_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    recipe = load_recipe(args.recipe)
+    fmt = DatasetExporter.resolve_format(args.format)
+    if fmt not in ('csv', 'csv.gz'):
+        parser.error("--format must be csv or csv.gz")
+    extension = EXPORT_FORMATS[fmt][1]
+
+    sources = sorted(
+        name for name in os.listdir(args.input_dir)
+        if name.lower().endswith(RECIPE_INPUT_EXTENSIONS) and os.path.isfile(os.path.join(args.input_dir, name))
+    )
+    if not sources:
+        print(f"No CSV or Excel files in {args.input_dir}")
+        return 0
+    os.makedirs(args.output_dir, exist_ok=True)
+    print(f"Applying {len(recipe.steps)} steps to {len(sources)} files with {args.workers} workers")
+
+    failed = 0
+    started = time.perf_counter()
+    # Spawned workers import only what the recipe needs
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=max(1, args.workers), mp_context=context) as pool:
+        futures = {
+            pool.submit(
+                process_file, recipe.to_dict(), os.path.join(args.input_dir, name),
+                os.path.join(args.output_dir, os.path.splitext(name)[0] + extension), fmt, args.chunk_rows
+            ): name
+            for name in sources
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                counts = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"FAILED {name}: {str(e)}", file=sys.stderr)
+                continue
+            print(f"{name}: {counts['rows_in']} rows in, {counts['rows_out']} rows out, {counts['seconds']:.2f} s")
+
+    print(f"Processed {len(sources) - failed} of {len(sources)} files in {time.perf_counter() - started:.2f} s")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -14,10 +14,64 @@ class Config:
     # Data processing configuration
     MAX_ROWS = 100000  # Maximum rows to process
     MAX_COLUMNS = 1000  # Maximum columns to process
+    INGEST_CHUNK_ROWS = 20000  # Rows parsed per chunk during upload
+    CATEGORY_MAX_UNIQUE_RATIO = 0.5  # String columns with fewer unique values per row are stored as categories
+    EXCEL_SHEET_WORKERS = int(os.environ.get('EXCEL_SHEET_WORKERS', os.cpu_count() or 1))  # Processes parsing the sheets of one workbook upload
+    UPLOAD_CACHE = os.environ.get('UPLOAD_CACHE', 'true').lower() == 'true'  # Identical re-uploads reuse the parsed frame and summary
+    EXPORT_CHUNK_ROWS = 20000  # Rows encoded per chunk when streaming an export
+    EXPORT_SPOOL_BYTES = 64 * 1024 * 1024  # Parquet/Feather exports larger than this are staged on disk
     
     # Dataset storage settings
     DATASET_EXPIRY = timedelta(hours=24)  # Datasets expire after 24 hours
     CLEANUP_INTERVAL = timedelta(hours=1)  # Run cleanup every hour
+    MAX_DATASET_VERSIONS = 10  # Versions kept per dataset for undo, including the original
+    DATASET_MEMORY_BUDGET = int(os.environ.get('DATASET_MEMORY_BUDGET_MB', 2048)) * 1024 * 1024  # Bytes kept in memory before spilling
+    SPILL_FOLDER = os.environ.get('SPILL_FOLDER') or 'spill'  # Where least recently used datasets are spilled
+    SHARED_STORE_FOLDER = os.environ.get('SHARED_STORE_FOLDER')  # Arrow frames shared by worker processes; unset keeps datasets in-process
+    
+    # Background job settings
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))  # Worker threads running preprocessing jobs
+    JOB_QUEUE_LIMIT = 100  # Maximum queued or running jobs
+    JOB_RESULT_TTL = timedelta(hours=1)  # How long finished jobs and their results are kept
+    
+    # Column-parallel execution of numerical operations
+    COLUMN_PARALLEL_WORKERS = int(os.environ.get('COLUMN_PARALLEL_WORKERS', os.cpu_count() or 1))  # Worker processes
+    COLUMN_PARALLEL_MIN_COLUMNS = 8  # Fewer columns are processed in the request thread
+    COLUMN_PARALLEL_MIN_CELLS = 2_000_000  # Smaller selections are processed in the request thread
+    
+    # Progress events
+    PROGRESS_BUFFER_SIZE = 256  # Progress events kept per dataset for event streams
+    PROGRESS_MIN_INTERVAL = 0.1  # Seconds between buffered progress events; updates in between are coalesced
+    PROGRESS_HEARTBEAT = 15  # Seconds between keep-alive comments on idle event streams
+    
+    # Approximate summary statistics from ingestion sketches
+    APPROXIMATE_SUMMARY_MIN_ROWS = int(os.environ.get('APPROXIMATE_SUMMARY_MIN_ROWS', 50000))  # Smaller datasets are summarized exactly
+    SKETCH_QUANTILE_K = 200  # KLL compactor size; quartiles within about 1.3% of rank
+    SKETCH_HLL_PRECISION = 14  # 2**14 HyperLogLog registers; unique counts within about 0.8%
+    SKETCH_HEAVY_HITTERS = 256  # Misra-Gries counters; top-value counts at most rows / 257 low
+    
+    # Row-hash index behind duplicate detection
+    ROW_INDEX_MAX_CELLS = 25_000_000  # Per-column hashes (8 bytes per cell) are kept up to this many cells
+    
+    # Random samples and random preview pages
+    SAMPLE_CHUNK_ROWS = 1024  # Positions of a row permutation drawn at a time
+    SAMPLE_CACHED_PERMUTATIONS = 8  # Row permutations (seed and row count) kept per dataset
+    SAMPLE_MAX_ROWS = 1000  # Largest sample returned by the sample endpoint
+    
+    # KNN imputation
+    KNN_NEIGHBORS = 5  # Donors averaged per missing value
+    KNN_MAX_DONORS = int(os.environ.get('KNN_MAX_DONORS', 50000))  # Larger donor sets are randomly sampled down to this
+    KNN_BATCH_ROWS = 2048  # Rows queried against the neighbour index at a time
+    
+    # Categorical encoding
+    ONEHOT_MAX_CATEGORIES = 10000  # Columns with more values are left to hashing or binary encoding
+    HASHING_BUCKETS = 32  # Default indicator columns per hashed column
+    
+    # Lazy operation plans
+    LAZY_OPERATIONS = os.environ.get('LAZY_OPERATIONS', 'false').lower() == 'true'  # Datasets record operations until their data is read
+    
+    # Recipe batch runs
+    RECIPE_WORKERS = int(os.environ.get('RECIPE_WORKERS', os.cpu_count() or 1))  # Processes applying a recipe to a directory of files
     
     # API request throttling
     THROTTLE_INTERVAL = 1.0  # Minimum seconds between requests
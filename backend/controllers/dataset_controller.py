@@ -1,30 +1,36 @@
-from flask import request, jsonify, send_file
+from flask import request, jsonify
 from services.data_service import data_service
 from utils.response_helper import standardize_response
 from middleware.auth import validate_dataset_id
-import pandas as pd
-import io
 import uuid
 import logging
 
 logger = logging.getLogger(__name__)
 
 from flask import request, jsonify
-import pandas as pd
 import numpy as np
 import uuid
 import logging
 from datetime import datetime
-from services.data_service import DataService, safe_convert_to_json
+from services.data_service import safe_convert_to_json
 from utils.response_helper import standardize_response
+from utils.summary_engine import SummaryEngine
+from utils.ingestion import read_csv_chunked, read_excel_chunked, IngestionError
+from utils.data_validator import ChunkValidator
+from utils.sketches import DatasetSketch
+from utils.exporter import DatasetExporter
+from utils.serializer import frame_json, FRAME_SHAPES
+from config.config import Config
 
 logger = logging.getLogger(__name__)
 
 class DatasetController:
-    def __init__(self, datasets_storage, processing_status_storage, dataset_lock):
+    def __init__(self, datasets_storage, processing_status_storage, dataset_lock, upload_cache=None):
         self.datasets = datasets_storage
         self.processing_status = processing_status_storage
         self.dataset_lock = dataset_lock
+        # Parsed uploads shared by datasets of identical files
+        self.upload_cache = upload_cache
     
     def upload_file(self):
         """Handle file upload"""
@@ -41,35 +47,55 @@ class DatasetController:
         dataset_id = str(uuid.uuid4())
         
         try:
+            warnings = []
+            sketch = None
+            cache_key = cached = None
+            extension = file.filename.lower().rsplit('.', 1)[-1]
+            if self.upload_cache is not None:
+                # Identical bytes parsed with the same options give the same frame
+                cache_key = self.upload_cache.content_key(file.stream, extension, request.form.get('sheets'),
+                                                          request.form.get('range'))
+                cached = self.upload_cache.acquire(cache_key, dataset_id)
+            
+            if cached is not None:
+                return self._upload_from_cache(dataset_id, file.filename, cached)
+            
             # Read file based on extension
-            if file.filename.lower().endswith('.csv'):
-                df = pd.read_csv(file)
+            # Stream the upload in chunks, validating and compacting each chunk as it is parsed
+            validator = ChunkValidator(large_rows=Config.MAX_ROWS, many_columns=Config.MAX_COLUMNS)
+            sketch = DatasetSketch()
+            if extension == 'csv':
+                df = read_csv_chunked(file.stream, validator=validator,
+                                      max_rows=Config.MAX_ROWS, max_columns=Config.MAX_COLUMNS, sketch=sketch)
             else:
-                df = pd.read_excel(file)
+                # sheets: comma-separated names or 0-based indexes, or 'all' (default: the first sheet);
+                # range: A1-style cells to read, e.g. 'A1:F5000', 'B:F' or 'A3'
+                df = read_excel_chunked(file.stream, file.filename, sheets=request.form.get('sheets'),
+                                        cell_range=request.form.get('range'), validator=validator,
+                                        max_rows=Config.MAX_ROWS, max_columns=Config.MAX_COLUMNS, sketch=sketch)
+            errors, warnings = validator.finish()
+            if errors:
+                return standardize_response(False, error='; '.join(errors), status_code=400)
             
             # Validate dataset
             if df.empty:
                 return standardize_response(False, error='File is empty', status_code=400)
             
-            if len(df) > 100000:
-                return standardize_response(False, error='File too large. Maximum 100,000 rows allowed.', status_code=400)
+            if len(df) > Config.MAX_ROWS:
+                return standardize_response(False, error=f'File too large. Maximum {Config.MAX_ROWS:,} rows allowed.', status_code=400)
             
             # Store dataset
-            with self.dataset_lock:
-                from app import EnhancedDataPreprocessor
-                preprocessor = EnhancedDataPreprocessor(df, dataset_id)
-                self.datasets[dataset_id] = preprocessor
-                self.processing_status[dataset_id] = {
-                    "status": "idle",
-                    "progress": 0,
-                    "message": "Dataset loaded successfully"
-                }
+            from app import EnhancedDataPreprocessor
+            preprocessor = EnhancedDataPreprocessor(df, dataset_id, sketch=sketch, lazy=self._lazy_option())
             
             # Get initial summary
             summary = preprocessor.get_comprehensive_summary()
+            if cache_key is not None:
+                self.upload_cache.add(cache_key, dataset_id, df, summary, preprocessor.summary_cache.copy(), warnings)
+            self._store(dataset_id, preprocessor)
             
             # Get sample data for preview (first 10 rows)
-            sample_data = df.head(10).fillna('null').to_dict('records')
+            sample_data = frame_json(df.head(10))
             
             logger.info(f"Dataset {dataset_id} uploaded successfully: {file.filename}")
             
@@ -77,13 +103,56 @@ class DatasetController:
                 'dataset_id': dataset_id,
                 'filename': file.filename,
                 'summary': summary,
-                'sample_data': sample_data
+                'sample_data': sample_data,
+                'warnings': warnings
             }, f'File "{file.filename}" uploaded successfully')
             
+        except IngestionError as e:
+            self._release_upload(dataset_id)
+            return standardize_response(False, error=str(e), status_code=400)
         except Exception as e:
+            self._release_upload(dataset_id)
             logger.error(f"Error uploading file: {str(e)}")
             return standardize_response(False, error=f'Error reading file: {str(e)}', status_code=400)
     
+    def _upload_from_cache(self, dataset_id, filename, cached):
+        """New dataset over an identical earlier upload's frame and summary"""
+        from app import EnhancedDataPreprocessor
+        # A shallow copy: the dataset replaces columns of its own frame, never the cached buffers
+        preprocessor = EnhancedDataPreprocessor(cached.frame.copy(deep=False), dataset_id, lazy=self._lazy_option())
+        preprocessor.summary_cache = cached.summary_cache.copy()
+        self._store(dataset_id, preprocessor)
+        
+        logger.info(f"Dataset {dataset_id} uploaded from cache: {filename}")
+        
+        return standardize_response(True, {
+            'dataset_id': dataset_id,
+            'filename': filename,
+            'summary': cached.summary,
+            'sample_data': frame_json(cached.frame.head(10)),
+            'warnings': cached.warnings,
+            'cached': True
+        }, f'File "{filename}" uploaded successfully')
+    
+    @staticmethod
+    def _lazy_option():
+        """lazy=true records operations until the data is read; the default is Config.LAZY_OPERATIONS"""
+        lazy = request.form.get('lazy')
+        return None if lazy is None else lazy.lower() == 'true'
+    
+    def _release_upload(self, dataset_id):
+        if self.upload_cache is not None:
+            self.upload_cache.release(dataset_id)
+    
+    def _store(self, dataset_id, preprocessor):
+        with self.dataset_lock:
+            self.datasets[dataset_id] = preprocessor
+            self.processing_status[dataset_id] = {
+                "status": "idle",
+                "progress": 0,
+                "message": "Dataset loaded successfully"
+            }
+    
     def get_preview(self, dataset_id):
         """Get dataset preview with pagination"""
         if dataset_id not in self.datasets:
@@ -96,6 +165,9 @@ class DatasetController:
         page = max(1, int(request.args.get('page', 1)))
         per_page = min(50, max(1, int(request.args.get('per_page', 10))))
         view_type = request.args.get('type', 'head').lower()
+        shape = request.args.get('shape', 'records').lower()
+        if shape not in FRAME_SHAPES:
+            return standardize_response(False, error=f'Invalid shape. Must be one of: {list(FRAME_SHAPES)}', status_code=400)
         
         # Calculate pagination
         start_idx = (page - 1) * per_page
@@ -104,22 +176,28 @@ class DatasetController:
         if view_type == 'tail':
             sample_df = df.tail(per_page)
         elif view_type == 'random':
-            # Fix: Use DataService for proper random sampling
-            sample_df = DataService.get_random_sample(df, per_page)
+            # Pages of one seeded permutation; pass the returned seed back to keep paging it
+            seed = request.args.get('seed', type=int)
+            seed = preprocessor.sampler.seed if seed is None else seed
+            sample_df = preprocessor.get_random_sample(per_page, page, seed)
         else:  # head
             sample_df = df.iloc[start_idx:end_idx]
         
-        # Convert to records and handle NaN values
-        data = sample_df.fillna('null').to_dict('records')
+        # Encoded straight from the frame; missing values are null
+        data = frame_json(sample_df, shape)
         
-        return standardize_response(True, {
+        result = {
             'data': data,
             'total_rows': len(df),
             'page': page,
             'per_page': per_page,
             'total_pages': (len(df) + per_page - 1) // per_page,
-            'view_type': view_type
-        }, "Preview data retrieved successfully")
+            'view_type': view_type,
+            'shape': shape
+        }
+        if view_type == 'random':
+            result['seed'] = seed
+        return standardize_response(True, result, "Preview data retrieved successfully")
     
     @staticmethod
     @validate_dataset_id
@@ -243,29 +321,19 @@ class DatasetController:
     @staticmethod
     @validate_dataset_id
     def export_dataset(dataset_id):
-        """Export processed dataset as CSV"""
+        """Export processed dataset as CSV, gzip-compressed CSV, Parquet or Feather"""
         try:
             dataset = data_service.get_dataset(dataset_id)
+        except ValueError as e:
+            return standardize_response(False, error=str(e), status_code=404)
+        
+        try:
             df = dataset['data']
+            stem = dataset['filename'].rsplit('.', 1)[0]
             
-            # Create CSV in memory
-            output = io.StringIO()
-            df.to_csv(output, index=False)
-            output.seek(0)
-            
-            # Convert to bytes
-            csv_data = io.BytesIO()
-            csv_data.write(output.getvalue().encode('utf-8'))
-            csv_data.seek(0)
-            
-            return send_file(
-                csv_data,
-                mimetype='text/csv',
-                as_attachment=True,
-                download_name=f'processed_{dataset["filename"]}'
-            )
+            return DatasetExporter.response(df, request.args.get('format', 'csv'), f'processed_{stem}')
         except ValueError as e:
-            return standardize_response(False, error=str(e), status_code=404)
+            return standardize_response(False, error=str(e), status_code=400)
         except Exception as e:
             return standardize_response(False, error=str(e), status_code=500)
     
@@ -273,48 +341,7 @@ class DatasetController:
     def _get_summary(df):
         """Generate dataset summary"""
         try:
-            summary = {
-                'shape': df.shape,
-                'columns': df.columns.tolist(),
-                'dtypes': {col: str(dtype) for col, dtype in df.dtypes.items()},
-                'missing_values': {col: int(count) for col, count in df.isnull().sum().items()},
-                'memory_usage': f"{df.memory_usage(deep=True).sum() / 1024:.2f} KB",
-                'duplicate_rows': int(df.duplicated().sum())
-            }
-            
-            # Numerical columns statistics
-            numerical_cols = df.select_dtypes(include=['number']).columns
-            if len(numerical_cols) > 0:
-                numerical_stats = {}
-                for col in numerical_cols:
-                    if df[col].notna().sum() > 0:
-                        numerical_stats[col] = {
-                            'count': int(df[col].count()),
-                            'mean': float(df[col].mean()),
-                            'std': float(df[col].std()),
-                            'min': float(df[col].min()),
-                            '25%': float(df[col].quantile(0.25)),
-                            '50%': float(df[col].quantile(0.50)),
-                            '75%': float(df[col].quantile(0.75)),
-                            'max': float(df[col].max())
-                        }
-                summary['numerical_stats'] = numerical_stats
-            
-            # Categorical columns statistics
-            categorical_cols = df.select_dtypes(include=['object', 'category']).columns
-            if len(categorical_cols) > 0:
-                categorical_stats = {}
-                for col in categorical_cols:
-                    if df[col].notna().sum() > 0:
-                        value_counts = df[col].value_counts().head(10)
-                        categorical_stats[col] = {
-                            'unique_count': int(df[col].nunique()),
-                            'top_values': {str(k): int(v) for k, v in value_counts.items()}
-                        }
-                summary['categorical_stats'] = categorical_stats
-            
-            return summary
-            
+            return SummaryEngine.compute_summary(df)
         except Exception as e:
             logger.error(f"Error generating summary: {str(e)}")
             raise
@@ -4,7 +4,15 @@ import uuid
 import threading
 from datetime import datetime
 from sklearn.preprocessing import StandardScaler, MinMaxScaler, LabelEncoder
-from sklearn.impute import SimpleImputer, KNNImputer
+from sklearn.impute import SimpleImputer
+from utils.summary_engine import SummaryEngine
+from utils.sampler import RowSampler
+from utils.knn_imputer import KNNImputation
+from utils.ingestion import fillna_preserving_categories
+from utils.job_executor import checkpoint
+from models.version_chain import VersionChain
+from models.dataset_store import DatasetStore
+from config.config import Config
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,39 +33,46 @@ class DataPreprocessor:
     """Enhanced data preprocessor with caching and status tracking"""
     
     def __init__(self, df, dataset_id):
-        self.df = df.copy()
-        self.original_df = df.copy()
+        # Working and original frames share column buffers until an operation rewrites them
+        self.versions = VersionChain(df, Config.MAX_DATASET_VERSIONS)
         self.dataset_id = dataset_id
         self.operations_log = []
         self.processing_status = ProcessingStatus()
-        # Cache for random samples
-        self.cached_random_sample = None
-        self.random_sample_timestamp = None
+        self.last_access = datetime.now()
+        # Seeded row permutations behind random samples
+        self.sampler = RowSampler()
         
-    def get_random_sample(self, n=5, force_refresh=False):
-        """Get cached random sample or generate new one"""
-        current_time = datetime.now()
-        
-        # Check if we need to refresh the cache
-        if (force_refresh or 
-            self.cached_random_sample is None or 
-            self.random_sample_timestamp is None or
-            (current_time - self.random_sample_timestamp).seconds > 30):
-            
-            # Generate new random sample
-            sample_size = min(n, len(self.df))
-            if sample_size > 0:
-                random_seed = int(current_time.timestamp() * 1000000) % 2**32
-                self.cached_random_sample = self.df.sample(n=sample_size, random_state=random_seed)
-                self.random_sample_timestamp = current_time
-                logger.info(f"Generated new random sample for dataset {self.dataset_id}")
-            else:
-                self.cached_random_sample = self.df.head(0)
+    @property
+    def df(self):
+        """Working frame of the dataset"""
+        return self.versions.working
+    
+    @df.setter
+    def df(self, value):
+        self.versions.working = value
+    
+    @property
+    def original_df(self):
+        """Frame as uploaded"""
+        return self.versions.original
+    
+    def update_access_time(self):
+        """Update the last access time"""
+        self.last_access = datetime.now()
         
-        return self.cached_random_sample
+    def get_random_sample(self, n=5, page=1, seed=None):
+        """Page of the dataset's random row order; the same seed always gives the same pages"""
+        return self.sampler.page(self.df, page, n, seed)
+    
+    def get_stratified_sample(self, n, column, seed=None):
+        """Random sample of n rows stratified by column, with the rows drawn per value"""
+        return self.sampler.stratified(self.df, n, column, seed)
         
     def update_status(self, status, progress=None, message=""):
         """Update processing status"""
+        if status == "processing":
+            # Lets a background job stop between steps once it was cancelled
+            checkpoint(progress, message)
         self.processing_status.status = status
         if progress is not None:
             self.processing_status.progress = progress
@@ -102,14 +117,27 @@ class DataPreprocessor:
         else:
             return obj
     
-    def handle_missing_values(self, strategy='mean', columns=None):
-        """Handle missing values with progress tracking"""
+    def handle_missing_values(self, strategy='mean', columns=None, features=None, n_neighbors=None, max_donors=None):
+        """Handle missing values with progress tracking; knn uses the numerical feature columns"""
         self.update_status("processing", 0, "Starting missing value imputation...")
         
         columns = self.validate_columns(columns)
         results = {}
         total_columns = len(columns)
         
+        knn_filled, knn_results = {}, {}
+        if strategy == 'knn':
+            if features is not None:
+                features = self.validate_columns(features, 'numeric')
+            knn_filled, knn_results = KNNImputation.impute(
+                self.df,
+                [col for col in columns if pd.api.types.is_numeric_dtype(self.df[col]) and self.df[col].isnull().any()],
+                features, n_neighbors, max_donors,
+                progress=lambda done, total: self.update_status(
+                    "processing", int(done / total * 100), f"Imputed {done} of {total} missing values"
+                )
+            )
+        
         for i, col in enumerate(columns):
             progress = int((i / total_columns) * 100)
             self.update_status("processing", progress, f"Processing column: {col}")
@@ -120,6 +148,12 @@ class DataPreprocessor:
                 results[col] = {'status': 'no_missing', 'filled': 0}
                 continue
             
+            if col in knn_results:
+                if col in knn_filled:
+                    self.df[col] = knn_filled[col]
+                results[col] = knn_results[col]
+                continue
+            
             try:
                 if pd.api.types.is_numeric_dtype(self.df[col]):
                     # Numerical data
@@ -132,15 +166,11 @@ class DataPreprocessor:
                         fill_value = mode_series.iloc[0] if not mode_series.empty else 0
                     elif strategy == 'constant':
                         fill_value = 0
-                    elif strategy == 'knn':
-                        imputer = KNNImputer(n_neighbors=min(5, len(self.df) - 1))
-                        self.df[col] = imputer.fit_transform(self.df[[col]]).flatten()
-                        fill_value = None
                     else:
                         fill_value = self.df[col].mean()
                     
                     if fill_value is not None:
-                        self.df[col].fillna(fill_value, inplace=True)
+                        self.df[col] = self.df[col].fillna(fill_value)
                 else:
                     # Categorical data
                     if strategy == 'mode':
@@ -149,11 +179,11 @@ class DataPreprocessor:
                     elif strategy == 'constant':
                         fill_value = 'Unknown'
                     else:
-                        self.df[col].fillna(method='ffill', inplace=True)
+                        self.df[col] = self.df[col].ffill()
                         fill_value = 'Unknown'
                     
                     if fill_value is not None:
-                        self.df[col].fillna(fill_value, inplace=True)
+                        self.df[col] = fillna_preserving_categories(self.df[col], fill_value)
                 
                 missing_count_after = self.df[col].isnull().sum()
                 filled_count = missing_count_before - missing_count_after
@@ -172,10 +202,6 @@ class DataPreprocessor:
                     'error': str(e)
                 }
         
-        # Clear random sample cache when data changes
-        self.cached_random_sample = None
-        self.random_sample_timestamp = None
-        
         self.update_status("completed", 100, "Missing value imputation completed")
         
         # Log operation
@@ -186,55 +212,17 @@ class DataPreprocessor:
             'results': results,
             'timestamp': datetime.now().isoformat()
         }
+        if strategy == 'knn':
+            operation_log.update(features=features, n_neighbors=n_neighbors, max_donors=max_donors)
         self.operations_log.append(operation_log)
+        self.versions.commit(operation_log['operation'])
         
         return results
     
     def get_comprehensive_summary(self):
         """Get comprehensive data summary"""
         try:
-            summary = {
-                'shape': self.df.shape,
-                'columns': self.df.columns.tolist(),
-                'dtypes': {col: str(dtype) for col, dtype in self.df.dtypes.items()},
-                'missing_values': {col: int(count) for col, count in self.df.isnull().sum().items()},
-                'memory_usage': f"{self.df.memory_usage(deep=True).sum() / 1024:.2f} KB",
-                'duplicate_rows': int(self.df.duplicated().sum())
-            }
-            
-            # Numerical columns statistics
-            numerical_cols = self.df.select_dtypes(include=[np.number]).columns
-            if len(numerical_cols) > 0:
-                numerical_stats = {}
-                for col in numerical_cols:
-                    if self.df[col].notna().sum() > 0:
-                        numerical_stats[col] = {
-                            'count': int(self.df[col].count()),
-                            'mean': self.safe_convert_to_json(self.df[col].mean()),
-                            'std': self.safe_convert_to_json(self.df[col].std()),
-                            'min': self.safe_convert_to_json(self.df[col].min()),
-                            '25%': self.safe_convert_to_json(self.df[col].quantile(0.25)),
-                            '50%': self.safe_convert_to_json(self.df[col].quantile(0.50)),
-                            '75%': self.safe_convert_to_json(self.df[col].quantile(0.75)),
-                            'max': self.safe_convert_to_json(self.df[col].max())
-                        }
-                summary['numerical_stats'] = numerical_stats
-            
-            # Categorical columns statistics
-            categorical_cols = self.df.select_dtypes(include=['object', 'category']).columns
-            if len(categorical_cols) > 0:
-                categorical_stats = {}
-                for col in categorical_cols:
-                    if self.df[col].notna().sum() > 0:
-                        value_counts = self.df[col].value_counts().head(10)
-                        categorical_stats[col] = {
-                            'unique_count': int(self.df[col].nunique()),
-                            'top_values': {str(k): int(v) for k, v in value_counts.items()}
-                        }
-                summary['categorical_stats'] = categorical_stats
-            
-            return summary
-            
+            return SummaryEngine.compute_summary(self.df)
         except Exception as e:
             logger.error(f"Error generating summary: {str(e)}")
             raise
@@ -243,9 +231,16 @@ class DatasetStorage:
     """Thread-safe dataset storage"""
     
     def __init__(self):
-        self.datasets = {}
         self.processing_status = {}
         self.lock = threading.Lock()
+        # Datasets beyond the memory budget are spilled to disk; expired ones are removed
+        self.datasets = DatasetStore(
+            Config.DATASET_MEMORY_BUDGET,
+            Config.SPILL_FOLDER,
+            expiry=Config.DATASET_EXPIRY,
+            cleanup_interval=Config.CLEANUP_INTERVAL,
+            on_remove=lambda dataset_id: self.processing_status.pop(dataset_id, None)
+        )
     
     def store_dataset(self, dataset_id, df):
         """Store a new dataset"""
@@ -289,12 +284,11 @@ class DatasetStorage:
     def delete_dataset(self, dataset_id):
         """Delete dataset"""
         with self.lock:
+            existed = dataset_id in self.processing_status
             if dataset_id in self.datasets:
                 del self.datasets[dataset_id]
-            if dataset_id in self.processing_status:
-                del self.processing_status[dataset_id]
-                return True
-            return False
+            self.processing_status.pop(dataset_id, None)
+            return existed
     
     def get_dataset_count(self):
         """Get total number of datasets"""
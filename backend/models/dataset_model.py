@@ -1,11 +1,27 @@
 import pandas as pd
 import numpy as np
-import io
 from datetime import datetime
-from typing import Dict, Any, List, Optional, Tuple, Union
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
 import threading
-from sklearn.preprocessing import StandardScaler, MinMaxScaler, LabelEncoder, RobustScaler, MaxAbsScaler
-from sklearn.impute import SimpleImputer, KNNImputer
+from sklearn.preprocessing import StandardScaler, MinMaxScaler, RobustScaler, MaxAbsScaler
+from sklearn.impute import SimpleImputer
+from utils.summary_engine import SummaryCache
+from utils.sketches import DatasetSketch
+from utils.correlation_engine import CorrelationEngine, CorrelationCache
+from utils.data_profiler import ProfileCache
+from utils.data_analyzer import DataAnalyzer
+from utils.knn_imputer import KNNImputation
+from utils.encoding import LabelMapping, LabelEncodings, CategoricalEncoder, ENCODING_METHODS, MISSING_CODE
+from utils.outlier_engine import OutlierEngine, FLAG_COLUMN
+from utils.ingestion import fillna_preserving_categories
+from utils.exporter import DatasetExporter
+from utils.recipe import scaler_params
+from utils.operation_plan import OperationPlan
+from utils.job_executor import checkpoint, current_job
+from utils.progress import ProgressChannel
+from utils.column_parallel import ColumnParallel
+from models.version_chain import VersionChain
+from config.config import Config
 
 class ProcessingStatus:
     def __init__(self):
@@ -20,15 +36,43 @@ class ProcessingStatus:
 class Dataset:
     """Dataset model with data processing functionality"""
     
-    def __init__(self, dataset_id: str, df: pd.DataFrame, filename: str):
+    def __init__(self, dataset_id: str, df: pd.DataFrame, filename: str,
+                 sketch: Optional[DatasetSketch] = None, lazy: Optional[bool] = None):
         self.dataset_id = dataset_id
-        self.df = df.copy()
-        self.original_df = df.copy()
+        # Working and original frames share column buffers until an operation rewrites them
+        self.versions = VersionChain(df, Config.MAX_DATASET_VERSIONS)
         self.filename = filename
         self.operations_log = []
         self.processing_status = ProcessingStatus()
+        self.progress_channel = ProgressChannel()
         self.lock = threading.RLock()  # Reentrant lock for thread safety
         self.last_access = datetime.now()
+        self.summary_cache = SummaryCache()
+        if sketch is not None:
+            # Ingestion sketches answer summaries of large datasets until columns are rewritten
+            self.summary_cache.attach_sketches(sketch, df)
+        # Correlation matrices of the current version
+        self.correlation_cache = CorrelationCache()
+        # Column profile behind the quality report, of the current version
+        self.profile_cache = ProfileCache()
+        # Class mappings of label-encoded columns, for new data and decoded exports
+        self.label_encodings = LabelEncodings()
+        # Operations recorded while lazy, run when the data is next read
+        self.plan = OperationPlan(Config.LAZY_OPERATIONS if lazy is None else lazy)
+    
+    @property
+    def df(self) -> pd.DataFrame:
+        """Working frame of the dataset"""
+        return self.versions.working
+    
+    @df.setter
+    def df(self, value: pd.DataFrame) -> None:
+        self.versions.working = value
+    
+    @property
+    def original_df(self) -> pd.DataFrame:
+        """Frame as uploaded"""
+        return self.versions.original
     
     def update_access_time(self):
         """Update the last access time"""
@@ -36,11 +80,17 @@ class Dataset:
     
     def update_status(self, status: str, progress: Optional[int] = None, message: str = ""):
         """Update processing status"""
-        with self.lock:
-            self.processing_status.status = status
-            if progress is not None:
-                self.processing_status.progress = progress
-            self.processing_status.message = message
+        if status == "processing":
+            # Lets a background job stop between steps once it was cancelled
+            checkpoint(progress, message)
+        self.processing_status.status = status
+        if progress is not None:
+            self.processing_status.progress = progress
+        self.processing_status.message = message
+        # Lock-free and coalesced; status requests and event streams read the channel
+        job = current_job()
+        self.progress_channel.publish(status, self.processing_status.progress, message,
+                                      job_id=job.job_id if job else None)
     
     def validate_columns(self, columns: Optional[List[str]] = None, required_type: Optional[str] = None) -> List[str]:
         """Validate column names and types"""
@@ -82,65 +132,111 @@ class Dataset:
         else:
             return obj
     
-    def get_comprehensive_summary(self) -> Dict[str, Any]:
-        """Get comprehensive data summary"""
+    def _parallel_columns(self, columns: List[str]) -> List[str]:
+        """Numerical columns worth sharding across the column process pool"""
+        eligible = ColumnParallel.eligible_columns(self.df, columns)
+        return eligible if ColumnParallel.should_run(self.df, eligible) else []
+    
+    def _run_column_parallel(self, columns: List[str], operation: str, params: Dict[str, Any],
+                             total_columns: int, verb: str) -> Dict[str, Dict[str, Any]]:
+        """Run a column-local operation on the process pool and write the new columns back"""
+        def report(done):
+            self.update_status("processing", int((done / total_columns) * 100),
+                               f"{verb} columns in parallel: {done}/{len(columns)}")
+        
+        arrays, results = ColumnParallel.run(self.df, columns, operation, params, report)
+        for col in columns:
+            self.df[col] = arrays[col]
+        return results
+    
+    def materialize(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Working frame with the pending operation plan applied.
+        
+        With columns, only those columns are computed, on a scratch copy, and
+        the plan stays pending.
+        """
+        with self.lock:
+            if self.plan.pending:
+                if columns is not None:
+                    return self.plan.project(self.df, columns, self._scratch)
+                self.plan.execute(self)
+            return self.df if columns is None else self.df[self.validate_columns(columns)]
+    
+    def _scratch(self, df: pd.DataFrame) -> 'Dataset':
+        """Eager dataset over df, for computing columns of the plan without committing them"""
+        return Dataset(self.dataset_id, df, self.filename, lazy=False)
+    
+    def set_lazy(self, lazy: bool) -> List[Dict[str, Any]]:
+        """Switch lazy mode; leaving it runs the pending plan and returns the executed steps"""
+        with self.lock:
+            self.plan.lazy = lazy
+            return [] if lazy else self.plan.execute(self)
+    
+    def get_plan(self) -> Dict[str, Any]:
+        """Pending operations as recorded and in the order they would run"""
+        with self.lock:
+            return self.plan.describe()
+    
+    def get_preview(self, page: int = 1, per_page: int = 10, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Page of rows; with columns, only those columns are materialized"""
+        df = self.materialize(columns)
+        start = (page - 1) * per_page
+        return df.iloc[start:start + per_page]
+    
+    def get_comprehensive_summary(self, exact: Optional[bool] = None) -> Dict[str, Any]:
+        """Get comprehensive data summary; exact=True never uses approximate statistics"""
         with self.lock:
+            self.materialize()
             try:
-                summary = {
-                    'shape': self.df.shape,
-                    'columns': self.df.columns.tolist(),
-                    'dtypes': {col: str(dtype) for col, dtype in self.df.dtypes.items()},
-                    'missing_values': {col: int(count) for col, count in self.df.isnull().sum().items()},
-                    'memory_usage': f"{self.df.memory_usage(deep=True).sum() / 1024:.2f} KB",
-                    'duplicate_rows': int(self.df.duplicated().sum())
-                }
-                
-                # Numerical columns statistics
-                numerical_cols = self.df.select_dtypes(include=[np.number]).columns
-                if len(numerical_cols) > 0:
-                    numerical_stats = {}
-                    for col in numerical_cols:
-                        if self.df[col].notna().sum() > 0:
-                            numerical_stats[col] = {
-                                'count': int(self.df[col].count()),
-                                'mean': self.safe_convert_to_json(self.df[col].mean()),
-                                'std': self.safe_convert_to_json(self.df[col].std()),
-                                'min': self.safe_convert_to_json(self.df[col].min()),
-                                '25%': self.safe_convert_to_json(self.df[col].quantile(0.25)),
-                                '50%': self.safe_convert_to_json(self.df[col].quantile(0.50)),
-                                '75%': self.safe_convert_to_json(self.df[col].quantile(0.75)),
-                                'max': self.safe_convert_to_json(self.df[col].max())
-                            }
-                    summary['numerical_stats'] = numerical_stats
-                
-                # Categorical columns statistics
-                categorical_cols = self.df.select_dtypes(include=['object', 'category']).columns
-                if len(categorical_cols) > 0:
-                    categorical_stats = {}
-                    for col in categorical_cols:
-                        if self.df[col].notna().sum() > 0:
-                            value_counts = self.df[col].value_counts().head(10)
-                            categorical_stats[col] = {
-                                'unique_count': int(self.df[col].nunique()),
-                                'top_values': {str(k): int(v) for k, v in value_counts.items()}
-                            }
-                    summary['categorical_stats'] = categorical_stats
-                
-                return summary
-                
+                return self.summary_cache.build(self.df, exact)
             except Exception as e:
                 raise RuntimeError(f"Error generating summary: {str(e)}")
     
-    def handle_missing_values(self, strategy: str = 'mean', columns: Optional[List[str]] = None) -> Dict[str, Any]:
-        """Handle missing values with progress tracking"""
+    def handle_missing_values(self, strategy: str = 'mean', columns: Optional[List[str]] = None,
+                              features: Optional[List[str]] = None, n_neighbors: Optional[int] = None,
+                              max_donors: Optional[int] = None) -> Dict[str, Any]:
+        """Handle missing values with progress tracking.
+        
+        strategy='knn' fills numerical columns from their nearest rows over the
+        numerical feature columns (default: all), averaging n_neighbors donors
+        out of at most max_donors sampled rows.
+        """
         with self.lock:
+            if self.plan.recording:
+                return self.plan.record('handle_missing_values', strategy=strategy, columns=columns, features=features,
+                                        n_neighbors=n_neighbors, max_donors=max_donors)
             self.update_status("processing", 0, "Starting missing value imputation...")
             
             columns = self.validate_columns(columns)
             results = {}
             total_columns = len(columns)
             
+            if strategy == 'knn':
+                if features is not None:
+                    features = self.validate_columns(features, 'numeric')
+                knn_filled, knn_results = KNNImputation.impute(
+                    self.df,
+                    [col for col in columns if pd.api.types.is_numeric_dtype(self.df[col]) and self.df[col].isnull().any()],
+                    features, n_neighbors, max_donors,
+                    progress=lambda done, total: self.update_status(
+                        "processing", int(done / total * 100), f"Imputed {done} of {total} missing values"
+                    )
+                )
+                for col, filled in knn_filled.items():
+                    self.df[col] = filled
+                results.update(knn_results)
+            
+            parallel_columns = []
+            if strategy != 'knn':
+                missing_counts = self.df[columns].isnull().sum()
+                parallel_columns = self._parallel_columns([col for col in columns if missing_counts[col] > 0])
+            if parallel_columns:
+                results.update(self._run_column_parallel(
+                    parallel_columns, 'fill', {'strategy': strategy}, total_columns, "Imputing"))
+            
             for i, col in enumerate(columns):
+                if col in results:
+                    continue
                 progress = int((i / total_columns) * 100)
                 self.update_status("processing", progress, f"Processing column: {col}")
                 
@@ -162,16 +258,11 @@ class Dataset:
                             fill_value = mode_series.iloc[0] if not mode_series.empty else 0
                         elif strategy == 'constant':
                             fill_value = 0
-                        elif strategy == 'knn':
-                            # KNN imputation
-                            imputer = KNNImputer(n_neighbors=min(5, len(self.df) - 1))
-                            self.df[col] = imputer.fit_transform(self.df[[col]]).flatten()
-                            fill_value = None
                         else:
                             fill_value = self.df[col].mean()
                         
                         if fill_value is not None:
-                            self.df[col].fillna(fill_value, inplace=True)
+                            self.df[col] = self.df[col].fillna(fill_value)
                     else:
                         # Categorical data
                         if strategy == 'mode':
@@ -181,11 +272,11 @@ class Dataset:
                             fill_value = 'Unknown'
                         else:
                             # Forward fill for categorical
-                            self.df[col].fillna(method='ffill', inplace=True)
+                            self.df[col] = self.df[col].ffill()
                             fill_value = 'Unknown'
                         
                         if fill_value is not None:
-                            self.df[col].fillna(fill_value, inplace=True)
+                            self.df[col] = fillna_preserving_categories(self.df[col], fill_value)
                     
                     missing_count_after = self.df[col].isnull().sum()
                     filled_count = missing_count_before - missing_count_after
@@ -203,6 +294,9 @@ class Dataset:
                         'error': str(e)
                     }
             
+            if parallel_columns or strategy == 'knn':
+                results = {col: results[col] for col in columns}
+            self.summary_cache.invalidate([col for col, result in results.items() if result['status'] != 'no_missing'])
             self.update_status("completed", 100, "Missing value imputation completed")
             
             # Log operation
@@ -213,13 +307,18 @@ class Dataset:
                 'results': results,
                 'timestamp': datetime.now().isoformat()
             }
+            if strategy == 'knn':
+                operation_log.update(features=features, n_neighbors=n_neighbors, max_donors=max_donors)
             self.operations_log.append(operation_log)
+            self.versions.commit(operation_log['operation'])
             
             return results
     
     def remove_nulls(self, columns: Optional[List[str]] = None) -> Dict[str, Any]:
         """Remove rows with null values in specified columns"""
         with self.lock:
+            if self.plan.recording:
+                return self.plan.record('remove_nulls', columns=columns)
             self.update_status("processing", 0, "Starting null value removal...")
             
             initial_rows = len(self.df)
@@ -235,6 +334,8 @@ class Dataset:
             final_rows = len(self.df)
             removed_count = initial_rows - final_rows
             
+            if removed_count:
+                self.summary_cache.invalidate_rows()
             self.update_status("completed", 100, f"Removed {removed_count} rows with null values")
             
             result = {
@@ -251,12 +352,15 @@ class Dataset:
                 'timestamp': datetime.now().isoformat()
             }
             self.operations_log.append(operation_log)
+            self.versions.commit(operation_log['operation'])
             
             return result
     
     def normalize_data(self, method: str = 'standard', columns: Optional[List[str]] = None) -> Dict[str, Any]:
         """Normalize numerical columns with progress tracking"""
         with self.lock:
+            if self.plan.recording:
+                return self.plan.record('normalize_data', method=method, columns=columns)
             self.update_status("processing", 0, "Starting data normalization...")
             
             if columns is None:
@@ -267,7 +371,14 @@ class Dataset:
             results = {}
             total_columns = len(columns)
             
+            parallel_columns = self._parallel_columns(columns)
+            if parallel_columns:
+                results.update(self._run_column_parallel(
+                    parallel_columns, 'scale', {'method': method, 'skip_zero_iqr': True}, total_columns, "Normalizing"))
+            
             for i, col in enumerate(columns):
+                if col in results:
+                    continue
                 progress = int((i / total_columns) * 100)
                 self.update_status("processing", progress, f"Normalizing column: {col}")
                 
@@ -279,12 +390,15 @@ class Dataset:
                         'max': self.safe_convert_to_json(self.df[col].max())
                     }
                     
+                    center, scale = 0.0, 1.0
                     if method == 'standard':
                         scaler = StandardScaler()
                         self.df[col] = scaler.fit_transform(self.df[[col]]).flatten()
+                        center, scale = scaler_params(scaler)
                     elif method == 'minmax':
                         scaler = MinMaxScaler()
                         self.df[col] = scaler.fit_transform(self.df[[col]]).flatten()
+                        center, scale = scaler_params(scaler)
                     elif method == 'robust':
                         # Robust scaling (median and IQR)
                         median = self.df[col].median()
@@ -293,6 +407,7 @@ class Dataset:
                         iqr = q75 - q25
                         if iqr != 0:
                             self.df[col] = (self.df[col] - median) / iqr
+                            center, scale = median, iqr
                     
                     new_stats = {
                         'mean': self.safe_convert_to_json(self.df[col].mean()),
@@ -305,7 +420,10 @@ class Dataset:
                         'status': 'success',
                         'method': method,
                         'original_stats': original_stats,
-                        'new_stats': new_stats
+                        'new_stats': new_stats,
+                        # Fitted transform x -> (x - center) / scale, replayed by recipes
+                        'center': self.safe_convert_to_json(center),
+                        'scale': self.safe_convert_to_json(scale)
                     }
                     
                 except Exception as e:
@@ -314,6 +432,9 @@ class Dataset:
                         'error': str(e)
                     }
             
+            if parallel_columns:
+                results = {col: results[col] for col in columns}
+            self.summary_cache.invalidate(columns, preserves_duplicates=True)
             self.update_status("completed", 100, "Data normalization completed")
             
             # Log operation
@@ -325,12 +446,15 @@ class Dataset:
                 'timestamp': datetime.now().isoformat()
             }
             self.operations_log.append(operation_log)
+            self.versions.commit(operation_log['operation'])
             
             return results
     
     def scale_data(self, method: str = 'standard', columns: Optional[List[str]] = None) -> Dict[str, Any]:
         """Scale numerical columns"""
         with self.lock:
+            if self.plan.recording:
+                return self.plan.record('scale_data', method=method, columns=columns)
             self.update_status("processing", 0, "Starting data scaling...")
             
             if columns is None:
@@ -341,7 +465,14 @@ class Dataset:
             results = {}
             total_columns = len(columns)
             
+            parallel_columns = self._parallel_columns(columns)
+            if parallel_columns:
+                results.update(self._run_column_parallel(
+                    parallel_columns, 'scale', {'method': method}, total_columns, "Scaling"))
+            
             for i, col in enumerate(columns):
+                if col in results:
+                    continue
                 progress = int((i / total_columns) * 100)
                 self.update_status("processing", progress, f"Scaling column: {col}")
                 
@@ -353,6 +484,7 @@ class Dataset:
                         'max': self.safe_convert_to_json(self.df[col].max())
                     }
                     
+                    scaler = None
                     if method == 'standard':
                         scaler = StandardScaler()
                         self.df[col] = scaler.fit_transform(self.df[[col]]).flatten()
@@ -365,6 +497,7 @@ class Dataset:
                     elif method == 'robust':
                         scaler = RobustScaler()
                         self.df[col] = scaler.fit_transform(self.df[[col]]).flatten()
+                    center, scale = scaler_params(scaler) if scaler is not None else (0.0, 1.0)
                     
                     new_stats = {
                         'mean': self.safe_convert_to_json(self.df[col].mean()),
@@ -377,7 +510,10 @@ class Dataset:
                         'status': 'success',
                         'method': method,
                         'original_stats': original_stats,
-                        'new_stats': new_stats
+                        'new_stats': new_stats,
+                        # Fitted transform x -> (x - center) / scale, replayed by recipes
+                        'center': self.safe_convert_to_json(center),
+                        'scale': self.safe_convert_to_json(scale)
                     }
                     
                 except Exception as e:
@@ -386,6 +522,9 @@ class Dataset:
                         'error': str(e)
                     }
             
+            if parallel_columns:
+                results = {col: results[col] for col in columns}
+            self.summary_cache.invalidate(columns, preserves_duplicates=True)
             self.update_status("completed", 100, "Data scaling completed")
             
             # Log operation
@@ -397,12 +536,20 @@ class Dataset:
                 'timestamp': datetime.now().isoformat()
             }
             self.operations_log.append(operation_log)
+            self.versions.commit(operation_log['operation'])
             
             return results
     
-    def encode_categorical(self, method: str = 'label', columns: Optional[List[str]] = None) -> Dict[str, Any]:
-        """Encode categorical variables with progress tracking"""
+    def encode_categorical(self, method: str = 'label', columns: Optional[List[str]] = None,
+                           n_buckets: Optional[int] = None) -> Dict[str, Any]:
+        """Encode categorical variables with progress tracking.
+        
+        label rewrites columns in place; onehot, hashing (n_buckets indicator
+        columns) and binary replace them with new columns, added in one concat.
+        """
         with self.lock:
+            if self.plan.recording:
+                return self.plan.record('encode_categorical', method=method, columns=columns, n_buckets=n_buckets)
             self.update_status("processing", 0, "Starting categorical encoding...")
             
             if columns is None:
@@ -410,27 +557,33 @@ class Dataset:
             else:
                 columns = self.validate_columns(columns, 'categorical')
             
+            if method not in ENCODING_METHODS:
+                raise ValueError(f"Invalid method. Must be one of: {list(ENCODING_METHODS)}")
+            n_buckets = n_buckets or Config.HASHING_BUCKETS
+            
             results = {}
             total_columns = len(columns)
+            touched_columns = list(columns)
+            new_blocks = []
             
             for i, col in enumerate(columns):
                 progress = int((i / total_columns) * 100)
                 self.update_status("processing", progress, f"Encoding column: {col}")
                 
                 try:
-                    unique_values = self.df[col].nunique()
-                    
                     if method == 'label':
-                        le = LabelEncoder()
-                        # Handle NaN values
-                        mask = self.df[col].notna()
-                        if mask.sum() > 0:
-                            self.df.loc[mask, col] = le.fit_transform(self.df.loc[mask, col])
+                        # Compact integer codes; missing values get MISSING_CODE
+                        mapping, codes = LabelMapping.fit_transform(self.df[col])
+                        if len(mapping.classes) > 0:
+                            self.df[col] = pd.Series(codes, index=self.df.index)
+                            self.label_encodings.record(col, mapping, self.df[col])
                             results[col] = {
                                 'status': 'success',
                                 'method': 'label',
-                                'unique_values': unique_values,
-                                'classes': le.classes_.tolist()
+                                'unique_values': len(mapping.classes),
+                                'classes': mapping.classes.tolist(),
+                                'dtype': mapping.dtype.name,
+                                'missing_code': MISSING_CODE
                             }
                         else:
                             results[col] = {
@@ -439,30 +592,64 @@ class Dataset:
                             }
                             
                     elif method == 'onehot':
-                        # One-hot encoding
-                        if unique_values <= 20:  # Reasonable limit for one-hot
-                            dummies = pd.get_dummies(self.df[col], prefix=col, dummy_na=True)
-                            self.df = pd.concat([self.df.drop(col, axis=1), dummies], axis=1)
+                        # Sparse indicators, added with every other new column in one concat
+                        unique_values = self.df[col].nunique()
+                        if unique_values <= Config.ONEHOT_MAX_CATEGORIES:
+                            block = CategoricalEncoder.onehot(self.df[col])
+                            new_blocks.append(block)
                             results[col] = {
                                 'status': 'success',
                                 'method': 'onehot',
                                 'unique_values': unique_values,
-                                'new_columns': dummies.columns.tolist()
+                                'new_columns': block.columns.tolist(),
+                                'sparse': True
                             }
                         else:
                             results[col] = {
                                 'status': 'skipped',
                                 'reason': 'too_many_categories',
                                 'unique_values': unique_values,
-                                'recommendation': 'Use label encoding or reduce categories'
+                                'recommendation': 'Use hashing or binary encoding'
                             }
-                            
+                    
+                    elif method == 'hashing':
+                        block, buckets_used = CategoricalEncoder.hashing(self.df[col], n_buckets)
+                        new_blocks.append(block)
+                        results[col] = {
+                            'status': 'success',
+                            'method': 'hashing',
+                            'unique_values': int(self.df[col].nunique()),
+                            'n_buckets': n_buckets,
+                            'buckets_used': buckets_used,
+                            'new_columns': block.columns.tolist(),
+                            'sparse': True
+                        }
+                    
+                    elif method == 'binary':
+                        block, mapping = CategoricalEncoder.binary(self.df[col])
+                        new_blocks.append(block)
+                        results[col] = {
+                            'status': 'success',
+                            'method': 'binary',
+                            'unique_values': len(mapping.classes),
+                            # Bits of code + 1 encode classes[code]; all zeros is missing
+                            'classes': mapping.classes.tolist(),
+                            'new_columns': block.columns.tolist()
+                        }
+                    
                 except Exception as e:
                     results[col] = {
                         'status': 'error',
                         'error': str(e)
                     }
             
+            if new_blocks:
+                encoded = [col for col in columns if results.get(col, {}).get('status') == 'success']
+                self.df = pd.concat([self.df.drop(columns=encoded), *new_blocks], axis=1)
+                for block in new_blocks:
+                    touched_columns.extend(block.columns)
+            # Only label codes map values 1:1; other methods drop the source column and hashing merges values
+            self.summary_cache.invalidate(touched_columns, preserves_duplicates=(method == 'label'))
             self.update_status("completed", 100, "Categorical encoding completed")
             
             # Log operation
@@ -470,100 +657,105 @@ class Dataset:
                 'operation': 'encode_categorical',
                 'method': method,
                 'columns': columns,
+                'n_buckets': n_buckets if method == 'hashing' else None,
                 'results': results,
                 'timestamp': datetime.now().isoformat()
             }
             self.operations_log.append(operation_log)
+            self.versions.commit(operation_log['operation'])
             
             return results
     
     def remove_outliers(self, method: str = 'iqr', columns: Optional[List[str]] = None,
-                       threshold: float = 1.5) -> Dict[str, Any]:
-        """Remove outliers with progress tracking"""
+                       threshold: float = 1.5, mode: str = 'remove') -> Dict[str, Any]:
+        """Remove or flag outliers with progress tracking.
+
+        Every column's bounds come from the same rows and the column masks are
+        combined, so rows are filtered once; mode='flag' keeps all rows and writes
+        the combined mask to the 'is_outlier' column instead.
+        """
         with self.lock:
-            self.update_status("processing", 0, "Starting outlier removal...")
-            
+            if self.plan.recording:
+                return self.plan.record('remove_outliers', method=method, columns=columns, threshold=threshold, mode=mode)
+            self.update_status("processing", 0, "Starting outlier detection...")
+
             if columns is None:
                 columns = self.df.select_dtypes(include=[np.number]).columns.tolist()
             else:
                 columns = self.validate_columns(columns, 'numeric')
-            
-            results = {}
-            initial_rows = len(self.df)
+
             total_columns = len(columns)
-            
-            for i, col in enumerate(columns):
-                progress = int((i / total_columns) * 100)
-                self.update_status("processing", progress, f"Processing column: {col}")
-                
-                try:
-                    if method == 'iqr':
-                        Q1 = self.df[col].quantile(0.25)
-                        Q3 = self.df[col].quantile(0.75)
-                        IQR = Q3 - Q1
-                        lower_bound = Q1 - threshold * IQR
-                        upper_bound = Q3 + threshold * IQR
-                        
-                        outliers_mask = (self.df[col] < lower_bound) | (self.df[col] > upper_bound)
-                        outliers_count = outliers_mask.sum()
-                        
-                        self.df = self.df[~outliers_mask]
-                        
-                    elif method == 'zscore':
-                        z_scores = np.abs((self.df[col] - self.df[col].mean()) / self.df[col].std())
-                        outliers_mask = z_scores > threshold
-                        outliers_count = outliers_mask.sum()
-                        
-                        self.df = self.df[~outliers_mask]
-                    
-                    results[col] = {
-                        'status': 'success',
-                        'method': method,
-                        'outliers_removed': int(outliers_count),
-                        'threshold': threshold
-                    }
-                    
-                except Exception as e:
-                    results[col] = {
-                        'status': 'error',
-                        'error': str(e)
-                    }
-            
-            final_rows = len(self.df)
-            total_removed = initial_rows - final_rows
-            
-            self.update_status("completed", 100, f"Outlier removal completed. Removed {total_removed} rows")
-            
+            mask, results = OutlierEngine.detect(
+                self.df, columns, method, threshold, mode,
+                progress=lambda done: self.update_status(
+                    "processing", int(done / total_columns * 100), f"Checked {done} of {total_columns} columns"
+                )
+            )
+            flagged = int(mask.sum())
+
+            if mode == 'flag':
+                self.df[FLAG_COLUMN] = mask
+                total_removed = 0
+                self.summary_cache.invalidate([FLAG_COLUMN], preserves_duplicates=True)
+                self.update_status("completed", 100, f"Outlier detection completed. Flagged {flagged} rows")
+            else:
+                total_removed = flagged
+                if total_removed:
+                    self.df = self.df[~mask]
+                    self.summary_cache.invalidate_rows()
+                self.update_status("completed", 100, f"Outlier removal completed. Removed {total_removed} rows")
+
             # Log operation
             operation_log = {
                 'operation': 'remove_outliers',
                 'method': method,
+                'mode': mode,
                 'columns': columns,
                 'threshold': threshold,
                 'total_rows_removed': total_removed,
+                'total_rows_flagged': flagged,
                 'results': results,
                 'timestamp': datetime.now().isoformat()
             }
             self.operations_log.append(operation_log)
-            
-            return {'total_removed': total_removed, 'column_results': results}
+            self.versions.commit(operation_log['operation'])
+
+            response = {'total_removed': total_removed, 'column_results': results, 'mode': mode}
+            if mode == 'flag':
+                response['total_flagged'] = flagged
+            return response
     
-    def remove_duplicates(self) -> Dict[str, Any]:
-        """Remove duplicate rows with progress tracking"""
+    def remove_duplicates(self, subset: Optional[List[str]] = None,
+                          keep: Union[str, bool] = 'first') -> Dict[str, Any]:
+        """Remove duplicate rows with progress tracking.
+        
+        Duplicates are found from the row-hash index; subset compares only the
+        given columns and keep is 'first', 'last' or False (drop every copy).
+        """
         with self.lock:
+            if self.plan.recording:
+                return self.plan.record('remove_duplicates', subset=subset, keep=keep)
             self.update_status("processing", 50, "Removing duplicate rows...")
             
+            if subset is not None:
+                subset = self.validate_columns(subset)
             initial_rows = len(self.df)
-            self.df.drop_duplicates(inplace=True)
+            duplicates = self.summary_cache.row_index.duplicated(self.df, subset, keep)
+            removed_count = int(duplicates.sum())
+            if removed_count:
+                self.df = self.df[~duplicates]
             final_rows = len(self.df)
-            removed_count = initial_rows - final_rows
             
             result = {
                 'initial_rows': initial_rows,
                 'final_rows': final_rows,
-                'removed_count': removed_count
+                'removed_count': removed_count,
+                'subset': subset,
+                'keep': keep
             }
             
+            if removed_count:
+                self.summary_cache.invalidate_rows()
             self.update_status("completed", 100, f"Removed {removed_count} duplicate rows")
             
             # Log operation
@@ -573,103 +765,82 @@ class Dataset:
                 'timestamp': datetime.now().isoformat()
             }
             self.operations_log.append(operation_log)
+            self.versions.commit(operation_log['operation'])
             
             return result
     
-    def get_correlation_analysis(self) -> Dict[str, Any]:
+    def get_correlation_analysis(self, method: str = 'pearson', compact: bool = False,
+                                 top_k: Optional[int] = None) -> Dict[str, Any]:
         """Get correlation analysis for numerical columns"""
         with self.lock:
-            # Get numerical columns
-            numerical_cols = self.df.select_dtypes(include=[np.number]).columns.tolist()
-            
-            if len(numerical_cols) < 2:
-                return {
-                    'numericalColumns': numerical_cols,
-                    'correlationMatrix': [],
-                    'strongCorrelations': [],
-                    'insights': ['Not enough numerical columns for correlation analysis. Need at least 2 numerical columns.']
-                }
-            
-            # Calculate correlation matrix
-            corr_matrix = self.df[numerical_cols].corr()
-            
-            # Convert to the format expected by frontend
-            correlation_matrix = []
-            for i, col1 in enumerate(numerical_cols):
-                row = []
-                for j, col2 in enumerate(numerical_cols):
-                    corr_value = corr_matrix.iloc[i, j]
-                    if pd.isna(corr_value):
-                        corr_value = 0
-                    
-                    abs_corr = abs(corr_value)
-                    if abs_corr >= 0.7:
-                        strength = "strong"
-                    elif abs_corr >= 0.5:
-                        strength = "moderate"
-                    else:
-                        strength = "weak"
-                    
-                    row.append({
-                        'value': self.safe_convert_to_json(corr_value),
-                        'strength': strength,
-                        'col1': col1,
-                        'col2': col2
-                    })
-                correlation_matrix.append(row)
-            
-            # Find strong correlations
-            strong_correlations = []
-            for i in range(len(numerical_cols)):
-                for j in range(i + 1, len(numerical_cols)):
-                    corr_value = correlation_matrix[i][j]['value']
-                    if abs(corr_value) >= 0.5:
-                        strong_correlations.append({
-                            'col1': numerical_cols[i],
-                            'col2': numerical_cols[j],
-                            'correlation': corr_value,
-                            'strength': correlation_matrix[i][j]['strength'],
-                            'direction': 'positive' if corr_value > 0 else 'negative'
-                        })
-            
-            # Generate insights
-            insights = []
-            if len(strong_correlations) == 0:
-                insights.append("No strong correlations found between variables.")
-            else:
-                insights.append(f"Found {len(strong_correlations)} strong correlation(s).")
-                for corr in strong_correlations[:3]:
-                    insights.append(
-                        f"{corr['col1']} and {corr['col2']} have a {corr['strength']} {corr['direction']} correlation ({corr['correlation']:.3f})."
-                    )
-            
-            return {
-                'numericalColumns': numerical_cols,
-                'correlationMatrix': correlation_matrix,
-                'strongCorrelations': strong_correlations,
-                'insights': insights
-            }
+            self.materialize()
+            columns, matrix = self.correlation_cache.get(self.df, self.versions.version_id, method)
+            return CorrelationEngine.analysis(columns, matrix, compact=compact, top_k=top_k)
     
-    def export_to_csv(self) -> Tuple[io.BytesIO, str]:
-        """Export processed dataset as CSV"""
+    def get_label_encodings(self) -> Dict[str, Dict[str, Any]]:
+        """Class mappings of the label-encoded columns"""
         with self.lock:
-            # Create CSV in memory
-            output = io.StringIO()
-            self.df.to_csv(output, index=False)
-            output.seek(0)
-            
-            # Convert to bytes
-            csv_data = io.BytesIO()
-            csv_data.write(output.getvalue().encode('utf-8'))
-            csv_data.seek(0)
-            
-            filename = f'processed_{self.filename}' if self.filename else f'processed_data_{self.dataset_id[:8]}.csv'
-            
-            return csv_data, filename
+            mappings = self.label_encodings.mappings(self.materialize())
+        return {col: mapping.to_dict() for col, mapping in mappings.items()}
+    
+    def get_quality_report(self) -> Dict[str, Any]:
+        """Data quality summary, column insights and suggested preprocessing steps"""
+        with self.lock:
+            self.materialize()
+            profile = self.profile_cache.get(self.df, self.versions.version_id, self.summary_cache.row_index)
+            return DataAnalyzer.report(self.df, profile)
+    
+    def export(self, fmt: str = 'csv', decode_labels: bool = False) -> Tuple[Iterator[bytes], str, str]:
+        """Export processed dataset as a stream of chunks; returns (chunks, mimetype, filename).
+        
+        decode_labels writes label-encoded columns with their original values.
+        """
+        with self.lock:
+            # Only a shallow snapshot is taken under the lock; operations replace
+            # columns instead of writing into them, so it stays consistent while streaming
+            df = self.materialize().copy(deep=False)
+            if decode_labels:
+                df = self.label_encodings.decode(df)
+        
+        chunks, mimetype, extension = DatasetExporter.stream(df, fmt)
+        stem = self.filename.rsplit('.', 1)[0] if self.filename else f'data_{self.dataset_id[:8]}'
+        return chunks, mimetype, f'processed_{stem}{extension}'
+    
+    def export_to_csv(self) -> Tuple[Iterator[bytes], str]:
+        """Export processed dataset as CSV"""
+        chunks, _, filename = self.export('csv')
+        return chunks, filename
     
     def reset(self) -> None:
         """Reset dataset to original state"""
         with self.lock:
-            self.df = self.original_df.copy()
+            self.versions.reset()
+            self.plan.clear()
             self.operations_log = []
+            self.summary_cache.invalidate_all()
             self.update_status("idle", 0, "Dataset reset to original state")
+    
+    def undo(self) -> Dict[str, Any]:
+        """Undo the last operation by restoring the previous version, or drop the last planned one"""
+        with self.lock:
+            if self.plan.pending:
+                undone = self.plan.pop()
+                self.update_status("idle", 0, f"Dropped planned operation: {undone}")
+                return {
+                    'undone_operation': undone,
+                    'remaining_operations': len(self.operations_log),
+                    'pending_operations': self.plan.pending,
+                    'can_undo': self.plan.pending > 0 or self.versions.can_undo()
+                }
+            # A version can stand for several logged operations (see VersionChain.commit)
+            undone_count = self.versions.head_operations
+            undone = self.versions.undo()
+            del self.operations_log[max(0, len(self.operations_log) - undone_count):]
+            self.summary_cache.invalidate_all()
+            self.update_status("idle", 0, f"Undid operation: {undone}")
+            
+            return {
+                'undone_operation': undone,
+                'remaining_operations': len(self.operations_log),
+                'can_undo': self.versions.can_undo()
+            }
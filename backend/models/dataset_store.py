@@ -0,0 +1,263 @@
+import threading
+import logging
+from collections import OrderedDict
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+from models.shared_store import SharedFrameStore
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetStore:
+    """Thread-safe dataset registry with a memory budget.
+
+    Behaves like the plain dict it replaces. Datasets are kept in least-recently-used
+    order; when the in-memory footprint exceeds the budget, the least recently used
+    ones are spilled to disk and faulted back in on their next access. A background
+    sweeper removes datasets that have not been accessed within the expiry period.
+
+    Stored objects must expose ``versions`` (a VersionChain), ``last_access`` and
+    ``update_access_time()``; an optional ``lock`` is held while spilling.
+    
+    With a SharedFrameStore, the store is one view of datasets shared by several
+    worker processes. Datasets are published to it when stored and by sync();
+    a dataset published by another process, or newer there, is rebuilt with
+    loader(dataset_id, original, working, state) on access. Shared objects must
+    also expose ``shared_state()``. Version history before the latest frame is
+    kept only by the process that made it.
+    """
+
+    def __init__(self, memory_budget: int, spill_folder: str,
+                 expiry: Optional[timedelta] = None, cleanup_interval: Optional[timedelta] = None,
+                 on_remove: Optional[Callable[[str], None]] = None,
+                 shared: Optional[SharedFrameStore] = None,
+                 loader: Optional[Callable[..., Any]] = None):
+        self.memory_budget = memory_budget
+        self.spill_folder = spill_folder
+        self.expiry = expiry
+        self.cleanup_interval = cleanup_interval
+        self.on_remove = on_remove
+        self.shared = shared
+        self.loader = loader
+        self._datasets = OrderedDict()
+        self._sizes = {}  # dataset_id -> (version_id, bytes)
+        self._published = {}  # dataset_id -> (shared generation, version_id it holds)
+        self.lock = threading.RLock()
+        self._sweeper = None
+        self._stop_sweeper = threading.Event()
+
+    def __contains__(self, dataset_id: str) -> bool:
+        if self.shared is not None:
+            return dataset_id in self.shared
+        return dataset_id in self._datasets
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        if self.shared is not None:
+            return self.shared.keys()
+        return list(self._datasets)
+
+    def __getitem__(self, dataset_id: str) -> Any:
+        if self.shared is not None:
+            self._refresh(dataset_id)
+        with self.lock:
+            dataset = self._datasets[dataset_id]
+            self._datasets.move_to_end(dataset_id)
+        dataset.update_access_time()
+        # Fault the frames back in before the caller touches them
+        dataset.versions.load()
+        self._enforce_budget(keep=dataset_id)
+        return dataset
+
+    def get(self, dataset_id: str, default: Any = None) -> Any:
+        try:
+            return self[dataset_id]
+        except KeyError:
+            return default
+
+    def __setitem__(self, dataset_id: str, dataset: Any) -> None:
+        with self.lock:
+            if dataset_id in self._datasets and self._datasets[dataset_id] is not dataset:
+                self._datasets[dataset_id].versions.discard_spill()
+            self._datasets[dataset_id] = dataset
+            self._datasets.move_to_end(dataset_id)
+            self._sizes.pop(dataset_id, None)
+            self._published.pop(dataset_id, None)
+        if self.shared is not None:
+            with self.shared.lock(dataset_id):
+                generation = self.shared.publish(dataset_id, dataset.df, dataset.shared_state(),
+                                                 original=dataset.original_df)
+            self._published[dataset_id] = (generation, dataset.versions.version_id)
+        self._ensure_sweeper()
+        self._enforce_budget(keep=dataset_id)
+
+    def __delitem__(self, dataset_id: str) -> None:
+        shared = self.shared is not None and dataset_id in self.shared
+        with self.lock:
+            dataset = self._datasets.pop(dataset_id, None)
+            self._sizes.pop(dataset_id, None)
+            self._published.pop(dataset_id, None)
+        if dataset is None and not shared:
+            raise KeyError(dataset_id)
+        if dataset is not None:
+            dataset.versions.discard_spill()
+        if shared:
+            self.shared.remove(dataset_id)
+        if self.on_remove:
+            self.on_remove(dataset_id)
+
+    def pop(self, dataset_id: str, default: Any = None) -> Any:
+        with self.lock:
+            if dataset_id not in self:
+                return default
+            dataset = self.get(dataset_id)
+            del self[dataset_id]
+            return dataset
+
+    def locked(self, dataset_id: str):
+        """Context of a write to a dataset; excludes writers in other processes when shared"""
+        return self.shared.lock(dataset_id) if self.shared is not None else nullcontext()
+
+    def sync(self, dataset_id: str) -> None:
+        """Publish the dataset's state, and its working frame if that changed since it was last published.
+
+        Call while holding locked(dataset_id), after operations commit.
+        """
+        if self.shared is None:
+            return
+        with self.lock:
+            dataset = self._datasets.get(dataset_id)
+            published = self._published.get(dataset_id)
+        if dataset is None:
+            return
+        unchanged = published is not None and published[1] == dataset.versions.version_id
+        generation = self.shared.publish(dataset_id, None if unchanged else dataset.df, dataset.shared_state())
+        self._published[dataset_id] = (generation, dataset.versions.version_id)
+
+    def _refresh(self, dataset_id: str) -> None:
+        """Rebuild the local copy of a shared dataset that is missing or outdated here"""
+        generation = self.shared.generation(dataset_id)
+        with self.lock:
+            local = self._datasets.get(dataset_id)
+            published = self._published.get(dataset_id)
+        if generation is None:
+            if local is not None:
+                # Removed by another process
+                with self.lock:
+                    self._datasets.pop(dataset_id, None)
+                    self._published.pop(dataset_id, None)
+                local.versions.discard_spill()
+                if self.on_remove:
+                    self.on_remove(dataset_id)
+            raise KeyError(dataset_id)
+        self.shared.touch(dataset_id)
+        if local is not None and published and published[0] == generation:
+            return
+        generation, original, working, state = self.shared.open(dataset_id)
+        dataset = self.loader(dataset_id, original, working, state)
+        with self.lock:
+            if local is not None:
+                local.versions.discard_spill()
+            self._datasets[dataset_id] = dataset
+            self._sizes.pop(dataset_id, None)
+            self._published[dataset_id] = (generation, dataset.versions.version_id)
+
+    def memory_usage(self) -> int:
+        """Bytes held in memory by all stored datasets"""
+        with self.lock:
+            return sum(self._dataset_size(dataset_id) for dataset_id in self._datasets)
+
+    def spilled_count(self) -> int:
+        """Number of datasets currently spilled to disk"""
+        with self.lock:
+            return sum(1 for dataset in self._datasets.values() if dataset.versions.is_spilled)
+
+    def _dataset_size(self, dataset_id: str) -> int:
+        versions = self._datasets[dataset_id].versions
+        cached = self._sizes.get(dataset_id)
+        if versions.is_spilled:
+            return 0
+        if cached is None or cached[0] != versions.version_id:
+            cached = (versions.version_id, versions.memory_usage())
+            self._sizes[dataset_id] = cached
+        return cached[1]
+
+    def _enforce_budget(self, keep: Optional[str] = None) -> None:
+        """Spill least recently used datasets until the footprint fits the budget"""
+        with self.lock:
+            total = self.memory_usage()
+            for dataset_id in list(self._datasets):
+                if total <= self.memory_budget:
+                    break
+                if dataset_id == keep:
+                    continue
+                dataset = self._datasets[dataset_id]
+                if dataset.versions.is_spilled:
+                    continue
+                size = self._dataset_size(dataset_id)
+                if self._spill(dataset_id, dataset):
+                    total -= size
+
+    def _spill(self, dataset_id: str, dataset: Any) -> bool:
+        lock = getattr(dataset, 'lock', None)
+        # A dataset in the middle of an operation is skipped rather than waited for
+        if lock is not None and not lock.acquire(blocking=False):
+            return False
+        try:
+            dataset.versions.spill(self.spill_folder, dataset_id)
+            self._sizes.pop(dataset_id, None)
+            logger.info(f"Spilled dataset {dataset_id} to disk")
+            return True
+        except Exception as e:
+            logger.error(f"Error spilling dataset {dataset_id}: {str(e)}")
+            return False
+        finally:
+            if lock is not None:
+                lock.release()
+
+    def remove_expired(self) -> int:
+        """Remove datasets not accessed within the expiry period"""
+        if self.expiry is None:
+            return 0
+        cutoff = datetime.now() - self.expiry
+        with self.lock:
+            expired = [dataset_id for dataset_id, dataset in self._datasets.items()
+                       if dataset.last_access < cutoff]
+        if self.shared is not None:
+            # Access times of every process are in the shared index
+            expired = self.shared.expired(cutoff.timestamp())
+        for dataset_id in expired:
+            try:
+                del self[dataset_id]
+                logger.info(f"Removed expired dataset {dataset_id}")
+            except KeyError:
+                pass
+        return len(expired)
+
+    def _ensure_sweeper(self) -> None:
+        if self.cleanup_interval is None or self.expiry is None:
+            return
+        with self.lock:
+            if self._sweeper is not None and self._sweeper.is_alive():
+                return
+            self._stop_sweeper.clear()
+            self._sweeper = threading.Thread(target=self._sweep, name='dataset-sweeper', daemon=True)
+            self._sweeper.start()
+
+    def _sweep(self) -> None:
+        interval = self.cleanup_interval.total_seconds()
+        while not self._stop_sweeper.wait(interval):
+            try:
+                self.remove_expired()
+            except Exception as e:
+                logger.error(f"Error removing expired datasets: {str(e)}")
+
+    def stop_sweeper(self) -> None:
+        """Stop the background expiry sweeper"""
+        self._stop_sweeper.set()
@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+import pandas as pd
+from models.version_chain import save_frame, load_frame
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory file locks (Windows): locks only coordinate the threads of one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    dataset_id TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL,
+    original TEXT NOT NULL,
+    working TEXT NOT NULL,
+    state TEXT NOT NULL,
+    updated REAL NOT NULL,
+    accessed REAL NOT NULL
+)
+"""
+
+
+def write_arrow(df: pd.DataFrame, path_stem: str) -> str:
+    """Write a frame as an uncompressed Arrow IPC file, which readers memory-map without copying.
+
+    Frames Arrow cannot hold (e.g. mixed-type object columns) are written by
+    save_frame instead and are copied when read.
+    """
+    try:
+        import pyarrow as pa
+        frame = df.copy(deep=False)
+        for col, dtype in df.dtypes.items():
+            if isinstance(dtype, pd.SparseDtype):
+                # Arrow has no sparse columns
+                frame[col] = frame[col].sparse.to_dense()
+        table = pa.Table.from_pandas(frame, preserve_index=True)
+        path = f'{path_stem}.arrow'
+        with pa.OSFile(path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        return path
+    except ImportError:
+        pass
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, ValueError, TypeError) as e:
+        logger.warning(f"Frame stored without Arrow: {str(e)}")
+    return save_frame(df, path_stem)
+
+
+def read_arrow(path: str) -> pd.DataFrame:
+    """Read a frame written by write_arrow; numeric columns without nulls share the mapped pages"""
+    if not path.endswith('.arrow'):
+        return load_frame(path)
+    import pyarrow as pa
+    # The mapping lives as long as the buffers read from it
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+class SharedFrameStore:
+    """Dataset frames shared by the worker processes of one machine.
+
+    Each dataset's original and latest frames are Arrow IPC files in a shared
+    directory, memory-mapped by every process that opens them, so workers read
+    the same pages instead of holding private copies. A SQLite index maps each
+    dataset to its files, a generation counter bumped by every publish, and the
+    caller's small JSON state. Writers serialize per dataset through an
+    advisory file lock.
+
+    Files of a superseded generation are unlinked at once; processes that still
+    map them keep reading them until they refresh.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, 'index.sqlite')
+        self._local = threading.local()
+        self._thread_locks: Dict[str, threading.Lock] = {}
+        self._thread_locks_guard = threading.Lock()
+        with self._index() as db:
+            db.execute(_SCHEMA)
+
+    @contextmanager
+    def _index(self):
+        """Connection of the calling thread, inside a transaction"""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self._index_path, timeout=30)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        with db:
+            yield db
+
+    def _stem(self, dataset_id: str, name: str) -> str:
+        return os.path.join(self.directory, f'{dataset_id}.{name}')
+
+    @contextmanager
+    def lock(self, dataset_id: str):
+        """Exclusive write lock of a dataset across processes (not reentrant)"""
+        with self._thread_locks_guard:
+            thread_lock = self._thread_locks.setdefault(dataset_id, threading.Lock())
+        with thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._stem(dataset_id, 'lock'), 'a') as handle:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def __contains__(self, dataset_id: str) -> bool:
+        return self.generation(dataset_id) is not None
+
+    def keys(self) -> List[str]:
+        with self._index() as db:
+            return [row[0] for row in db.execute('SELECT dataset_id FROM datasets')]
+
+    def generation(self, dataset_id: str) -> Optional[int]:
+        """Generation of the dataset's latest frame, or None if it is not stored"""
+        with self._index() as db:
+            row = db.execute('SELECT generation FROM datasets WHERE dataset_id = ?', (dataset_id,)).fetchone()
+        return row[0] if row else None
+
+    def publish(self, dataset_id: str, working: Optional[pd.DataFrame], state: Dict[str, Any],
+                original: Optional[pd.DataFrame] = None) -> int:
+        """Store a new latest frame and state; returns the new generation.
+
+        working=None keeps the stored frame and only replaces the state. original
+        is required the first time a dataset is published and written only
+        then. Callers should hold lock(dataset_id).
+        """
+        with self._index() as db:
+            row = db.execute('SELECT generation, original, working FROM datasets WHERE dataset_id = ?',
+                             (dataset_id,)).fetchone()
+        if row is None and (original is None or working is None):
+            raise ValueError(f"Dataset {dataset_id} must be published with its frames first")
+        generation = (row[0] if row else 0) + 1
+        original_path = row[1] if row else write_arrow(original, self._stem(dataset_id, 'original'))
+        working_path = row[2] if working is None else write_arrow(working, self._stem(dataset_id, str(generation)))
+        now = time.time()
+        with self._index() as db:
+            db.execute(
+                'INSERT OR REPLACE INTO datasets VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (dataset_id, generation, original_path, working_path, json.dumps(state, default=str), now, now)
+            )
+        if row is not None and row[2] != working_path:
+            self._remove_file(row[2])
+        return generation
+
+    def open(self, dataset_id: str) -> Tuple[int, pd.DataFrame, pd.DataFrame, Dict[str, Any]]:
+        """(generation, original frame, latest frame, state) of a stored dataset"""
+        with self._index() as db:
+            row = db.execute('SELECT generation, original, working, state FROM datasets WHERE dataset_id = ?',
+                             (dataset_id,)).fetchone()
+        if row is None:
+            raise KeyError(dataset_id)
+        generation, original_path, working_path, state = row
+        return generation, read_arrow(original_path), read_arrow(working_path), json.loads(state)
+
+    def touch(self, dataset_id: str) -> None:
+        """Record an access, which keeps the dataset from expiring"""
+        with self._index() as db:
+            db.execute('UPDATE datasets SET accessed = ? WHERE dataset_id = ?', (time.time(), dataset_id))
+
+    def expired(self, cutoff: float) -> List[str]:
+        """Datasets no process accessed since the cutoff timestamp"""
+        with self._index() as db:
+            return [row[0] for row in db.execute('SELECT dataset_id FROM datasets WHERE accessed < ?', (cutoff,))]
+
+    def remove(self, dataset_id: str) -> None:
+        with self._index() as db:
+            row = db.execute('SELECT original, working FROM datasets WHERE dataset_id = ?', (dataset_id,)).fetchone()
+            db.execute('DELETE FROM datasets WHERE dataset_id = ?', (dataset_id,))
+        if row is not None:
+            for path in row:
+                self._remove_file(path)
+        self._remove_file(self._stem(dataset_id, 'lock'))
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,111 @@
+import hashlib
+import threading
+import logging
+from typing import Any, Dict, List, Optional, Set
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Bytes hashed per read of an upload stream
+HASH_BLOCK_BYTES = 1 << 20
+
+
+class CachedUpload:
+    """A parsed upload shared by the datasets created from it.
+
+    The frame and summary pieces are never modified: datasets replace columns
+    rather than write into them, so each dataset works on a shallow copy.
+    """
+
+    def __init__(self, frame: pd.DataFrame, summary: Dict[str, Any], summary_cache: Any,
+                 warnings: List[str]):
+        self.frame = frame
+        self.summary = summary
+        self.summary_cache = summary_cache
+        self.warnings = warnings
+        self.refs: Set[str] = set()
+
+
+class UploadCache:
+    """Parsed uploads keyed by a hash of their bytes and parse options.
+
+    A repeated upload of the same file becomes a new dataset over the cached
+    column buffers and summary pieces, without parsing or copying the frame.
+    Entries are reference counted by the datasets using them and evicted when
+    the last one is released.
+
+    Buffers of an entry stay in memory while any dataset references it, even
+    if that dataset is spilled to disk.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, CachedUpload] = {}
+        self._keys: Dict[str, str] = {}  # dataset_id -> key of the entry it references
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def content_key(stream, *options: Any) -> str:
+        """SHA-256 of the stream's bytes and the parse options; rewinds the stream"""
+        digest = hashlib.sha256()
+        for option in options:
+            digest.update(repr(option).encode('utf-8'))
+            digest.update(b'\0')
+        stream.seek(0)
+        while True:
+            block = stream.read(HASH_BLOCK_BYTES)
+            if not block:
+                break
+            digest.update(block)
+        stream.seek(0)
+        return digest.hexdigest()
+
+    def acquire(self, key: str, dataset_id: str) -> Optional[CachedUpload]:
+        """Entry for key, now referenced by dataset_id, or None on a miss"""
+        with self.lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry.refs.add(dataset_id)
+            self._keys[dataset_id] = key
+            return entry
+
+    def add(self, key: str, dataset_id: str, frame: pd.DataFrame, summary: Dict[str, Any],
+            summary_cache: Any, warnings: List[str]) -> bool:
+        """Cache a freshly parsed upload, referenced by dataset_id.
+
+        Returns False if the same upload was cached meanwhile; the caller's
+        dataset then keeps its own frame and references nothing.
+        """
+        with self.lock:
+            if key in self._entries:
+                return False
+            entry = CachedUpload(frame.copy(deep=False), summary, summary_cache, warnings)
+            entry.refs.add(dataset_id)
+            self._entries[key] = entry
+            self._keys[dataset_id] = key
+            return True
+
+    def release(self, dataset_id: str) -> None:
+        """Drop dataset_id's reference; the entry is evicted with its last reference"""
+        with self.lock:
+            key = self._keys.pop(dataset_id, None)
+            if key is None:
+                return
+            entry = self._entries[key]
+            entry.refs.discard(dataset_id)
+            if not entry.refs:
+                del self._entries[key]
+                logger.info(f"Evicted cached upload {key[:12]}")
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                'entries': len(self._entries),
+                'references': len(self._keys),
+                'hits': self.hits,
+                'misses': self.misses
+            }
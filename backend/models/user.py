@@ -6,11 +6,12 @@ import threading
 class User:
     """User model for handling user data and operations"""
     
-    def __init__(self, username, email, password):
+    def __init__(self, username, email, password=None, password_hash=None):
         self.id = str(uuid.uuid4())
         self.username = username.strip()
         self.email = email.lower().strip()
-        self.password = self._hash_password(password)
+        # A bcrypt hash is stored as is, e.g. for imported accounts
+        self.password = password_hash if password_hash is not None else self._hash_password(password)
         self.created_at = datetime.now().isoformat()
         self.last_login = None
     
@@ -39,51 +40,109 @@ class User:
             user_dict['password'] = self.password
         return user_dict
 
+def fold(value):
+    """Case-insensitive key of a username or email"""
+    return value.strip().casefold()
+
 class UserStorage:
-    """Thread-safe user storage"""
+    """Thread-safe user storage.
+    
+    Case-folded usernames and emails are indexed, so logins and uniqueness
+    checks are dictionary lookups. The indexes change together with the
+    users under the lock.
+    """
     
     def __init__(self):
         self.users = {}
+        self.by_username = {}  # folded username -> user id
+        self.by_email = {}  # folded email -> user id
         self.lock = threading.Lock()
     
+    def _check_available(self, username=None, email=None, user_id=None):
+        """Raise if another user than user_id has the username or email (lock held)"""
+        for index, value in ((self.by_username, username), (self.by_email, email)):
+            if value is not None and index.get(fold(value), user_id) != user_id:
+                raise ValueError("Username or email already exists")
+    
+    def _add(self, user):
+        self.users[user.id] = user
+        self.by_username[fold(user.username)] = user.id
+        self.by_email[fold(user.email)] = user.id
+    
     def create_user(self, username, email, password):
         """Create a new user"""
         with self.lock:
-            # Check if user already exists
-            for user in self.users.values():
-                if (user.username.lower() == username.lower() or 
-                    user.email == email.lower()):
-                    raise ValueError("Username or email already exists")
-            
-            user = User(username, email, password)
-            self.users[user.id] = user
+            self._check_available(username, email)
+        # Hash the password outside the lock, then check again before storing
+        user = User(username, email, password)
+        with self.lock:
+            self._check_available(username, email)
+            self._add(user)
             return user
     
+    def import_users(self, records):
+        """Create many users at once, e.g. to seed accounts; returns them.
+        
+        Each record has username, email and either password or password_hash
+        (a bcrypt hash, stored as is). Nothing is imported if any username or
+        email is taken or repeated within the records.
+        """
+        users = [User(record['username'], record['email'], record.get('password'), record.get('password_hash'))
+                 for record in records]
+        
+        usernames = [fold(user.username) for user in users]
+        emails = [fold(user.email) for user in users]
+        if len(set(usernames)) < len(users) or len(set(emails)) < len(users):
+            raise ValueError("Username or email repeated in the import")
+        with self.lock:
+            for user in users:
+                self._check_available(user.username, user.email)
+            for user in users:
+                self._add(user)
+        return users
+    
     def get_user_by_id(self, user_id):
         """Get user by ID"""
         return self.users.get(user_id)
     
     def get_user_by_credentials(self, username):
         """Get user by username or email"""
-        username_lower = username.lower()
-        for user in self.users.values():
-            if (user.username.lower() == username_lower or 
-                user.email == username_lower):
-                return user
-        return None
+        key = fold(username)
+        with self.lock:
+            user_id = self.by_username.get(key) or self.by_email.get(key)
+            return self.users.get(user_id)
     
     def get_all_users(self):
         """Get all users"""
         with self.lock:
             return list(self.users.values())
     
+    def rename_user(self, user_id, username=None, email=None):
+        """Change a user's username and/or email; returns the user, or None if not found"""
+        with self.lock:
+            user = self.users.get(user_id)
+            if user is None:
+                return None
+            self._check_available(username, email, user_id)
+            if username is not None:
+                del self.by_username[fold(user.username)]
+                user.username = username.strip()
+                self.by_username[fold(user.username)] = user_id
+            if email is not None:
+                del self.by_email[fold(user.email)]
+                user.email = email.lower().strip()
+                self.by_email[fold(user.email)] = user_id
+            return user
+    
     def delete_user(self, user_id):
         """Delete user by ID"""
         with self.lock:
-            if user_id in self.users:
-                del self.users[user_id]
-                return True
-            return False
+            user = self.users.pop(user_id, None)
+            if user is None:
+                return False
+            del self.by_username[fold(user.username)]
+            del self.by_email[fold(user.email)]
+            return True
 
 # Global user storage instance
 user_storage = UserStorage()
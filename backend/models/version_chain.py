@@ -0,0 +1,279 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+
+class DatasetVersion:
+    """Snapshot of a dataset's columns at one point of its history.
+
+    A snapshot only references the column arrays of the frame it was taken from,
+    so versions that did not rewrite a column keep sharing its buffer.
+    operations is how many logged operations the snapshot applies on top of
+    the version before it.
+    """
+
+    def __init__(self, df: pd.DataFrame, label: str, operations: int = 1):
+        self.label = label
+        self.operations = operations
+        self.columns = df.columns
+        self.index = df.index
+        self.series = [df.iloc[:, i] for i in range(df.shape[1])]
+
+    @classmethod
+    def from_series(cls, series: List[pd.Series], columns: pd.Index, index: pd.Index, label: str,
+                    operations: int = 1) -> 'DatasetVersion':
+        """Build a snapshot from existing column Series without a frame"""
+        version = cls.__new__(cls)
+        version.label = label
+        version.operations = operations
+        version.columns = columns
+        version.index = index
+        version.series = series
+        return version
+
+    def to_frame(self) -> pd.DataFrame:
+        """Rebuild a DataFrame over the snapshot's column buffers without copying them"""
+        if not self.series:
+            return pd.DataFrame(index=self.index, columns=self.columns)
+        frame = pd.concat(self.series, axis=1, copy=False)
+        frame.columns = self.columns
+        return frame
+
+    def positional_frame(self) -> pd.DataFrame:
+        """Frame with positional string column names, which any file format accepts"""
+        frame = self.to_frame()
+        frame.columns = [str(i) for i in range(frame.shape[1])]
+        return frame
+
+    def memory_usage(self, seen: set) -> int:
+        """Bytes held by column buffers that are not already in `seen`"""
+        total = 0
+        for series in self.series:
+            key = buffer_key(series)
+            if key in seen:
+                continue
+            seen.add(key)
+            total += int(series.memory_usage(deep=True, index=False))
+        return total
+
+
+def buffer_key(series: pd.Series):
+    """Identity of the memory behind a column, equal for columns sharing a buffer"""
+    values = series.values
+    if isinstance(values, np.ndarray):
+        return values.__array_interface__['data'][0], len(values)
+    return id(values)
+
+
+def save_frame(df: pd.DataFrame, path_stem: str) -> str:
+    """Write a frame to disk, as Parquet when it round-trips losslessly, else as a pickle"""
+    parquet_safe = (
+        df.columns.is_unique
+        and all(isinstance(col, str) for col in df.columns)
+        and all(pd.api.types.infer_dtype(df[col], skipna=True) in ('string', 'empty')
+                for col in df.select_dtypes(include=['object']).columns)
+    )
+    if parquet_safe:
+        path = f'{path_stem}.parquet'
+        try:
+            df.to_parquet(path, index=True)
+            return path
+        except (ImportError, ValueError, TypeError):
+            # pyarrow missing or a dtype Arrow cannot hold
+            pass
+    path = f'{path_stem}.pkl'
+    df.to_pickle(path)
+    return path
+
+
+def load_frame(path: str) -> pd.DataFrame:
+    """Read a frame written by save_frame"""
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+class VersionChain:
+    """Copy-on-write history of a dataset.
+
+    The working frame is what operations read and rewrite. Operations must replace
+    columns (``df[col] = new_values``) or whole frames rather than write into
+    existing arrays, since those arrays are shared with earlier versions.
+    commit() snapshots the working frame after each operation; undo() and reset()
+    only move the head of the chain, and the working frame is rebuilt over the
+    snapshot's buffers the next time it is read.
+
+    A chain can be spilled to disk between operations to release its memory, and
+    is faulted back in the next time a frame is read, with all its versions.
+    """
+
+    def __init__(self, df: pd.DataFrame, max_versions: int = 10):
+        self._working = df
+        self.max_versions = max(2, max_versions)
+        self.version_id = 0
+        self._versions: List[DatasetVersion] = [DatasetVersion(df, 'original')]
+        self._spilled: Optional[dict] = None
+        self._spill_lock = threading.RLock()
+
+    @property
+    def working(self) -> pd.DataFrame:
+        """Frame that operations read and rewrite"""
+        with self._spill_lock:
+            self.load()
+            if self._working is None:
+                self._working = self._versions[-1].to_frame()
+            return self._working
+
+    @working.setter
+    def working(self, df: pd.DataFrame) -> None:
+        with self._spill_lock:
+            self.load()
+            self._working = df
+
+    @property
+    def original(self) -> pd.DataFrame:
+        """Frame of the uploaded data, sharing its buffers"""
+        self.load()
+        return self._versions[0].to_frame()
+
+    @property
+    def labels(self) -> List[str]:
+        """Labels of the retained versions, oldest first"""
+        self.load()
+        return [version.label for version in self._versions]
+
+    def commit(self, label: str, operations: int = 1) -> None:
+        """Record the working frame as a new version, applying that many logged operations"""
+        self._versions.append(DatasetVersion(self.working, label, operations))
+        # Keep the original plus the most recent versions; the oldest dropped
+        # version's operations are undone together with the one after it
+        while len(self._versions) > self.max_versions:
+            self._versions[2].operations += self._versions[1].operations
+            del self._versions[1]
+        self.version_id += 1
+
+    def can_undo(self) -> bool:
+        """Whether a committed operation can be undone"""
+        self.load()
+        return len(self._versions) > 1
+
+    @property
+    def head_operations(self) -> int:
+        """Logged operations that undo() reverts"""
+        self.load()
+        return self._versions[-1].operations if len(self._versions) > 1 else 0
+
+    def undo(self) -> str:
+        """Drop the latest version and restore the one before it"""
+        if not self.can_undo():
+            raise ValueError("No operation to undo")
+        undone = self._versions.pop()
+        self._working = None
+        self.version_id += 1
+        return undone.label
+
+    def rollback(self) -> None:
+        """Discard uncommitted changes to the working frame"""
+        self.load()
+        self._working = None
+        self.version_id += 1
+
+    def reset(self) -> None:
+        """Restore the original version and forget the history"""
+        self.load()
+        del self._versions[1:]
+        self._working = None
+        self.version_id += 1
+
+    @property
+    def is_spilled(self) -> bool:
+        """Whether the frames currently live on disk"""
+        return self._spilled is not None
+
+    def memory_usage(self) -> int:
+        """Bytes held in memory by all versions, counting shared buffers once"""
+        with self._spill_lock:
+            if self._spilled is not None:
+                return 0
+            seen = set()
+            total = sum(version.memory_usage(seen) for version in self._versions)
+            if self._working is not None:
+                total += DatasetVersion(self._working, 'working').memory_usage(seen)
+            return total
+
+    def spill(self, directory: str, name: str) -> None:
+        """Write every retained version to disk and drop them from memory.
+
+        Each version writes only the columns no earlier version holds; columns
+        it shares with an earlier version (same buffer, same rows) are written
+        once and shared again after the fault-in, so undo works as before.
+        """
+        with self._spill_lock:
+            if self._spilled is not None:
+                return
+            os.makedirs(directory, exist_ok=True)
+            stem = os.path.join(directory, name)
+            written = {}  # buffer key -> (version position, column position)
+            spilled = {'versions': []}
+            try:
+                for k, version in enumerate(self._versions):
+                    shared = {}
+                    for i, series in enumerate(version.series):
+                        source = written.get(buffer_key(series))
+                        if source is not None and self._versions[source[0]].index.equals(version.index):
+                            shared[i] = source
+                    rewritten = [i for i in range(len(version.series)) if i not in shared]
+                    partial = DatasetVersion.from_series([version.series[i] for i in rewritten],
+                                                         pd.Index(rewritten), version.index, version.label)
+                    spilled['versions'].append({
+                        'path': save_frame(partial.positional_frame(), f'{stem}.v{k}'),
+                        'columns': version.columns,
+                        'rewritten': rewritten,
+                        'shared': shared,
+                        'label': version.label,
+                        'operations': version.operations
+                    })
+                    for i in rewritten:
+                        written.setdefault(buffer_key(version.series[i]), (k, i))
+            except BaseException:
+                self._remove_files(spilled)
+                raise
+            self._spilled = spilled
+            self._versions = []
+            self._working = None
+
+    def discard_spill(self) -> None:
+        """Delete any spilled files, e.g. when the dataset is removed"""
+        with self._spill_lock:
+            if self._spilled is not None:
+                self._remove_files(self._spilled)
+
+    def load(self) -> None:
+        """Fault spilled frames back into memory"""
+        if self._spilled is None:
+            return
+        with self._spill_lock:
+            if self._spilled is None:
+                return
+            spilled = self._spilled
+            versions = []
+            for entry in spilled['versions']:
+                partial = load_frame(entry['path'])
+                series = [None] * len(entry['columns'])
+                for i, (k, j) in entry['shared'].items():
+                    series[i] = versions[k].series[j]
+                for position, i in enumerate(entry['rewritten']):
+                    series[i] = partial.iloc[:, position]
+                versions.append(DatasetVersion.from_series(series, entry['columns'], partial.index,
+                                                           entry['label'], entry['operations']))
+            self._versions = versions
+            self._spilled = None
+            self._remove_files(spilled)
+
+    @staticmethod
+    def _remove_files(spilled: dict) -> None:
+        for entry in spilled['versions']:
+            if os.path.exists(entry['path']):
+                os.remove(entry['path'])
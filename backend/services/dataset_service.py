@@ -4,9 +4,13 @@ from sklearn.preprocessing import StandardScaler, MinMaxScaler, LabelEncoder
 from sklearn.impute import SimpleImputer, KNNImputer
 import logging
 from datetime import datetime
+from utils.sampler import RowSampler
 
 logger = logging.getLogger(__name__)
 
+# Shared by callers that sample frames outside a dataset; permutations are cached by seed and row count
+_sampler = RowSampler()
+
 def safe_convert_to_json(obj):
     """Safely convert numpy/pandas objects to JSON serializable format"""
     if isinstance(obj, (np.integer, np.floating)):
@@ -24,10 +28,9 @@ def safe_convert_to_json(obj):
 
 class DataService:
     @staticmethod
-    def get_random_sample(df, n=5):
-        """Get random sample without replacement"""
-        sample_size = min(n, len(df))
-        return df.sample(n=sample_size, random_state=None)  # Use None for true randomness
+    def get_random_sample(df, n=5, page=1, seed=None):
+        """Get a page of df's random row order; the same seed always gives the same pages"""
+        return _sampler.page(df, page, n, seed)
     
     @staticmethod
     def validate_columns(df, columns, required_type=None):
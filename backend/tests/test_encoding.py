@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app import EnhancedDataPreprocessor
+from utils.outlier_engine import OutlierEngine
+
+
+def make_frame(rows=1000, seed=3):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'amount': rng.normal(0, 1, rows),
+        'level': rng.choice([f'v{i}' for i in range(10)], rows).astype(object)
+    })
+
+
+ENCODINGS = {
+    'onehot': {'method': 'onehot', 'columns': ['level']},
+    'hashing': {'method': 'hashing', 'columns': ['level'], 'n_buckets': 8},
+    'binary': {'method': 'binary', 'columns': ['level']}
+}
+
+
+@pytest.mark.parametrize('encoding', list(ENCODINGS))
+def test_indicator_columns_are_not_numerical_defaults(encoding):
+    preprocessor = EnhancedDataPreprocessor(make_frame(), encoding, lazy=False)
+    preprocessor.encode_categorical(**ENCODINGS[encoding])
+    indicators = [col for col in preprocessor.df.columns if col.startswith('level_')]
+
+    assert all(pd.api.types.is_bool_dtype(preprocessor.df[col]) for col in indicators)
+    assert preprocessor.df.select_dtypes(include=[np.number]).columns.tolist() == ['amount']
+
+
+def test_default_outlier_removal_after_onehot_keeps_indicator_rows():
+    df = make_frame()
+    expected, _ = OutlierEngine.detect(df, ['amount'])
+    preprocessor = EnhancedDataPreprocessor(df, 'onehot_outliers', lazy=False)
+    preprocessor.encode_categorical(method='onehot', columns=['level'])
+
+    result = preprocessor.remove_outliers(method='iqr')
+
+    assert list(result['column_results']) == ['amount']
+    assert result['total_removed'] == int(expected.sum()) < 50
+    assert len(preprocessor.df) == len(df) - result['total_removed']
+
+
+def test_iqr_ignores_columns_without_quartile_spread():
+    # Mostly zeros: both quartiles are 0, so no value stands out from the spread
+    df = pd.DataFrame({'rare': np.r_[np.zeros(95), np.ones(5)]})
+
+    mask, results = OutlierEngine.detect(df, ['rare'], method='iqr')
+
+    assert not mask.any()
+    assert results['rare']['lower_bound'] is None and results['rare']['upper_bound'] is None
@@ -0,0 +1,42 @@
+import io
+import pandas as pd
+import pytest
+from utils.ingestion import read_csv_chunked, iter_file_chunks
+
+
+def csv_bytes(codes):
+    return ('code,value\n' + ''.join(f'{code},{i}\n' for i, code in enumerate(codes))).encode()
+
+
+def assert_matches_whole_file(df, data):
+    expected = pd.read_csv(io.BytesIO(data))
+    assert df.columns.tolist() == expected.columns.tolist()
+    assert len(df) == len(expected)
+    for col in df.columns:
+        pd.testing.assert_series_equal(df[col].astype(object), expected[col].astype(object), check_names=False)
+
+
+@pytest.mark.parametrize('codes', [
+    # Numeric in the first chunk, text after the chunk boundary
+    [str(i) for i in range(250)] + [f'x{i}' for i in range(10)],
+    # Text in the first chunk, numeric-looking (zero padded) after it
+    [f'x{i}' for i in range(10)] + [str(i).zfill(4) for i in range(250)],
+])
+def test_chunked_read_types_columns_like_whole_file(codes):
+    data = csv_bytes(codes)
+    df = read_csv_chunked(io.BytesIO(data), chunk_rows=100)
+    assert df['code'].map(type).eq(str).all()
+    assert_matches_whole_file(df, data)
+
+
+def test_chunked_read_matches_numeric_columns_across_chunks():
+    data = ('a,b,c\n' + ''.join(f'{i},{i / 3 if i % 7 else ""},k{i % 5}\n' for i in range(1000))).encode()
+    df = read_csv_chunked(io.BytesIO(data), chunk_rows=128)
+    assert_matches_whole_file(df, data)
+
+
+def test_recipe_reader_types_columns_like_whole_file():
+    data = csv_bytes([str(i) for i in range(250)] + ['text'])
+    chunks = list(iter_file_chunks(io.BytesIO(data), 'data.csv', chunk_rows=100))
+    assert [len(chunk) for chunk in chunks] == [100, 100, 51]
+    assert pd.concat(chunks)['code'].map(type).eq(str).all()
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app import EnhancedDataPreprocessor
+
+
+def make_frame(rows=300, seed=2):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'amount': rng.normal(20, 5, rows),
+        'count': rng.integers(0, 6, rows).astype(float),
+        'city': rng.choice(['north', 'south', 'east', 'west'], rows).astype(object),
+        'code': rng.choice([f'c{i}' for i in range(12)], rows).astype(object)
+    })
+    df.loc[rng.random(rows) < 0.1, 'amount'] = np.nan
+    df.loc[rng.random(rows) < 0.1, 'count'] = np.nan
+    df.loc[rng.random(rows) < 0.1, 'city'] = None
+    df.loc[::11, 'amount'] = 200.0
+    return pd.concat([df, df.head(25)], ignore_index=True)
+
+
+SESSIONS = {
+    # Transforms on separate columns, which the plan may reorder or fuse
+    'transforms': [
+        ('handle_missing_values', {'strategy': 'mean', 'columns': ['amount']}),
+        ('encode_categorical', {'method': 'label', 'columns': ['code']}),
+        ('handle_missing_values', {'strategy': 'median', 'columns': ['count']}),
+        ('encode_categorical', {'method': 'onehot', 'columns': ['city']})
+    ],
+    # Filters between transforms, which must see the rows the eager run saw
+    'filters': [
+        ('remove_duplicates', {}),
+        ('handle_missing_values', {'strategy': 'mean'}),
+        ('remove_outliers', {'method': 'iqr', 'columns': ['amount']}),
+        ('encode_categorical', {'method': 'hashing', 'columns': ['code'], 'n_buckets': 4}),
+        ('remove_duplicates', {'subset': ['city'], 'keep': 'last'})
+    ],
+    'flags': [
+        ('remove_outliers', {'method': 'mad', 'columns': ['amount', 'count'], 'mode': 'flag'}),
+        ('handle_missing_values', {'strategy': 'mode'}),
+        ('encode_categorical', {'method': 'binary', 'columns': ['code']}),
+        ('remove_outliers', {'method': 'zscore', 'columns': ['amount']})
+    ]
+}
+
+
+def run(session, lazy):
+    preprocessor = EnhancedDataPreprocessor(make_frame(), session, lazy=lazy)
+    for operation, params in SESSIONS[session]:
+        getattr(preprocessor, operation)(**params)
+    return preprocessor
+
+
+@pytest.mark.parametrize('session', list(SESSIONS))
+def test_lazy_plan_matches_eager(session):
+    eager = run(session, lazy=False)
+    lazy = run(session, lazy=True)
+    assert lazy.plan.pending == len(SESSIONS[session])
+
+    lazy.materialize()
+
+    assert lazy.plan.pending == 0
+    pd.testing.assert_frame_equal(lazy.df, eager.df)
+    assert len(lazy.operations_log) == len(eager.operations_log)
+
+
+@pytest.mark.parametrize('session', list(SESSIONS))
+def test_lazy_projection_matches_eager(session):
+    eager = run(session, lazy=False)
+    lazy = run(session, lazy=True)
+    columns = [col for col in eager.df.columns if col in ('amount', 'count')]
+
+    projected = lazy.materialize(columns)
+
+    pd.testing.assert_frame_equal(projected[columns], eager.df[columns])
+
+
+def test_lazy_undo_drops_pending_step():
+    eager = run('filters', lazy=False)
+    eager.undo()
+    lazy = run('filters', lazy=True)
+    lazy.undo()
+
+    lazy.materialize()
+
+    pd.testing.assert_frame_equal(lazy.df, eager.df)
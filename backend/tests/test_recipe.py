@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app import EnhancedDataPreprocessor
+from utils.recipe import Recipe
+
+
+def make_frame(rows=400, seed=1):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'amount': rng.normal(50, 10, rows),
+        'count': rng.integers(0, 4, rows).astype(float),
+        'city': rng.choice(['north', 'south', 'east'], rows).astype(object),
+        'code': rng.choice(['a', 'b', 'c', 'd', 'e'], rows).astype(object)
+    })
+    df.loc[rng.random(rows) < 0.1, 'amount'] = np.nan
+    df.loc[rng.random(rows) < 0.1, 'city'] = None
+    df.loc[::9, 'amount'] = 500.0
+    return pd.concat([df, df.iloc[10:40]], ignore_index=True)
+
+
+def chunks_of(df, rows):
+    return [df.iloc[start:start + rows].reset_index(drop=True) for start in range(0, len(df), rows)]
+
+
+def replayed(preprocessor, original, rows):
+    recipe = Recipe.from_dict(Recipe.compile(preprocessor.operations_log).to_dict())
+    return pd.concat(list(recipe.apply(chunks_of(original, rows))), ignore_index=True)
+
+
+SESSIONS = {
+    'impute_encode': [
+        ('handle_missing_values', {'strategy': 'median'}),
+        ('handle_missing_values', {'strategy': 'constant', 'columns': ['city']}),
+        ('encode_categorical', {'method': 'label', 'columns': ['city']}),
+        ('encode_categorical', {'method': 'onehot', 'columns': ['code']})
+    ],
+    'filter_rows': [
+        ('handle_missing_values', {'strategy': 'mean', 'columns': ['amount']}),
+        ('remove_outliers', {'method': 'iqr', 'columns': ['amount']}),
+        ('remove_duplicates', {}),
+        ('encode_categorical', {'method': 'binary', 'columns': ['code']})
+    ],
+    'flag_and_hash': [
+        ('handle_missing_values', {'strategy': 'mode'}),
+        ('remove_outliers', {'method': 'zscore', 'columns': ['amount'], 'mode': 'flag'}),
+        ('encode_categorical', {'method': 'hashing', 'columns': ['code'], 'n_buckets': 3}),
+        ('remove_duplicates', {'subset': ['city', 'count']})
+    ]
+}
+
+
+@pytest.mark.parametrize('session', list(SESSIONS))
+@pytest.mark.parametrize('rows', [37, 1000])
+def test_replay_matches_eager_dataset(session, rows):
+    original = make_frame()
+    preprocessor = EnhancedDataPreprocessor(original.copy(), session, lazy=False)
+    for operation, params in SESSIONS[session]:
+        getattr(preprocessor, operation)(**params)
+
+    result = replayed(preprocessor, original, rows)
+
+    expected = preprocessor.df.reset_index(drop=True)
+    assert list(result.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_replay_skips_undone_operations():
+    original = make_frame()
+    preprocessor = EnhancedDataPreprocessor(original.copy(), 'undo', lazy=False)
+    preprocessor.handle_missing_values(strategy='mean')
+    preprocessor.remove_duplicates()
+    preprocessor.undo()
+
+    result = replayed(preprocessor, original, 50)
+
+    assert len(result) == len(original)
+    pd.testing.assert_frame_equal(result, preprocessor.df.reset_index(drop=True), check_dtype=False)
+
+
+def test_keep_last_duplicates_cannot_be_replayed():
+    preprocessor = EnhancedDataPreprocessor(make_frame(), 'keep_last', lazy=False)
+    preprocessor.remove_duplicates(keep='last')
+
+    with pytest.raises(ValueError, match='cannot be replayed'):
+        Recipe.compile(preprocessor.operations_log)
@@ -0,0 +1,82 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from app import EnhancedDataPreprocessor
+from utils.summary_engine import SummaryCache
+
+
+def make_frame(rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'amount': rng.normal(100, 15, rows),
+        'count': rng.integers(0, 5, rows),
+        'city': rng.choice(['north', 'south', 'east', 'west'], rows),
+        'code': rng.choice([f'c{i}' for i in range(40)], rows)
+    })
+    df.loc[rng.random(rows) < 0.1, 'amount'] = np.nan
+    df.loc[rng.random(rows) < 0.1, 'city'] = None
+    df.loc[::7, 'amount'] = 1000.0
+    # Repeated rows for the duplicate operations
+    return pd.concat([df, df.head(20)], ignore_index=True)
+
+
+def fresh_summary(preprocessor):
+    return SummaryCache().build(preprocessor.df, exact=True)
+
+
+def comparable(summary):
+    # NaN statistics compare equal once serialized
+    return json.loads(json.dumps(summary, default=str))
+
+
+OPERATIONS = {
+    'mean': lambda p: p.handle_missing_values(strategy='mean'),
+    'median': lambda p: p.handle_missing_values(strategy='median', columns=['amount']),
+    'mode': lambda p: p.handle_missing_values(strategy='mode'),
+    'constant': lambda p: p.handle_missing_values(strategy='constant', columns=['city']),
+    'knn': lambda p: p.handle_missing_values(strategy='knn', columns=['amount'], n_neighbors=3),
+    'label': lambda p: p.encode_categorical(method='label', columns=['city', 'code']),
+    'onehot': lambda p: p.encode_categorical(method='onehot', columns=['city']),
+    'hashing': lambda p: p.encode_categorical(method='hashing', columns=['code'], n_buckets=4),
+    'binary': lambda p: p.encode_categorical(method='binary', columns=['code']),
+    'outliers': lambda p: p.remove_outliers(method='iqr', columns=['amount']),
+    'zscore_flag': lambda p: p.remove_outliers(method='zscore', columns=['amount'], mode='flag'),
+    'mad': lambda p: p.remove_outliers(method='mad', columns=['amount', 'count']),
+    'duplicates': lambda p: p.remove_duplicates(),
+    'duplicates_subset': lambda p: p.remove_duplicates(subset=['city'], keep='last'),
+    'undo': lambda p: p.undo(),
+    'reset': lambda p: p.reset()
+}
+
+
+@pytest.mark.parametrize('name', [name for name in OPERATIONS if name not in ('undo', 'reset')])
+def test_cached_summary_matches_recompute_after_operation(name):
+    preprocessor = EnhancedDataPreprocessor(make_frame(), name, lazy=False)
+    # Warm every cached piece before the operation
+    preprocessor.get_comprehensive_summary(exact=True)
+
+    OPERATIONS[name](preprocessor)
+
+    assert comparable(preprocessor.get_comprehensive_summary(exact=True)) == comparable(fresh_summary(preprocessor))
+
+
+def test_cached_summary_matches_recompute_through_a_session():
+    preprocessor = EnhancedDataPreprocessor(make_frame(), 'session', lazy=False)
+    for name in ['mean', 'hashing', 'undo', 'outliers', 'duplicates', 'undo', 'binary', 'reset', 'label', 'mode']:
+        OPERATIONS[name](preprocessor)
+        summary = preprocessor.get_comprehensive_summary(exact=True)
+        assert comparable(summary) == comparable(fresh_summary(preprocessor)), name
+
+
+def test_hashing_updates_duplicate_count():
+    df = pd.DataFrame({'key': [f'value-{i}' for i in range(200)]})
+    preprocessor = EnhancedDataPreprocessor(df, 'hashing', lazy=False)
+    assert preprocessor.get_comprehensive_summary(exact=True)['duplicate_rows'] == 0
+
+    preprocessor.encode_categorical(method='hashing', columns=['key'], n_buckets=4)
+
+    summary = preprocessor.get_comprehensive_summary(exact=True)
+    assert summary['duplicate_rows'] == fresh_summary(preprocessor)['duplicate_rows']
+    assert summary['duplicate_rows'] == int(preprocessor.df.duplicated().sum()) > 0
+    assert preprocessor.remove_duplicates()['removed_count'] == summary['duplicate_rows']
@@ -0,0 +1,42 @@
+import io
+import numpy as np
+import pandas as pd
+import app as backend
+
+
+def upload(client, data, filename='data.csv'):
+    response = client.post('/api/dataset/upload', data={'file': (io.BytesIO(data), filename)},
+                           content_type='multipart/form-data')
+    return response.status_code, response.get_json()
+
+
+def test_identical_upload_reuses_parsed_frame():
+    client = backend.app.test_client()
+    data = pd.DataFrame({'a': np.arange(500), 'b': np.linspace(0, 1, 500)}).to_csv(index=False).encode()
+
+    status, first = upload(client, data)
+    assert status == 200 and first['data']['cached'] is False
+    status, second = upload(client, data)
+    assert status == 200 and second['data']['cached'] is True
+    assert second['data']['summary'] == first['data']['summary']
+
+    first_id, second_id = first['data']['dataset_id'], second['data']['dataset_id']
+    assert first_id != second_id
+    first_df, second_df = backend.datasets[first_id].df, backend.datasets[second_id].df
+    assert np.shares_memory(first_df['b'].to_numpy(), second_df['b'].to_numpy())
+
+    # Operations on one dataset leave the other and the cache untouched
+    backend.datasets[second_id].remove_outliers(columns=['b'], threshold=0.1)
+    assert len(backend.datasets[first_id].df) == 500
+
+    del backend.datasets[first_id]
+    assert backend.upload_cache.stats()['entries'] == 1
+    del backend.datasets[second_id]
+    assert backend.upload_cache.stats()['entries'] == 0
+
+
+def test_invalid_upload_is_rejected():
+    client = backend.app.test_client()
+    status, body = upload(client, b'', filename='data.csv')
+    assert status == 400 and body['success'] is False
+    assert backend.upload_cache.stats()['references'] == 0
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+from app import EnhancedDataPreprocessor
+from models.version_chain import VersionChain
+
+
+def make_frame():
+    return pd.DataFrame({
+        'amount': [1.0, np.nan, 3.0, 4.0, 100.0, 4.0],
+        'city': ['a', 'b', None, 'b', 'a', 'b'],
+        'count': [1, 2, 3, 4, 5, 4]
+    })
+
+
+def test_spill_keeps_every_version(tmp_path):
+    chain = VersionChain(make_frame())
+    chain.working = chain.working.assign(amount=chain.working['amount'].fillna(0))
+    chain.commit('fill')
+    chain.working = chain.working[chain.working['count'] < 5]
+    chain.commit('filter')
+    expected = [version.to_frame() for version in chain._versions]
+
+    chain.spill(str(tmp_path), 'dataset')
+    assert chain.is_spilled
+    assert chain.labels == ['original', 'fill', 'filter']
+    assert not list(tmp_path.iterdir())
+    for version, frame in zip(chain._versions, expected):
+        pd.testing.assert_frame_equal(version.to_frame(), frame)
+
+
+def test_undo_after_spill_steps_back_one_operation(tmp_path):
+    preprocessor = EnhancedDataPreprocessor(make_frame(), 'spill', lazy=False)
+    preprocessor.handle_missing_values(strategy='mean', columns=['amount'])
+    filled = preprocessor.df.copy()
+    preprocessor.encode_categorical(method='label', columns=['city'])
+
+    preprocessor.versions.spill(str(tmp_path), 'spill')
+    result = preprocessor.undo()
+
+    assert result['undone_operation'] == 'encode_categorical'
+    assert [entry['operation'] for entry in preprocessor.operations_log] == ['handle_missing_values']
+    pd.testing.assert_frame_equal(preprocessor.df, filled)
+    assert preprocessor.undo()['remaining_operations'] == 0
+    pd.testing.assert_frame_equal(preprocessor.df, make_frame())
+
+
+def test_undo_past_trimmed_versions_reverts_their_operations():
+    preprocessor = EnhancedDataPreprocessor(make_frame(), 'trim', lazy=False)
+    preprocessor.versions.max_versions = 2
+    preprocessor.handle_missing_values(strategy='mean', columns=['amount'])
+    preprocessor.encode_categorical(method='label', columns=['city'])
+    assert preprocessor.versions.labels == ['original', 'encode_categorical']
+
+    preprocessor.undo()
+
+    assert preprocessor.operations_log == []
+    pd.testing.assert_frame_equal(preprocessor.df, make_frame())
+
+
+def test_undo_of_shared_dataset_clears_the_log():
+    eager = EnhancedDataPreprocessor(make_frame(), 'shared', lazy=False)
+    eager.handle_missing_values(strategy='mean', columns=['amount'])
+    eager.remove_duplicates()
+    state = eager.shared_state()
+
+    rebuilt = EnhancedDataPreprocessor.from_shared('shared', eager.original_df, eager.df, state)
+    rebuilt.undo()
+
+    assert rebuilt.operations_log == []
+    pd.testing.assert_frame_equal(rebuilt.df, make_frame())
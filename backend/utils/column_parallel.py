@@ -0,0 +1,237 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import numpy as np
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _column_stats(values):
+    """mean/std/min/max of a column as reported in per-column results (NaN-aware, std with ddof=1)"""
+    present = values[~np.isnan(values)]
+    if len(present) == 0:
+        return {'mean': float('nan'), 'std': float('nan'), 'min': float('nan'), 'max': float('nan')}
+    std = float(np.std(present, ddof=1)) if len(present) > 1 else float('nan')
+    return {
+        'mean': float(np.mean(present)),
+        'std': std,
+        'min': float(np.min(present)),
+        'max': float(np.max(present))
+    }
+
+
+def _nonzero(scale):
+    """Replace a zero scale by 1, as the sklearn scalers do"""
+    return scale if scale != 0 else 1.0
+
+
+def _scale_column(values, params):
+    """Scale one column in place; mirrors the sklearn scalers used by Dataset"""
+    method = params['method']
+    present = values[~np.isnan(values)]
+    original_stats = _column_stats(values)
+
+    center, scale = 0.0, 1.0
+    if len(present) > 0:
+        if method == 'standard':
+            center, scale = np.mean(present), _nonzero(np.std(present))
+        elif method == 'minmax':
+            low = np.min(present)
+            center, scale = low, _nonzero(np.max(present) - low)
+        elif method == 'maxabs':
+            scale = _nonzero(np.max(np.abs(present)))
+        elif method == 'robust':
+            q25, median, q75 = np.percentile(present, [25, 50, 75])
+            iqr = q75 - q25
+            # normalize_data leaves constant-IQR columns alone, RobustScaler divides by 1
+            if iqr != 0 or not params.get('skip_zero_iqr'):
+                center, scale = median, _nonzero(iqr)
+        values -= center
+        values /= scale
+
+    return {
+        'status': 'success',
+        'method': method,
+        'original_stats': original_stats,
+        'new_stats': _column_stats(values),
+        'center': float(center),
+        'scale': float(scale)
+    }
+
+
+def _fill_column(values, params):
+    """Fill the missing values of one numerical column in place"""
+    strategy = params['strategy']
+    missing = np.isnan(values)
+    present = values[~missing]
+
+    if strategy == 'median':
+        fill_value = float(np.median(present)) if len(present) else float('nan')
+    elif strategy == 'mode':
+        if len(present):
+            # Smallest of the most frequent values, as pandas' mode()[0]
+            uniques, counts = np.unique(present, return_counts=True)
+            fill_value = float(uniques[np.argmax(counts)])
+        else:
+            fill_value = 0.0
+    elif strategy == 'constant':
+        fill_value = 0.0
+    else:
+        fill_value = float(np.mean(present)) if len(present) else float('nan')
+
+    values[missing] = fill_value
+    return {
+        'status': 'filled',
+        'filled': int(missing.sum() - np.isnan(values).sum()),
+        'strategy': strategy,
+        'fill_value': fill_value
+    }
+
+
+KERNELS = {
+    'scale': _scale_column,
+    'fill': _fill_column
+}
+
+
+def _run_shard(block_name, shape, start, stop, operation, params):
+    """Apply a kernel to columns [start, stop) of a shared block; runs in a worker process"""
+    # Spawned workers share the parent's resource tracker, which unlinks the block once
+    block_shm = shared_memory.SharedMemory(name=block_name)
+    block = np.ndarray(shape, dtype=np.float64, buffer=block_shm.buf, order='F')
+    try:
+        return start, _apply(block, start, stop, operation, params)
+    finally:
+        # The view must be gone before the mapping can be closed
+        block = None
+        block_shm.close()
+
+
+def _apply(block, start, stop, operation, params):
+    kernel = KERNELS[operation]
+    results = []
+    for j in range(start, stop):
+        try:
+            results.append(kernel(block[:, j], params))
+        except Exception as e:
+            results.append({'status': 'error', 'error': str(e)})
+    return results
+
+
+def _get_pool():
+    """Process pool shared by all datasets, created on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Never fork the threaded server; workers only need this module
+            context = multiprocessing.get_context('spawn')
+            _pool = ProcessPoolExecutor(max_workers=Config.COLUMN_PARALLEL_WORKERS, mp_context=context)
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+class ColumnParallel:
+    """Column-sharded execution of column-local numerical operations.
+
+    The selected columns are packed once into a column-major float64 block in
+    shared memory. Worker processes attach to the block by name and rewrite
+    their shard of columns in place, so only shard bounds and per-column results
+    cross the process boundary. Results come back in column order.
+    """
+
+    @staticmethod
+    def eligible_columns(df, columns):
+        """Columns with a plain NumPy int or float dtype, which the kernels handle exactly"""
+        return [col for col in columns if isinstance(df[col].dtype, np.dtype) and df[col].dtype.kind in 'iuf']
+
+    @staticmethod
+    def should_run(df, columns):
+        """Whether sharding pays off for this many columns and cells"""
+        return (Config.COLUMN_PARALLEL_WORKERS > 1
+                and len(columns) >= Config.COLUMN_PARALLEL_MIN_COLUMNS
+                and len(df) * len(columns) >= Config.COLUMN_PARALLEL_MIN_CELLS)
+
+    @staticmethod
+    def run(df, columns, operation, params, progress=None):
+        """Run a kernel over the columns; returns ({col: new values}, {col: result}).
+
+        progress(done) is called with the number of finished columns as shards
+        complete; an exception raised by it (e.g. a cancelled job) stops the run.
+        """
+        rows = len(df)
+        shape = (rows, len(columns))
+        block_shm = shared_memory.SharedMemory(create=True, size=max(1, rows * len(columns) * 8))
+        block = np.ndarray(shape, dtype=np.float64, buffer=block_shm.buf, order='F')
+        try:
+            for j, col in enumerate(columns):
+                block[:, j] = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+
+            results = ColumnParallel._run_shards(block_shm.name, block, operation, params, progress)
+
+            arrays = {}
+            for j, col in enumerate(columns):
+                dtype = df[col].dtype
+                # Float columns keep their width, integer columns become float like the scalers make them
+                arrays[col] = block[:, j].astype(dtype if dtype.kind == 'f' else np.float64, copy=True)
+            return arrays, dict(zip(columns, results))
+        finally:
+            block = None
+            block_shm.close()
+            block_shm.unlink()
+
+    @staticmethod
+    def _run_shards(block_name, block, operation, params, progress):
+        total = block.shape[1]
+        shard_count = min(total, Config.COLUMN_PARALLEL_WORKERS * 4)
+        bounds = np.linspace(0, total, shard_count + 1).astype(int)
+        shards = [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+        results = [None] * total
+
+        futures = []
+        try:
+            pool = _get_pool()
+            for start, stop in shards:
+                futures.append(pool.submit(_run_shard, block_name, block.shape, start, stop, operation, params))
+        except Exception as e:
+            logger.warning(f"Column process pool unavailable, running in process: {str(e)}")
+
+        done = 0
+        try:
+            for future in as_completed(futures):
+                start, shard_results = future.result()
+                results[start:start + len(shard_results)] = shard_results
+                done += len(shard_results)
+                if progress:
+                    progress(done)
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool next time
+            _reset_pool()
+            raise
+        except BaseException:
+            # Workers write into the block, so it must outlive every submitted shard
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            raise
+
+        # Shards the pool could not take run here
+        for start, stop in shards[len(futures):]:
+            results[start:stop] = _apply(block, start, stop, operation, params)
+            done += stop - start
+            if progress:
+                progress(done)
+        return results
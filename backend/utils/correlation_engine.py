@@ -0,0 +1,201 @@
+import threading
+import numpy as np
+
+# |r| at or above which a pair is reported, and at or above which it is "strong"
+MODERATE_THRESHOLD = 0.5
+STRONG_THRESHOLD = 0.7
+
+# Pairs quoted in the insights
+INSIGHT_PAIRS = 3
+
+CORRELATION_METHODS = ('pearson', 'spearman')
+
+
+class CorrelationEngine:
+    """Correlation matrices from float32 matrix products.
+
+    Columns are standardized once and copied into a float32 block. Without
+    missing values the matrix is a single Gram product; with missing values the
+    pairwise-complete sums (counts, sums, sums of squares and cross products
+    over rows where both columns are present) come from masked products, which
+    gives the same result as pandas' pairwise deletion. Spearman is Pearson on
+    column ranks; with missing values the ranks are taken over each column's
+    values rather than re-ranked per pair.
+    """
+
+    @staticmethod
+    def numerical_columns(df):
+        return df.select_dtypes(include=[np.number]).columns.tolist()
+
+    @staticmethod
+    def compute(df, method='pearson'):
+        """Return (columns, n x n float64 matrix) for the numerical columns of df"""
+        if method not in CORRELATION_METHODS:
+            raise ValueError(f"Invalid method. Must be one of: {list(CORRELATION_METHODS)}")
+        columns = CorrelationEngine.numerical_columns(df)
+        if len(columns) < 2:
+            return columns, np.empty((len(columns), len(columns)))
+
+        frame = df[columns]
+        if method == 'spearman':
+            frame = frame.rank()
+        block = CorrelationEngine._standardized_block(frame)
+        return columns, CorrelationEngine._pearson(block)
+
+    @staticmethod
+    def _standardized_block(frame):
+        """float32 copy of the frame with every column centered and scaled, NaN kept"""
+        block = np.empty(frame.shape, dtype=np.float32)
+        for j in range(frame.shape[1]):
+            values = frame.iloc[:, j].to_numpy(dtype=np.float64, na_value=np.nan)
+            present = values[~np.isnan(values)]
+            if len(present):
+                center = present.mean()
+                scale = present.std()
+                values = (values - center) / (scale if scale > 0 else 1.0)
+            block[:, j] = values
+        return block
+
+    @staticmethod
+    def _pearson(block):
+        missing = np.isnan(block)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if not missing.any():
+                gram = (block.T @ block).astype(np.float64)
+                diagonal = np.diag(gram)
+                matrix = gram / np.sqrt(np.outer(diagonal, diagonal))
+            else:
+                present = (~missing).astype(np.float32)
+                values = np.where(missing, np.float32(0), block)
+                counts = (present.T @ present).astype(np.float64)
+                sums = (values.T @ present).astype(np.float64)  # [i, j]: sum of column i where j is present
+                squares = ((values * values).T @ present).astype(np.float64)
+                products = (values.T @ values).astype(np.float64)
+
+                covariance = products - sums * sums.T / counts
+                variance_x = squares - sums * sums / counts
+                variance_y = variance_x.T
+                matrix = covariance / np.sqrt(variance_x * variance_y)
+                matrix[counts < 2] = np.nan
+
+        matrix = np.clip(matrix, -1.0, 1.0)
+        diagonal = np.diag(matrix)
+        np.fill_diagonal(matrix, np.where(np.isnan(diagonal), np.nan, 1.0))
+        return matrix
+
+    @staticmethod
+    def strong_pairs(columns, matrix, threshold=MODERATE_THRESHOLD, top_k=None):
+        """Pairs of the upper triangle with |r| >= threshold, in row order or the top_k by |r|"""
+        rows, cols = np.triu_indices(len(columns), k=1)
+        values = matrix[rows, cols]
+        with np.errstate(invalid='ignore'):
+            selected = np.flatnonzero(np.abs(values) >= threshold)
+        if top_k is not None:
+            order = np.argsort(-np.abs(values[selected]), kind='stable')
+            selected = selected[order[:top_k]]
+
+        pairs = []
+        for k in selected:
+            value = float(values[k])
+            pairs.append({
+                'col1': columns[rows[k]],
+                'col2': columns[cols[k]],
+                'correlation': value,
+                'strength': CorrelationEngine.strength(value),
+                'direction': 'positive' if value > 0 else 'negative'
+            })
+        return pairs
+
+    @staticmethod
+    def strength(value):
+        abs_value = abs(value)
+        if abs_value >= STRONG_THRESHOLD:
+            return "strong"
+        if abs_value >= MODERATE_THRESHOLD:
+            return "moderate"
+        return "weak"
+
+    @staticmethod
+    def insights(strong_correlations):
+        if len(strong_correlations) == 0:
+            return ["No strong correlations found between variables."]
+        insights = [f"Found {len(strong_correlations)} strong correlation(s)."]
+        for corr in strong_correlations[:INSIGHT_PAIRS]:
+            insights.append(
+                f"{corr['col1']} and {corr['col2']} have a {corr['strength']} {corr['direction']} correlation ({corr['correlation']:.3f})."
+            )
+        return insights
+
+    @staticmethod
+    def legacy_matrix(columns, matrix):
+        """n x n list of cell dicts in the original response format (missing values as 0)"""
+        filled = np.nan_to_num(matrix, nan=0.0)
+        abs_filled = np.abs(filled)
+        strengths = np.where(abs_filled >= STRONG_THRESHOLD, "strong",
+                             np.where(abs_filled >= MODERATE_THRESHOLD, "moderate", "weak"))
+        values = filled.tolist()
+        strengths = strengths.tolist()
+        return [
+            [{'value': values[i][j], 'strength': strengths[i][j], 'col1': col1, 'col2': col2}
+             for j, col2 in enumerate(columns)]
+            for i, col1 in enumerate(columns)
+        ]
+
+    @staticmethod
+    def analysis(columns, matrix, compact=False, top_k=None, include_matrix=True):
+        """Response payload for a computed matrix.
+
+        The compact form lists the columns once and sends the matrix as a flat
+        row-major array (null for undefined correlations); the legacy form keeps
+        the per-cell dicts the frontend was built against.
+        """
+        if len(columns) < 2:
+            return {
+                'numericalColumns': columns,
+                'correlationMatrix': [],
+                'strongCorrelations': [],
+                'insights': ['Not enough numerical columns for correlation analysis. Need at least 2 numerical columns.']
+            }
+
+        # The legacy response reported undefined correlations as 0
+        reported = matrix if compact else np.nan_to_num(matrix, nan=0.0)
+        strong_correlations = CorrelationEngine.strong_pairs(columns, reported, top_k=top_k)
+        result = {
+            'numericalColumns': columns,
+            'strongCorrelations': strong_correlations,
+            'insights': CorrelationEngine.insights(strong_correlations)
+        }
+        if not include_matrix:
+            return result
+        if compact:
+            flat = np.round(matrix, 6).ravel()
+            result['matrix'] = [None if np.isnan(value) else value for value in flat.tolist()]
+            result['format'] = 'compact'
+        else:
+            result['correlationMatrix'] = CorrelationEngine.legacy_matrix(columns, matrix)
+        return result
+
+
+class CorrelationCache:
+    """Correlation matrices of one dataset, valid for a single dataset version"""
+
+    def __init__(self):
+        self._version = None
+        self._matrices = {}
+        self._lock = threading.Lock()
+
+    def get(self, df, version, method='pearson'):
+        """(columns, matrix) for the dataset version, computing it on first use"""
+        with self._lock:
+            if self._version != version:
+                self._version = version
+                self._matrices = {}
+            cached = self._matrices.get(method)
+        if cached is not None:
+            return cached
+
+        cached = CorrelationEngine.compute(df, method)
+        with self._lock:
+            if self._version == version:
+                self._matrices[method] = cached
+        return cached
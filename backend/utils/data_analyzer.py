@@ -1,176 +1,163 @@
-import pandas as pd
 import numpy as np
-from scipy import stats
+from utils.data_profiler import DataProfiler
 
 class DataAnalyzer:
+    """Data quality analysis derived from a DataProfile.
+
+    Every method takes the DataFrame and optionally its profile. Pass the
+    profile of a ProfileCache to share one scan of the data between all
+    reports; their results are memoized on the profile.
+    """
+
     @staticmethod
-    def analyze_data_quality(df):
+    def analyze_data_quality(df, profile=None):
         """Analyze overall data quality"""
-        total_cells = df.shape[0] * df.shape[1]
-        missing_cells = df.isnull().sum().sum()
-        
+        profile = profile or DataProfiler.profile(df)
+        return profile.derived('quality', lambda: DataAnalyzer._quality(profile))
+
+    @staticmethod
+    def _quality(profile):
+        total_cells = profile.total_cells
+        missing_cells = profile.missing_cells
+        duplicate_rows = profile.duplicate_rows
+        constant_cols = [column.name for column in profile.columns.values() if column.unique <= 1]
+
         # Calculate quality score
-        missing_penalty = min(50, (missing_cells / total_cells) * 100)
-        
-        # Check for duplicates
-        duplicate_rows = df.duplicated().sum()
-        duplicate_penalty = min(20, (duplicate_rows / len(df)) * 100)
-        
-        # Check for constant columns
-        constant_cols = [col for col in df.columns if df[col].nunique() <= 1]
-        constant_penalty = min(10, len(constant_cols) / len(df.columns) * 100)
-        
+        missing_penalty = min(50, (missing_cells / total_cells) * 100) if total_cells else 0
+        duplicate_penalty = min(20, (duplicate_rows / profile.rows) * 100) if profile.rows else 0
+        constant_penalty = min(10, len(constant_cols) / len(profile.columns) * 100) if profile.columns else 0
+
         quality_score = max(0, 100 - missing_penalty - duplicate_penalty - constant_penalty)
-        
+
         return {
             'score': round(quality_score),
             'total_cells': total_cells,
             'missing_cells': missing_cells,
-            'missing_percentage': round((missing_cells / total_cells) * 100, 2),
+            'missing_percentage': round((missing_cells / total_cells) * 100, 2) if total_cells else 0.0,
             'duplicate_rows': duplicate_rows,
             'constant_columns': constant_cols,
-            'issues': DataAnalyzer._identify_issues(df)
+            'issues': DataAnalyzer._identify_issues(None, profile)
         }
-    
+
     @staticmethod
-    def _identify_issues(df):
+    def _identify_issues(df, profile=None):
         """Identify specific data quality issues"""
+        profile = profile or DataProfiler.profile(df)
+        return profile.derived('issues', lambda: DataAnalyzer._issues(profile))
+
+    @staticmethod
+    def _issues(profile):
         issues = []
-        
+        rows = profile.rows
+
         # Missing values
-        missing_counts = df.isnull().sum()
-        high_missing = missing_counts[missing_counts > len(df) * 0.3]
-        for col, count in high_missing.items():
-            pct = (count / len(df)) * 100
-            severity = 'high' if pct > 70 else 'medium'
-            issues.append({
-                'type': f'High missing values in {col}',
-                'count': count,
-                'severity': severity,
-                'description': f'{pct:.1f}% missing values'
-            })
-        
+        for column in profile.columns.values():
+            if column.missing > rows * 0.3:
+                pct = (column.missing / rows) * 100
+                severity = 'high' if pct > 70 else 'medium'
+                issues.append({
+                    'type': f'High missing values in {column.name}',
+                    'count': column.missing,
+                    'severity': severity,
+                    'description': f'{pct:.1f}% missing values'
+                })
+
         # Duplicate rows
-        duplicates = df.duplicated().sum()
+        duplicates = profile.duplicate_rows
         if duplicates > 0:
-            severity = 'high' if duplicates > len(df) * 0.1 else 'medium'
+            severity = 'high' if duplicates > rows * 0.1 else 'medium'
             issues.append({
                 'type': 'Duplicate rows',
                 'count': duplicates,
                 'severity': severity,
-                'description': f'{(duplicates/len(df)*100):.1f}% of rows are duplicates'
+                'description': f'{(duplicates/rows*100):.1f}% of rows are duplicates'
             })
-        
+
         # Constant columns
-        for col in df.columns:
-            if df[col].nunique() <= 1:
+        for column in profile.columns.values():
+            if column.unique <= 1:
                 issues.append({
-                    'type': f'Constant column: {col}',
+                    'type': f'Constant column: {column.name}',
                     'count': 1,
                     'severity': 'low',
                     'description': 'Column has only one unique value'
                 })
-        
+
         # Outliers in numerical columns
-        numerical_cols = df.select_dtypes(include=[np.number]).columns
-        for col in numerical_cols:
-            if df[col].notna().sum() > 0:
-                Q1 = df[col].quantile(0.25)
-                Q3 = df[col].quantile(0.75)
-                IQR = Q3 - Q1
-                outliers = df[(df[col] < Q1 - 1.5 * IQR) | (df[col] > Q3 + 1.5 * IQR)][col].count()
-                
-                if outliers > len(df) * 0.05:  # More than 5% outliers
-                    issues.append({
-                        'type': f'Outliers in {col}',
-                        'count': outliers,
-                        'severity': 'medium',
-                        'description': f'{(outliers/len(df)*100):.1f}% potential outliers'
-                    })
-        
+        for column in profile.of_kind('numerical'):
+            if column.outliers is not None and column.outliers > rows * 0.05:  # More than 5% outliers
+                issues.append({
+                    'type': f'Outliers in {column.name}',
+                    'count': column.outliers,
+                    'severity': 'medium',
+                    'description': f'{(column.outliers/rows*100):.1f}% potential outliers'
+                })
+
         return issues
-    
+
     @staticmethod
-    def generate_column_insights(df):
+    def generate_column_insights(df, profile=None):
         """Generate insights for each column"""
+        profile = profile or DataProfiler.profile(df)
+        return profile.derived('column_insights', lambda: DataAnalyzer._column_insights(profile))
+
+    @staticmethod
+    def _column_insights(profile):
         insights = []
-        
-        for col in df.columns:
-            col_data = df[col]
+
+        for column in profile.columns.values():
             insight = {
-                'name': col,
-                'dtype': str(col_data.dtype),
-                'non_null_count': col_data.notna().sum(),
-                'null_count': col_data.isnull().sum(),
-                'null_percentage': (col_data.isnull().sum() / len(df)) * 100,
-                'unique_count': col_data.nunique(),
-                'memory_usage': col_data.memory_usage(deep=True)
+                'name': column.name,
+                'dtype': column.dtype,
+                'non_null_count': column.non_null,
+                'null_count': column.missing,
+                'null_percentage': (column.missing / profile.rows) * 100 if profile.rows else 0.0,
+                'unique_count': column.unique,
+                'memory_usage': column.memory
             }
-            
+
             # Type-specific insights
-            if col_data.dtype in [np.number, 'int64', 'float64']:
-                # Numerical column
+            if column.kind == 'numerical':
                 insight['type'] = 'numerical'
-                if col_data.notna().sum() > 0:
-                    insight['stats'] = {
-                        'mean': float(col_data.mean()),
-                        'median': float(col_data.median()),
-                        'std': float(col_data.std()),
-                        'min': float(col_data.min()),
-                        'max': float(col_data.max()),
-                        'skewness': float(stats.skew(col_data.dropna())),
-                        'kurtosis': float(stats.kurtosis(col_data.dropna()))
-                    }
-                    
-                    # Check for outliers
-                    Q1 = col_data.quantile(0.25)
-                    Q3 = col_data.quantile(0.75)
-                    IQR = Q3 - Q1
-                    outliers = col_data[(col_data < Q1 - 1.5 * IQR) | (col_data > Q3 + 1.5 * IQR)].count()
-                    insight['outliers'] = outliers
-                    
-            elif col_data.dtype in ['object', 'category']:
-                # Categorical column
+                if column.stats is not None:
+                    insight['stats'] = dict(column.stats)
+                    insight['outliers'] = column.outliers
+
+            elif column.kind == 'categorical':
                 insight['type'] = 'categorical'
-                if col_data.notna().sum() > 0:
-                    value_counts = col_data.value_counts()
-                    insight['top_values'] = value_counts.head(10).to_dict()
-                    insight['cardinality'] = len(value_counts)
-                    
-                    # Check if it might be a date
-                    sample_values = col_data.dropna().head(100)
-                    date_like = 0
-                    for val in sample_values:
-                        try:
-                            pd.to_datetime(val)
-                            date_like += 1
-                        except:
-                            pass
-                    
-                    if date_like > len(sample_values) * 0.8:
+                if column.top_values is not None:
+                    insight['top_values'] = dict(column.top_values)
+                    insight['cardinality'] = column.unique
+                    if column.potential_date:
                         insight['potential_date'] = True
-            
+
             insights.append(insight)
-        
+
         return insights
-    
+
     @staticmethod
-    def suggest_preprocessing_steps(df):
+    def suggest_preprocessing_steps(df, profile=None):
         """Suggest preprocessing steps based on data analysis"""
+        profile = profile or DataProfiler.profile(df)
+        return profile.derived('suggestions', lambda: DataAnalyzer._suggestions(profile))
+
+    @staticmethod
+    def _suggestions(profile):
         suggestions = []
-        
+
         # Check missing values
-        missing_counts = df.isnull().sum()
-        if missing_counts.sum() > 0:
+        missing_cells = profile.missing_cells
+        if missing_cells > 0:
+            columns_with_missing = sum(1 for column in profile.columns.values() if column.missing > 0)
             suggestions.append({
                 'step': 'handle_missing_values',
                 'priority': 'high',
-                'description': f'Handle {missing_counts.sum()} missing values across {(missing_counts > 0).sum()} columns',
+                'description': f'Handle {missing_cells} missing values across {columns_with_missing} columns',
                 'recommended_strategy': 'mean for numerical, mode for categorical'
             })
-        
+
         # Check duplicates
-        duplicates = df.duplicated().sum()
+        duplicates = profile.duplicate_rows
         if duplicates > 0:
             suggestions.append({
                 'step': 'remove_duplicates',
@@ -178,29 +165,26 @@ class DataAnalyzer:
                 'description': f'Remove {duplicates} duplicate rows',
                 'recommended_strategy': 'drop_duplicates'
             })
-        
+
         # Check for normalization needs
-        numerical_cols = df.select_dtypes(include=[np.number]).columns
+        numerical_cols = profile.of_kind('numerical')
         if len(numerical_cols) > 1:
             # Check if scales are very different
-            ranges = {}
-            for col in numerical_cols:
-                if df[col].notna().sum() > 0:
-                    ranges[col] = df[col].max() - df[col].min()
-            
+            ranges = [column.stats['max'] - column.stats['min'] for column in numerical_cols if column.stats is not None]
+
             if len(ranges) > 1:
-                max_range = max(ranges.values())
-                min_range = min(ranges.values())
-                if max_range / min_range > 100:  # Very different scales
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    scale_ratio = np.float64(max(ranges)) / np.float64(min(ranges))
+                if scale_ratio > 100:  # Very different scales
                     suggestions.append({
                         'step': 'normalize_data',
                         'priority': 'medium',
                         'description': 'Numerical features have very different scales',
                         'recommended_strategy': 'standard or minmax scaling'
                     })
-        
+
         # Check for categorical encoding needs
-        categorical_cols = df.select_dtypes(include=['object', 'category']).columns
+        categorical_cols = profile.of_kind('categorical')
         if len(categorical_cols) > 0:
             suggestions.append({
                 'step': 'encode_categorical',
@@ -208,22 +192,26 @@ class DataAnalyzer:
                 'description': f'Encode {len(categorical_cols)} categorical columns for ML compatibility',
                 'recommended_strategy': 'label encoding for ordinal, one-hot for nominal'
             })
-        
+
         # Check for outliers
-        for col in numerical_cols:
-            if df[col].notna().sum() > 0:
-                Q1 = df[col].quantile(0.25)
-                Q3 = df[col].quantile(0.75)
-                IQR = Q3 - Q1
-                outliers = df[(df[col] < Q1 - 1.5 * IQR) | (df[col] > Q3 + 1.5 * IQR)][col].count()
-                
-                if outliers > len(df) * 0.05:  # More than 5% outliers
-                    suggestions.append({
-                        'step': 'remove_outliers',
-                        'priority': 'low',
-                        'description': f'Column {col} has {outliers} potential outliers',
-                        'recommended_strategy': 'IQR method or Z-score'
-                    })
-                    break  # Only suggest once
-        
+        for column in numerical_cols:
+            if column.outliers is not None and column.outliers > profile.rows * 0.05:  # More than 5% outliers
+                suggestions.append({
+                    'step': 'remove_outliers',
+                    'priority': 'low',
+                    'description': f'Column {column.name} has {column.outliers} potential outliers',
+                    'recommended_strategy': 'IQR method or Z-score'
+                })
+                break  # Only suggest once
+
         return suggestions
+
+    @staticmethod
+    def report(df, profile=None):
+        """Quality summary, column insights and suggestions from one profile"""
+        profile = profile or DataProfiler.profile(df)
+        return {
+            'quality': DataAnalyzer.analyze_data_quality(df, profile),
+            'column_insights': DataAnalyzer.generate_column_insights(df, profile),
+            'suggestions': DataAnalyzer.suggest_preprocessing_steps(df, profile)
+        }
@@ -0,0 +1,244 @@
+import threading
+import numpy as np
+import pandas as pd
+from utils.summary_engine import SummaryEngine, MAX_BATCH_CELLS, TOP_VALUES_LIMIT
+from utils.row_index import RowHashIndex
+
+# Tukey fence used for the outlier counts of the quality report
+OUTLIER_IQR_FACTOR = 1.5
+
+# Non-null values checked when guessing whether a text column holds dates
+DATE_SAMPLE_SIZE = 100
+
+
+class ColumnProfile:
+    """Everything the analyzer reports about one column, computed once"""
+
+    def __init__(self, name, dtype, kind, non_null, missing, unique, memory):
+        self.name = name
+        self.dtype = dtype
+        self.kind = kind  # 'numerical', 'categorical' or None
+        self.non_null = non_null
+        self.missing = missing
+        self.unique = unique
+        self.memory = memory
+        self.stats = None  # numerical: moments, extremes, quartiles, skewness and kurtosis
+        self.outliers = None  # numerical: values outside the IQR fences
+        self.top_values = None  # categorical: most frequent values
+        self.potential_date = False
+
+
+class DataProfile:
+    """Column profiles and frame-level counts of one dataset version.
+
+    Results derived from the profile are memoized on it with derived(), so they
+    live exactly as long as the version they describe.
+    """
+
+    def __init__(self, rows, columns, duplicate_rows):
+        self.rows = rows
+        self.columns = columns  # name -> ColumnProfile, in frame order
+        self.duplicate_rows = duplicate_rows
+        self._derived = {}
+        # Reentrant: a derived result may be built from other derived results
+        self._lock = threading.RLock()
+
+    @property
+    def total_cells(self):
+        return self.rows * len(self.columns)
+
+    @property
+    def missing_cells(self):
+        return sum(column.missing for column in self.columns.values())
+
+    def of_kind(self, kind):
+        return [column for column in self.columns.values() if column.kind == kind]
+
+    def derived(self, key, build):
+        """Result of build() for key, computed on first use"""
+        with self._lock:
+            if key not in self._derived:
+                self._derived[key] = build()
+            return self._derived[key]
+
+
+class DataProfiler:
+    """Single-pass profiling of a DataFrame.
+
+    Null counts, memory usage and duplicate rows come from one frame-wide call
+    each. Numerical columns are profiled in float64 blocks: SummaryEngine's
+    partition gives extremes and quartiles, and the central moments and IQR
+    outlier counts are reductions over the same block. Each categorical column
+    gets one value_counts, which also gives its cardinality.
+    """
+
+    @staticmethod
+    def profile(df, row_index=None):
+        """Profile df; a RowHashIndex of the dataset answers the duplicate count"""
+        rows = len(df)
+        missing_counts = df.isnull().sum()
+        memory = df.memory_usage(deep=True, index=False)
+        # Series.memory_usage counts the index too, as the per-column insights always have
+        index_memory = int(df.index.memory_usage(deep=True))
+
+        numerical_cols = df.select_dtypes(include=[np.number]).columns
+        categorical_cols = df.select_dtypes(include=['object', 'category']).columns
+        numerical_set = set(numerical_cols)
+        categorical_set = set(categorical_cols)
+
+        columns = {}
+        for col in df.columns:
+            kind = 'numerical' if col in numerical_set else 'categorical' if col in categorical_set else None
+            missing = int(missing_counts[col])
+            columns[col] = ColumnProfile(
+                col, str(df[col].dtype), kind, rows - missing, missing,
+                # Categorical cardinality comes from value_counts below
+                None if kind == 'categorical' else DataProfiler._nunique(df[col]),
+                int(memory[col]) + index_memory
+            )
+
+        DataProfiler._profile_numerical(df, list(numerical_cols), columns)
+        for col in categorical_cols:
+            DataProfiler._profile_categorical(df[col], columns[col])
+
+        if not rows:
+            duplicate_rows = 0
+        else:
+            # A throwaway index also copes with sparse columns, which DataFrame.duplicated may not
+            duplicate_rows = int((row_index or RowHashIndex()).duplicate_count(df))
+        return DataProfile(rows, columns, duplicate_rows)
+
+    @staticmethod
+    def _nunique(series):
+        if not isinstance(series.dtype, pd.SparseDtype):
+            return int(series.nunique())
+        # Distinct stored values, plus the fill value when some rows hold it
+        array = series.array
+        stored = pd.unique(array.sp_values[pd.notna(array.sp_values)])
+        fill_used = len(array.sp_values) < len(array) and pd.notna(array.fill_value)
+        return len(stored) + int(fill_used and array.fill_value not in set(stored))
+
+    @staticmethod
+    def _profile_numerical(df, numerical_cols, columns):
+        if not numerical_cols or len(df) == 0:
+            return
+        sparse = [col for col in numerical_cols if isinstance(df[col].dtype, pd.SparseDtype)]
+        for col in sparse:
+            DataProfiler._profile_sparse(df[col], columns[col])
+        dense = [col for col in numerical_cols if col not in set(sparse)]
+
+        batch_size = max(1, MAX_BATCH_CELLS // len(df))
+        for start in range(0, len(dense), batch_size):
+            batch = dense[start:start + batch_size]
+            block = df[batch].to_numpy(dtype=np.float64, na_value=np.nan)
+            stats = SummaryEngine._block_stats(block, batch)
+            skewness, kurtosis = DataProfiler._shape_moments(block)
+
+            for j, col in enumerate(batch):
+                if col not in stats:
+                    continue
+                col_stats = stats[col]
+                low, high = DataProfiler._fences(col_stats)
+                values = block[:, j]
+                with np.errstate(invalid='ignore'):
+                    columns[col].outliers = int(((values < low) | (values > high)).sum())
+                columns[col].stats = DataProfiler._column_stats(col_stats, skewness[j], kurtosis[j])
+
+    @staticmethod
+    def _profile_sparse(series, column):
+        """Numerical profile of a sparse column from its stored values and fill count"""
+        col_stats = SummaryEngine._sparse_stats(series)
+        if col_stats is None:
+            return
+        values, fill, fill_count = SummaryEngine.sparse_values(series)
+        low, high = DataProfiler._fences(col_stats)
+        fill_outside = fill_count if (fill < low or fill > high) else 0
+        column.outliers = int(((values < low) | (values > high)).sum()) + fill_outside
+
+        # Biased central moments, weighting the fill by its count
+        count = col_stats['count']
+        mean = col_stats['mean']
+        deviations = np.append(values - mean, fill - mean)
+        weights = np.append(np.ones(len(values)), fill_count)
+        m2, m3, m4 = ((weights * deviations ** power).sum() / count for power in (2, 3, 4))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            constant = m2 <= (np.finfo(np.float64).resolution * mean) ** 2
+            skewness = np.nan if constant else m3 / m2 ** 1.5
+            kurtosis = np.nan if constant else m4 / m2 ** 2 - 3.0
+        column.stats = DataProfiler._column_stats(col_stats, skewness, kurtosis)
+
+    @staticmethod
+    def _fences(col_stats):
+        iqr = col_stats['75%'] - col_stats['25%']
+        return col_stats['25%'] - OUTLIER_IQR_FACTOR * iqr, col_stats['75%'] + OUTLIER_IQR_FACTOR * iqr
+
+    @staticmethod
+    def _column_stats(col_stats, skewness, kurtosis):
+        return {
+            'mean': col_stats['mean'],
+            'median': col_stats['50%'],
+            'std': col_stats['std'],
+            'min': col_stats['min'],
+            'max': col_stats['max'],
+            'skewness': float(skewness),
+            'kurtosis': float(kurtosis)
+        }
+
+    @staticmethod
+    def _shape_moments(block):
+        """Biased skewness and excess kurtosis per column, as scipy.stats reports them"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            counts = (~np.isnan(block)).sum(axis=0)
+            means = np.nansum(block, axis=0) / counts
+            deviations = block - means
+            squared = deviations * deviations
+            m2 = np.nansum(squared, axis=0) / counts
+            m3 = np.nansum(squared * deviations, axis=0) / counts
+            m4 = np.nansum(squared * squared, axis=0) / counts
+            # scipy treats a variance within rounding of zero as a constant column
+            constant = m2 <= (np.finfo(np.float64).resolution * means) ** 2
+            skewness = np.where(constant, np.nan, m3 / m2 ** 1.5)
+            kurtosis = np.where(constant, np.nan, m4 / m2 ** 2 - 3.0)
+        return skewness, kurtosis
+
+    @staticmethod
+    def _profile_categorical(col_data, column):
+        value_counts = col_data.value_counts()
+        value_counts = value_counts[value_counts > 0]
+        column.unique = int(len(value_counts))
+        if column.non_null == 0:
+            return
+        column.top_values = {str(k): int(v) for k, v in value_counts.head(TOP_VALUES_LIMIT).items()}
+
+        sample_values = col_data.dropna().head(DATE_SAMPLE_SIZE)
+        date_like = 0
+        for val in sample_values:
+            try:
+                pd.to_datetime(val)
+                date_like += 1
+            except Exception:
+                pass
+        column.potential_date = date_like > len(sample_values) * 0.8
+
+
+class ProfileCache:
+    """Profile of one dataset, valid for a single dataset version"""
+
+    def __init__(self):
+        self._version = None
+        self._profile = None
+        self._lock = threading.Lock()
+
+    def get(self, df, version, row_index=None):
+        """DataProfile for the dataset version, computing it on first use"""
+        with self._lock:
+            if self._version == version and self._profile is not None:
+                return self._profile
+
+        profile = DataProfiler.profile(df, row_index)
+        with self._lock:
+            # Versions only grow; never replace a newer profile with an older one
+            if self._version is None or version >= self._version:
+                self._version = version
+                self._profile = profile
+        return profile
@@ -1,5 +1,66 @@
 import pandas as pd
-import numpy as np
+from utils.ingestion import read_csv_chunked, IngestionError
+from utils.encoding import ENCODING_METHODS
+
+class ChunkValidator:
+    """Runs the upload checks incrementally while a file is parsed in chunks"""
+    
+    def __init__(self, large_rows=100000, many_columns=1000):
+        self.errors = []
+        self.warnings = []
+        self.large_rows = large_rows
+        self.many_columns = many_columns
+        self.columns = None
+        self.row_count = 0
+        self.null_counts = None
+    
+    def check_header(self, columns):
+        """Checks that only need the column names"""
+        self.columns = columns
+        self.null_counts = pd.Series(0, index=columns, dtype='int64')
+        
+        # Check for duplicate column names
+        if columns.duplicated().any():
+            self.errors.append("Duplicate column names found")
+        
+        # Check for invalid column names
+        invalid_cols = [col for col in columns if not isinstance(col, str) or col.strip() == '']
+        if invalid_cols:
+            self.errors.append(f"Invalid column names: {invalid_cols}")
+    
+    def update(self, chunk):
+        """Accumulate per-column statistics from one parsed chunk"""
+        if self.columns is None:
+            self.check_header(chunk.columns)
+        self.row_count += len(chunk)
+        self.null_counts += chunk.isnull().sum().to_numpy()
+    
+    def finish(self):
+        """Checks that need the whole file; returns (errors, warnings)"""
+        # Check if file is empty
+        if self.row_count == 0:
+            self.errors.insert(0, "File is empty")
+            return self.errors, self.warnings
+        
+        # Check file size constraints
+        if self.row_count > self.large_rows:
+            self.warnings.append(f"Large dataset ({self.row_count} rows). Processing may take longer.")
+        
+        if len(self.columns) > self.many_columns:
+            self.warnings.append(f"Many columns ({len(self.columns)}). Consider feature selection.")
+        
+        # Check for completely empty columns
+        empty_cols = self.null_counts.index[self.null_counts == self.row_count].tolist()
+        if empty_cols:
+            self.warnings.append(f"Completely empty columns found: {empty_cols}")
+        
+        # Check for high missing value percentage
+        missing_pct = (self.null_counts / self.row_count) * 100
+        high_missing_cols = missing_pct[missing_pct > 80].index.tolist()
+        if high_missing_cols:
+            self.warnings.append(f"Columns with >80% missing values: {high_missing_cols}")
+        
+        return self.errors, self.warnings
 
 class DataValidator:
     @staticmethod
@@ -9,45 +70,18 @@ class DataValidator:
         warnings = []
         
         try:
-            # Try to read the file
-            df = pd.read_csv(file)
+            # Parse and validate in one chunked pass
+            validator = ChunkValidator()
+            df = read_csv_chunked(file, validator=validator)
+            errors, warnings = validator.finish()
             
-            # Check if file is empty
-            if df.empty:
-                errors.append("File is empty")
+            if validator.row_count == 0:
                 return errors, warnings, None
             
-            # Check file size constraints
-            if len(df) > 100000:
-                warnings.append(f"Large dataset ({len(df)} rows). Processing may take longer.")
-            
-            if len(df.columns) > 1000:
-                warnings.append(f"Many columns ({len(df.columns)}). Consider feature selection.")
-            
-            # Check for completely empty columns
-            empty_cols = df.columns[df.isnull().all()].tolist()
-            if empty_cols:
-                warnings.append(f"Completely empty columns found: {empty_cols}")
-            
-            # Check for high missing value percentage
-            missing_pct = (df.isnull().sum() / len(df)) * 100
-            high_missing_cols = missing_pct[missing_pct > 80].index.tolist()
-            if high_missing_cols:
-                warnings.append(f"Columns with >80% missing values: {high_missing_cols}")
-            
-            # Check for duplicate column names
-            if df.columns.duplicated().any():
-                errors.append("Duplicate column names found")
-            
-            # Check for invalid column names
-            invalid_cols = [col for col in df.columns if not isinstance(col, str) or col.strip() == '']
-            if invalid_cols:
-                errors.append(f"Invalid column names: {invalid_cols}")
-            
             return errors, warnings, df
             
-        except pd.errors.EmptyDataError:
-            errors.append("File is empty or has no data")
+        except IngestionError as e:
+            errors.append(str(e))
         except pd.errors.ParserError as e:
             errors.append(f"Error parsing CSV: {str(e)}")
         except Exception as e:
@@ -81,7 +115,7 @@ class DataValidator:
             
             if columns:
                 # Check if columns are numerical
-                non_numeric = [col for col in columns if col in df.columns and df[col].dtype not in [np.number, 'int64', 'float64']]
+                non_numeric = [col for col in columns if col in df.columns and not pd.api.types.is_numeric_dtype(df[col])]
                 if non_numeric:
                     errors.append(f"Non-numeric columns cannot be normalized: {non_numeric}")
         
@@ -89,7 +123,7 @@ class DataValidator:
             method = params.get('method', 'label')
             columns = params.get('columns', [])
             
-            if method not in ['label', 'onehot']:
+            if method not in ENCODING_METHODS:
                 errors.append(f"Invalid encoding method: {method}")
             
             if columns:
@@ -0,0 +1,215 @@
+import threading
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+ENCODING_METHODS = ('label', 'onehot', 'hashing', 'binary')
+
+# Code of missing (and, when transforming new data, unseen) values
+MISSING_CODE = -1
+
+
+def code_dtype(n_classes):
+    """Smallest signed integer dtype holding codes 0..n_classes-1 and MISSING_CODE"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_classes - 1 <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+class LabelMapping:
+    """Classes of a label-encoded column: code i stands for classes[i]"""
+
+    def __init__(self, classes):
+        self.classes = pd.Index(classes)
+        self.dtype = code_dtype(len(self.classes))
+
+    @staticmethod
+    def fit_transform(series):
+        """Return (mapping, codes) for a column, in one vectorized factorize.
+
+        Classes are sorted, as LabelEncoder sorts them; values that cannot be
+        ordered against each other keep their order of appearance.
+        """
+        try:
+            codes, classes = pd.factorize(series, sort=True)
+        except TypeError:
+            codes, classes = pd.factorize(series)
+        mapping = LabelMapping(classes)
+        # factorize already marks missing values with -1
+        return mapping, codes.astype(mapping.dtype, copy=False)
+
+    def transform(self, values):
+        """Codes of new values without refitting; missing and unseen values get MISSING_CODE"""
+        codes = self.classes.get_indexer(pd.Index(values))
+        return codes.astype(self.dtype, copy=False)
+
+    def inverse_transform(self, codes):
+        """Original values of codes as an object array; MISSING_CODE becomes NaN"""
+        codes = np.asarray(codes, dtype=np.int64)
+        values = np.asarray(self.classes, dtype=object)
+        decoded = np.full(len(codes), np.nan, dtype=object)
+        known = (codes >= 0) & (codes < len(values))
+        decoded[known] = values[codes[known]]
+        return decoded
+
+    def to_dict(self):
+        return {
+            'classes': self.classes.tolist(),
+            'dtype': self.dtype.name,
+            'missing_code': MISSING_CODE
+        }
+
+
+class LabelEncodings:
+    """Label mappings of a dataset's encoded columns.
+
+    A mapping is kept with the code column it produced and only applies while
+    the dataset's column still holds those codes (row removals aside), so undo,
+    reset or a later operation that rewrites the column retire it without
+    further bookkeeping.
+    """
+
+    def __init__(self):
+        self._mappings = {}  # col -> (LabelMapping, codes Series)
+        self._lock = threading.Lock()
+
+    def record(self, col, mapping, codes):
+        with self._lock:
+            self._mappings[col] = (mapping, codes)
+
+    def get(self, df, col):
+        """Mapping of col if df's column still holds its codes, else None"""
+        with self._lock:
+            entry = self._mappings.get(col)
+        if entry is None or col not in df.columns:
+            return None
+        mapping, codes = entry
+        current = df[col]
+        if current.dtype != codes.dtype:
+            return None
+        expected = codes.to_numpy()
+        if not current.index.equals(codes.index):
+            # Rows removed since encoding keep their codes
+            if not codes.index.is_unique:
+                return None
+            positions = codes.index.get_indexer(current.index)
+            if (positions < 0).any():
+                return None
+            expected = expected[positions]
+        if not np.array_equal(current.to_numpy(), expected):
+            return None
+        return mapping
+
+    def mappings(self, df):
+        """{col: LabelMapping} of the columns of df that hold label codes"""
+        with self._lock:
+            columns = list(self._mappings)
+        found = {col: self.get(df, col) for col in columns}
+        return {col: mapping for col, mapping in found.items() if mapping is not None}
+
+    def transform(self, df, col, values):
+        """Codes of new values of an encoded column"""
+        mapping = self.get(df, col)
+        if mapping is None:
+            raise ValueError(f"Column {col} is not label encoded")
+        return mapping.transform(values)
+
+    def decode(self, df):
+        """Shallow copy of df with the label-encoded columns mapped back to their values"""
+        mappings = self.mappings(df)
+        if not mappings:
+            return df
+        decoded = df.copy(deep=False)
+        for col, mapping in mappings.items():
+            decoded[col] = mapping.inverse_transform(df[col].to_numpy())
+        return decoded
+
+
+class CategoricalEncoder:
+    """Indicator encodings of a column as new columns, built from one factorize.
+
+    Each method returns a DataFrame of the new columns (named after the
+    source column) on the series' index, so a caller can add the columns of
+    every encoded column to the frame in a single concat. Indicators are
+    bool, as get_dummies makes them, so numerical defaults (outliers, scaling,
+    KNN features, correlations) leave them out.
+    """
+
+    # Sparse indicator dtype: only the True values are stored
+    SPARSE_DTYPE = pd.SparseDtype(bool, False)
+
+    @staticmethod
+    def onehot(series):
+        """One sparse bool indicator column per value plus '<col>_nan', as get_dummies(dummy_na=True) names them.
+
+        Only the ones are stored, so memory grows with the row count rather
+        than rows x values.
+        """
+        try:
+            codes, classes = pd.factorize(series, sort=True)
+        except TypeError:
+            codes, classes = pd.factorize(series)
+        # Missing values go to the last column
+        codes = np.where(codes == MISSING_CODE, len(classes), codes)
+        names = [f'{series.name}_{value}' for value in classes] + [f'{series.name}_nan']
+        return CategoricalEncoder._sparse_indicators(codes, len(names), names, series.index)
+
+    @staticmethod
+    def hashing(series, n_buckets):
+        """Sparse bool indicators of hash(value) % n_buckets; missing values set no bucket.
+
+        Buckets come from pandas' stable hash of each distinct value, so the same
+        value lands in the same bucket in every dataset and process.
+        """
+        if n_buckets < 1:
+            raise ValueError("n_buckets must be positive")
+        codes, uniques = pd.factorize(series)
+        buckets = (pd.util.hash_array(np.asarray(uniques, dtype=object)) % np.uint64(n_buckets)).astype(np.int64)
+        present = codes != MISSING_CODE
+        names = [f'{series.name}_hash_{i}' for i in range(n_buckets)]
+        rows = np.flatnonzero(present)
+        block = CategoricalEncoder._sparse_indicators(buckets[codes[present]], n_buckets, names, series.index, rows)
+        return block, int(len(np.unique(buckets)))
+
+    @staticmethod
+    def onehot_transform(series, names):
+        """onehot() indicators of new values for the fitted column names; unseen values set no column"""
+        prefix = f'{series.name}_'
+        labels = pd.Index([name[len(prefix):] for name in names[:-1]])
+        codes, uniques = pd.factorize(series)
+        # Values are matched by the text of their column name, as get_dummies named them
+        unique_codes = labels.get_indexer(pd.Index([str(value) for value in uniques], dtype=object))
+        codes = np.where(codes == MISSING_CODE, len(labels), unique_codes[codes] if len(uniques) else codes)
+        rows = np.flatnonzero(codes != MISSING_CODE)
+        return CategoricalEncoder._sparse_indicators(codes[rows], len(names), list(names), series.index, rows)
+
+    @staticmethod
+    def binary(series):
+        """Bits of (label code + 1) as dense bool columns, most significant first; missing values are all zeros"""
+        mapping, codes = LabelMapping.fit_transform(series)
+        return CategoricalEncoder._bits(series, codes, len(mapping.classes)), mapping
+
+    @staticmethod
+    def binary_transform(series, mapping):
+        """binary() columns of new values for a fitted mapping; unseen values are all zeros, as missing ones"""
+        return CategoricalEncoder._bits(series, mapping.transform(series), len(mapping.classes))
+
+    @staticmethod
+    def _bits(series, codes, n_classes):
+        values = codes.astype(np.int64) + 1
+        bits = max(1, int(n_classes).bit_length())
+        columns = {
+            f'{series.name}_bin_{i}': ((values >> (bits - 1 - i)) & 1).astype(bool)
+            for i in range(bits)
+        }
+        return pd.DataFrame(columns, index=series.index)
+
+    @staticmethod
+    def _sparse_indicators(columns, n_columns, names, index, rows=None):
+        rows = np.arange(len(index)) if rows is None else rows
+        matrix = sparse.csc_matrix(
+            (np.ones(len(rows), dtype=np.uint8), (rows, columns)), shape=(len(index), n_columns)
+        )
+        block = pd.DataFrame.sparse.from_spmatrix(matrix, index=index, columns=names)
+        return block.astype(CategoricalEncoder.SPARSE_DTYPE)
@@ -0,0 +1,199 @@
+import itertools
+import tempfile
+import zlib
+import pandas as pd
+from flask import Response, stream_with_context
+from config.config import Config
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'csv.gz': ('application/gzip', '.csv.gz'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+    'feather': ('application/vnd.apache.arrow.file', '.feather')
+}
+
+# Accepted spellings of the format query parameter
+FORMAT_ALIASES = {
+    'gzip': 'csv.gz',
+    'gz': 'csv.gz',
+    'arrow': 'feather'
+}
+
+# Bytes per chunk when streaming a binary export back from its temporary file
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+class DatasetExporter:
+    """Streams a DataFrame as CSV, gzip-compressed CSV, Parquet or Feather.
+
+    CSV is encoded one row slice at a time, so at most one slice of text exists
+    at any moment. Parquet and Feather need a seekable file for their footer; they
+    are written slice by slice into a spooled temporary file (in memory while
+    small, on disk beyond EXPORT_SPOOL_BYTES) and streamed back from it.
+    """
+
+    @staticmethod
+    def resolve_format(fmt):
+        """Normalize the requested format name, raising ValueError if unsupported"""
+        fmt = (fmt or 'csv').strip().lower().lstrip('.')
+        fmt = FORMAT_ALIASES.get(fmt, fmt)
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}")
+        return fmt
+
+    @staticmethod
+    def stream(df, fmt='csv', chunk_rows=None):
+        """Return (chunks, mimetype, extension) for exporting df in the given format.
+
+        Everything that can fail on the data (unsupported format, Arrow schema) is
+        checked here, before the first chunk is produced.
+        """
+        fmt = DatasetExporter.resolve_format(fmt)
+        chunk_rows = chunk_rows or Config.EXPORT_CHUNK_ROWS
+        mimetype, extension = EXPORT_FORMATS[fmt]
+
+        if fmt == 'csv':
+            chunks = DatasetExporter.iter_csv(df, chunk_rows)
+        elif fmt == 'csv.gz':
+            chunks = DatasetExporter.iter_gzip(DatasetExporter.iter_csv(df, chunk_rows))
+        else:
+            df = DatasetExporter._arrow_compatible(df)
+            schema = DatasetExporter._arrow_schema(df)
+            chunks = DatasetExporter.iter_arrow(df, fmt, schema, chunk_rows)
+        return chunks, mimetype, extension
+
+    @staticmethod
+    def stream_frames(frames, fmt='csv'):
+        """Return (chunks, mimetype, extension) for exporting a stream of frames with the same columns.
+
+        Only the CSV formats can be written without knowing every frame's types
+        up front. The first frame is produced here, so errors in producing it
+        surface before the first chunk.
+        """
+        fmt = DatasetExporter.resolve_format(fmt)
+        if fmt not in ('csv', 'csv.gz'):
+            raise ValueError("Streamed results can only be exported as csv or csv.gz")
+        mimetype, extension = EXPORT_FORMATS[fmt]
+        frames = iter(frames)
+        first = next(frames, None)
+        frames = itertools.chain([] if first is None else [first], frames)
+        chunks = DatasetExporter.iter_csv_frames(frames)
+        if fmt == 'csv.gz':
+            chunks = DatasetExporter.iter_gzip(chunks)
+        return chunks, mimetype, extension
+
+    @staticmethod
+    def iter_csv(df, chunk_rows):
+        """Yield UTF-8 encoded CSV text one row slice at a time"""
+        if len(df) == 0:
+            return DatasetExporter.iter_csv_frames([df])
+        return DatasetExporter.iter_csv_frames(df.iloc[start:start + chunk_rows] for start in range(0, len(df), chunk_rows))
+
+    @staticmethod
+    def iter_csv_frames(frames):
+        """Yield UTF-8 encoded CSV text of each frame; the header comes from the first one"""
+        header = True
+        for frame in frames:
+            if len(frame) or header:
+                yield frame.to_csv(index=False, header=header).encode('utf-8')
+            header = False
+
+    @staticmethod
+    def iter_gzip(chunks, level=6):
+        """Gzip-compress a stream of byte chunks"""
+        compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+        for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    @staticmethod
+    def iter_arrow(df, fmt, schema, chunk_rows):
+        """Write Parquet row groups or Feather record batches to a spooled file and stream it"""
+        import pyarrow as pa
+
+        with tempfile.SpooledTemporaryFile(max_size=Config.EXPORT_SPOOL_BYTES) as spool:
+            sink = pa.PythonFile(spool, mode='w')
+            if fmt == 'parquet':
+                import pyarrow.parquet as pq
+                writer = pq.ParquetWriter(sink, schema)
+            else:
+                writer = pa.ipc.new_file(sink, schema)
+
+            with writer:
+                for start in range(0, len(df), chunk_rows):
+                    piece = DatasetExporter._densify(df.iloc[start:start + chunk_rows])
+                    table = pa.Table.from_pandas(piece, schema=schema, preserve_index=False)
+                    writer.write_table(table)
+
+            spool.seek(0)
+            while True:
+                block = spool.read(READ_BLOCK_SIZE)
+                if not block:
+                    break
+                yield block
+
+    @staticmethod
+    def _arrow_compatible(df):
+        """Give Arrow string column names and store mixed-type object columns as strings"""
+        df = df.copy(deep=False)
+        df.columns = [str(col) for col in df.columns]
+        if not df.columns.is_unique:
+            raise ValueError("Parquet and Feather exports require unique column names")
+        for i in range(df.shape[1]):
+            values = df.iloc[:, i]
+            if values.dtype == object and pd.api.types.infer_dtype(values, skipna=True).startswith('mixed'):
+                df[df.columns[i]] = values.astype(str).where(values.notna(), None)
+        return df
+
+    @staticmethod
+    def _arrow_schema(df):
+        """Arrow schema for the whole frame, so every slice is written with the same types"""
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ValueError("Parquet and Feather exports require pyarrow")
+        # Arrow has no sparse columns; they are written with their dense type
+        sparse_columns = {col: dtype for col, dtype in df.dtypes.items() if isinstance(dtype, pd.SparseDtype)}
+        try:
+            schema = pa.Schema.from_pandas(df.drop(columns=list(sparse_columns)), preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise ValueError(f"Dataset cannot be exported in this format: {str(e)}")
+        if not sparse_columns:
+            return schema
+        fields = [
+            pa.field(col, pa.from_numpy_dtype(sparse_columns[col].subtype)) if col in sparse_columns else schema.field(col)
+            for col in df.columns
+        ]
+        return pa.schema(fields)
+
+    @staticmethod
+    def _densify(df):
+        """Slice with sparse columns converted to dense arrays"""
+        sparse_columns = [col for col, dtype in df.dtypes.items() if isinstance(dtype, pd.SparseDtype)]
+        if not sparse_columns:
+            return df
+        df = df.copy(deep=False)
+        for col in sparse_columns:
+            df[col] = df[col].sparse.to_dense()
+        return df
+
+    @staticmethod
+    def response(df, fmt, basename):
+        """Flask response streaming df as an attachment named basename + extension"""
+        return DatasetExporter.attachment(*DatasetExporter.stream(df, fmt), basename)
+
+    @staticmethod
+    def frames_response(frames, fmt, basename):
+        """Flask response streaming a stream of frames as one attachment named basename + extension"""
+        return DatasetExporter.attachment(*DatasetExporter.stream_frames(frames, fmt), basename)
+
+    @staticmethod
+    def attachment(chunks, mimetype, extension, basename):
+        return Response(
+            stream_with_context(chunks),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename="{basename}{extension}"'}
+        )
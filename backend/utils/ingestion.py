@@ -0,0 +1,457 @@
+import os
+import multiprocessing
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import numpy as np
+from pandas.api.types import union_categoricals
+from config.config import Config
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+
+# Column naming the source sheet when several sheets are read into one frame
+SHEET_COLUMN = 'sheet'
+
+
+class IngestionError(ValueError):
+    """Raised when an upload breaks a size limit or cannot be parsed"""
+    pass
+
+
+def infer_category_columns(sample, max_unique_ratio=None):
+    """Pick the string columns of a sample chunk worth storing as categories"""
+    max_unique_ratio = Config.CATEGORY_MAX_UNIQUE_RATIO if max_unique_ratio is None else max_unique_ratio
+    category_cols = []
+    for col in sample.select_dtypes(include=['object']).columns:
+        non_null = sample[col].count()
+        if non_null == 0:
+            continue
+        if pd.api.types.infer_dtype(sample[col], skipna=True) != 'string':
+            continue
+        if sample[col].nunique() <= max_unique_ratio * non_null:
+            category_cols.append(col)
+    return category_cols
+
+
+def compact_chunk(chunk, category_cols):
+    """Downcast integer columns and convert the chosen string columns to categories"""
+    for col in chunk.select_dtypes(include=['integer']).columns:
+        chunk[col] = pd.to_numeric(chunk[col], downcast='integer')
+    for col in category_cols:
+        if col in chunk.columns and chunk[col].dtype == object:
+            chunk[col] = chunk[col].astype('category')
+    return chunk
+
+
+def combine_chunks(chunks, category_cols, max_unique_ratio=None):
+    """Concatenate compacted chunks, merging per-chunk categories.
+
+    Integer chunks downcast to different widths are upcast by concat to the widest
+    one. Categories are unioned; a column whose categories turn out to be mostly
+    unique across the whole file is stored as plain strings instead.
+    """
+    max_unique_ratio = Config.CATEGORY_MAX_UNIQUE_RATIO if max_unique_ratio is None else max_unique_ratio
+    columns = chunks[0].columns
+    category_cols = [col for col in category_cols
+                     if all(isinstance(chunk[col].dtype, pd.CategoricalDtype) for chunk in chunks)]
+
+    merged = {}
+    for col in category_cols:
+        combined = union_categoricals([chunk[col].array for chunk in chunks])
+        if len(combined.categories) > max_unique_ratio * max(1, combined.notna().sum()):
+            combined = np.asarray(combined, dtype=object)
+        merged[col] = combined
+        for chunk in chunks:
+            del chunk[col]
+
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0].reset_index(drop=True)
+    for col, values in merged.items():
+        df[col] = values
+    return df[columns]
+
+
+def _has_text(series):
+    """Whether a parsed column holds strings, i.e. the parser could not read it as numbers"""
+    return not pd.api.types.is_numeric_dtype(series.dtype) and series.notna().any()
+
+
+class _CsvSource:
+    """A CSV path or stream that can be read again from the start"""
+
+    def __init__(self, source):
+        if isinstance(source, (str, os.PathLike)):
+            self.source, self.start = source, None
+            return
+        if not source.seekable():
+            # Spool a one-shot stream so its columns can be re-read
+            spooled = tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024)
+            while True:
+                block = source.read(1 << 20)
+                if not block:
+                    break
+                spooled.write(block)
+            source = spooled
+        self.source, self.start = source, source.tell()
+
+    def read(self, **kwargs):
+        if self.start is not None:
+            self.source.seek(self.start)
+        try:
+            return pd.read_csv(self.source, **kwargs)
+        except pd.errors.EmptyDataError:
+            raise IngestionError("File is empty or has no data")
+
+    def text_columns(self, chunk_rows, nrows=None, usecols=None):
+        """Columns that some chunk of the first nrows rows (default: all) parses as text"""
+        text = []
+        with self.read(chunksize=chunk_rows, nrows=nrows, usecols=usecols) as reader:
+            for chunk in reader:
+                text.extend(col for col in chunk.columns if col not in text and _has_text(chunk[col]))
+        return text
+
+
+def _pinned_chunks(reader, text_columns, conflicts):
+    """Pass chunks through, collecting columns pinned as numbers that turn out to hold text"""
+    for chunk in reader:
+        conflicts.extend(col for col in chunk.columns
+                         if col not in text_columns and col not in conflicts and _has_text(chunk[col]))
+        yield chunk
+
+
+def read_csv_chunked(stream, validator=None, max_rows=None, max_columns=None, chunk_rows=None, sketch=None):
+    """Parse a CSV stream chunk by chunk into a compactly typed DataFrame (see read_chunks).
+
+    Chunks are typed like a whole-file read: the columns of the first chunk
+    that hold text are read as strings in every chunk, and a column first
+    read as numbers that later turns out to hold text is read again as
+    strings for all rows.
+    """
+    chunk_rows = chunk_rows or Config.INGEST_CHUNK_ROWS
+    source = _CsvSource(stream)
+    text_columns = source.text_columns(chunk_rows, nrows=chunk_rows)
+    conflicts = []
+    with source.read(chunksize=chunk_rows, dtype={col: str for col in text_columns}) as reader:
+        df = read_chunks(_pinned_chunks(reader, text_columns, conflicts),
+                         validator, max_rows, max_columns, sketch)
+    if conflicts:
+        strings = source.read(usecols=conflicts, dtype=str)
+        for col in conflicts:
+            df[col] = strings[col].to_numpy()
+    return df
+
+
+def read_chunks(chunks, validator=None, max_rows=None, max_columns=None, sketch=None):
+    """Combine parsed chunks of one table into a compactly typed DataFrame.
+
+    The first chunk decides which string columns become categories. Every chunk is
+    handed to the validator (and merged into the DatasetSketch, if given) as it is
+    parsed, and row/column limits stop the read as soon as they are exceeded
+    instead of after the whole file is loaded.
+    """
+    compacted = []
+    category_cols = None
+    total_rows = 0
+
+    for chunk in chunks:
+        if category_cols is None:
+            if max_columns is not None and len(chunk.columns) > max_columns:
+                raise IngestionError(f'Too many columns. Maximum {max_columns:,} columns allowed.')
+            if validator is not None:
+                validator.check_header(chunk.columns)
+            category_cols = infer_category_columns(chunk)
+
+        total_rows += len(chunk)
+        if max_rows is not None and total_rows > max_rows:
+            raise IngestionError(f'File too large. Maximum {max_rows:,} rows allowed.')
+
+        if validator is not None:
+            validator.update(chunk)
+        if sketch is not None:
+            sketch.update(chunk)
+        compacted.append(compact_chunk(chunk, category_cols))
+
+    if not compacted:
+        raise IngestionError("File is empty or has no data")
+    return combine_chunks(compacted, category_cols)
+
+
+def parse_cell_range(cell_range):
+    """(first column, first row, last column, last row) of an A1-style range, 1-based.
+
+    Accepts 'A1:D500', whole columns 'B:D', whole rows '3:100', or a single
+    top-left cell 'C4'; open ends are None.
+    """
+    if not cell_range:
+        return None, None, None, None
+    from openpyxl.utils.cell import range_boundaries
+    text = str(cell_range).strip().upper().replace('$', '')
+    try:
+        if ':' not in text:
+            min_col, min_row, _, _ = range_boundaries(f'{text}:{text}')
+            return min_col, min_row, None, None
+        return range_boundaries(text)
+    except (ValueError, TypeError):
+        raise IngestionError(f"Invalid cell range: {cell_range}")
+
+
+def _header_names(values):
+    """Column names from a header row, named and de-duplicated the way read_excel does"""
+    names, seen = [], {}
+    for i, value in enumerate(values):
+        name = f'Unnamed: {i}' if value is None or (isinstance(value, str) and not value.strip()) else str(value)
+        base = name
+        while name in seen:
+            seen[base] += 1
+            name = f'{base}.{seen[base]}'
+        seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _rows_frame(rows, columns, start):
+    """DataFrame of raw cell rows, indexed from start"""
+    width = len(columns)
+    rows = [row[:width] if len(row) >= width else tuple(row) + (None,) * (width - len(row)) for row in rows]
+    chunk = pd.DataFrame.from_records(rows, columns=columns)
+    chunk.index = pd.RangeIndex(start, start + len(chunk))
+    for col in chunk.columns[chunk.dtypes == object]:
+        if chunk[col].isna().all():
+            # Empty stretches of a numeric column parse like CSV's missing values
+            chunk[col] = chunk[col].astype(np.float64)
+    return chunk
+
+
+def _chunk_rows(rows, chunk_rows):
+    """DataFrames of at most chunk_rows rows; the first row of rows is the header"""
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = _header_names(header)
+    batch, start, blank = [], 0, []
+    for row in rows:
+        if all(value is None for value in row):
+            # Trailing empty rows are formatting, not data; interior ones are kept
+            blank.append(row)
+            continue
+        if blank:
+            batch.extend(blank)
+            blank = []
+        batch.append(row)
+        if len(batch) >= chunk_rows:
+            yield _rows_frame(batch, columns, start)
+            start += len(batch)
+            batch = []
+    if batch or start == 0:
+        yield _rows_frame(batch, columns, start)
+
+
+def _xlsx_rows(workbook, sheet, bounds):
+    min_col, min_row, max_col, max_row = bounds
+    return workbook[sheet].iter_rows(min_row=min_row or 1, max_row=max_row, min_col=min_col or 1,
+                                     max_col=max_col, values_only=True)
+
+
+def _xls_rows(workbook, sheet, bounds):
+    import xlrd
+    min_col, min_row, max_col, max_row = bounds
+    sheet = workbook.sheet_by_name(sheet)
+    first_col = (min_col or 1) - 1
+    last_col = sheet.ncols if max_col is None else min(max_col, sheet.ncols)
+    last_row = sheet.nrows if max_row is None else min(max_row, sheet.nrows)
+    for r in range((min_row or 1) - 1, last_row):
+        types = sheet.row_types(r, first_col, last_col)
+        values = sheet.row_values(r, first_col, last_col)
+        row = []
+        for kind, value in zip(types, values):
+            if kind in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+                value = None
+            elif kind == xlrd.XL_CELL_DATE:
+                value = xlrd.xldate_as_datetime(value, workbook.datemode)
+            elif kind == xlrd.XL_CELL_NUMBER and value.is_integer():
+                value = int(value)
+            elif kind == xlrd.XL_CELL_BOOLEAN:
+                value = bool(value)
+            elif kind == xlrd.XL_CELL_ERROR:
+                value = np.nan
+            row.append(value)
+        yield tuple(row)
+
+
+class ExcelWorkbook:
+    """A workbook opened for streaming its rows.
+
+    .xlsx files are read through openpyxl's read-only mode, which parses the
+    sheet XML as it is iterated instead of building the whole workbook in
+    memory; .xls files are opened with xlrd, loading only the sheets read.
+    Formulas give their cached values.
+    """
+
+    def __init__(self, source, filename):
+        name = str(filename).lower()
+        self.legacy = name.endswith('.xls')
+        try:
+            if self.legacy:
+                import xlrd
+                if hasattr(source, 'read'):
+                    self.book = xlrd.open_workbook(file_contents=source.read(), on_demand=True)
+                else:
+                    self.book = xlrd.open_workbook(source, on_demand=True)
+                self.sheet_names = self.book.sheet_names()
+            else:
+                from openpyxl import load_workbook
+                self.book = load_workbook(source, read_only=True, data_only=True)
+                self.sheet_names = self.book.sheetnames
+        except ImportError:
+            # A missing reader library is not the upload's fault
+            raise
+        except Exception as e:
+            raise IngestionError(f"Could not open workbook: {str(e)}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.legacy:
+            self.book.release_resources()
+        else:
+            self.book.close()
+
+    def select(self, sheets=None):
+        """Sheet names for a selection: None (the first sheet), 'all', or names / 0-based indexes"""
+        if sheets is None:
+            return self.sheet_names[:1]
+        if isinstance(sheets, str):
+            if sheets.strip().lower() == 'all':
+                return list(self.sheet_names)
+            sheets = [name.strip() for name in sheets.split(',') if name.strip()]
+        selected = []
+        for sheet in sheets:
+            if sheet not in self.sheet_names and str(sheet).isdigit() and int(sheet) < len(self.sheet_names):
+                sheet = self.sheet_names[int(sheet)]
+            if sheet not in self.sheet_names:
+                raise IngestionError(f"Sheet not found: {sheet}. Available sheets: {self.sheet_names}")
+            if sheet not in selected:
+                selected.append(sheet)
+        if not selected:
+            raise IngestionError("No sheets selected")
+        return selected
+
+    def iter_chunks(self, sheet, cell_range=None, chunk_rows=None):
+        """Yield the rows of one sheet (within cell_range) as DataFrames of at most chunk_rows rows"""
+        bounds = parse_cell_range(cell_range)
+        rows = (_xls_rows if self.legacy else _xlsx_rows)(self.book, sheet, bounds)
+        return _chunk_rows(rows, chunk_rows or Config.INGEST_CHUNK_ROWS)
+
+
+def _read_sheet(path, filename, sheet, cell_range, max_rows, max_columns):
+    """Parse one sheet into a compact frame and its sketch; runs in a worker process"""
+    from utils.sketches import DatasetSketch
+    sketch = DatasetSketch()
+    with ExcelWorkbook(path, filename) as workbook:
+        df = read_chunks(workbook.iter_chunks(sheet, cell_range), max_rows=max_rows,
+                         max_columns=max_columns, sketch=sketch)
+    return df, sketch
+
+
+def read_excel_chunked(source, filename, sheets=None, cell_range=None, validator=None,
+                       max_rows=None, max_columns=None, chunk_rows=None, sketch=None):
+    """Parse sheets of a workbook chunk by chunk into one compactly typed DataFrame.
+
+    One sheet is streamed through read_chunks like a CSV. Several sheets are
+    parsed in parallel worker processes, each returning its compacted frame
+    and sketch; they must share their columns and are stacked with a 'sheet'
+    column naming where each row came from.
+    """
+    parse_cell_range(cell_range)
+    with ExcelWorkbook(source, filename) as workbook:
+        selected = workbook.select(sheets)
+        if len(selected) == 1:
+            try:
+                return read_chunks(workbook.iter_chunks(selected[0], cell_range, chunk_rows),
+                                   validator, max_rows, max_columns, sketch)
+            except IngestionError as e:
+                raise IngestionError(f"Sheet {selected[0]}: {str(e)}")
+
+    if hasattr(source, 'read'):
+        # Workers reopen the upload from disk
+        source.seek(0)
+        handle, path = tempfile.mkstemp(suffix=os.path.splitext(str(filename))[1])
+        with os.fdopen(handle, 'wb') as out:
+            while True:
+                block = source.read(1 << 20)
+                if not block:
+                    break
+                out.write(block)
+    else:
+        path = None
+    try:
+        context = multiprocessing.get_context('spawn')
+        workers = max(1, min(Config.EXCEL_SHEET_WORKERS, len(selected)))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = [pool.submit(_read_sheet, path or source, filename, sheet, cell_range, max_rows, max_columns)
+                       for sheet in selected]
+            results = []
+            for sheet, future in zip(selected, futures):
+                try:
+                    results.append(future.result())
+                except IngestionError as e:
+                    raise IngestionError(f"Sheet {sheet}: {str(e)}")
+    finally:
+        if path is not None:
+            os.remove(path)
+
+    frames = [df for df, _ in results]
+    columns = frames[0].columns
+    for sheet, df in zip(selected, frames):
+        if not df.columns.equals(columns):
+            raise IngestionError(f"Sheet {sheet} has different columns than sheet {selected[0]}")
+    if SHEET_COLUMN in columns:
+        raise IngestionError(f"Sheets cannot be combined: they already have a '{SHEET_COLUMN}' column")
+    total_rows = sum(len(df) for df in frames)
+    if max_rows is not None and total_rows > max_rows:
+        raise IngestionError(f'File too large. Maximum {max_rows:,} rows allowed.')
+
+    for df, sheet_sketch in results:
+        if validator is not None:
+            validator.update(df)
+        if sketch is not None:
+            sketch.merge(sheet_sketch)
+
+    category_cols = [col for col in columns if isinstance(frames[0][col].dtype, pd.CategoricalDtype)]
+    sheet_codes = np.repeat(np.arange(len(frames), dtype=np.int16), [len(df) for df in frames])
+    df = combine_chunks(frames, category_cols)
+    df[SHEET_COLUMN] = pd.Categorical.from_codes(sheet_codes, categories=selected)
+    return df
+
+
+def iter_file_chunks(source, filename, chunk_rows=None):
+    """Yield the rows of a CSV file or of a workbook's first sheet as DataFrames of at most chunk_rows rows.
+
+    Every chunk after the first continues the first one's index, and CSV
+    columns are typed as a whole-file read types them.
+    """
+    chunk_rows = chunk_rows or Config.INGEST_CHUNK_ROWS
+    name = str(filename).lower()
+    if name.endswith('.csv'):
+        # Chunks are streamed out, so columns holding text anywhere are found by a first pass
+        source = _CsvSource(source)
+        text_columns = source.text_columns(chunk_rows)
+        with source.read(chunksize=chunk_rows, dtype={col: str for col in text_columns}) as reader:
+            yield from reader
+    elif name.endswith(EXCEL_EXTENSIONS):
+        with ExcelWorkbook(source, filename) as workbook:
+            yield from workbook.iter_chunks(workbook.select()[0], chunk_rows=chunk_rows)
+    else:
+        raise IngestionError("Invalid file format. Please upload CSV, XLSX, or XLS files.")
+
+
+def fillna_preserving_categories(series, value):
+    """fillna that also works when the fill value is not yet a category"""
+    if isinstance(series.dtype, pd.CategoricalDtype) and pd.notna(value) \
+            and value not in series.cat.categories:
+        series = series.cat.add_categories([value])
+    return series.fillna(value)
@@ -0,0 +1,246 @@
+import threading
+import uuid
+import logging
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Job states; the last three are final
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+_current = threading.local()
+
+
+class JobCancelledError(Exception):
+    """Raised inside a running job once its cancellation was requested"""
+    pass
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when the executor already holds its maximum number of pending jobs"""
+    pass
+
+
+def current_job():
+    """The job running on this thread, or None outside of the executor"""
+    return getattr(_current, 'job', None)
+
+
+def checkpoint(progress=None, message=None):
+    """Report progress of the job running on this thread and stop it if it was cancelled.
+
+    Outside of a job this does nothing, so operations can call it unconditionally.
+    """
+    job = current_job()
+    if job is None:
+        return
+    if progress is not None:
+        job.progress = progress
+    if message:
+        job.message = message
+    if job.cancel_requested:
+        raise JobCancelledError(f"Job {job.job_id} was cancelled")
+
+
+class Job:
+    """One operation submitted to the executor, with its state and result"""
+
+    def __init__(self, dataset_id, operation, func):
+        self.job_id = str(uuid.uuid4())
+        self.dataset_id = dataset_id
+        self.operation = operation
+        self.func = func
+        self.status = QUEUED
+        self.progress = 0
+        self.message = 'Waiting in queue'
+        self.result = None
+        self.error = None
+        self.exception = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def wait(self, timeout=None):
+        """Block until the job finished; returns whether it did"""
+        return self._done.wait(timeout)
+
+    def outcome(self):
+        """Wait for the job and return its result, re-raising its exception if it failed"""
+        self.wait()
+        if self.status == CANCELLED:
+            raise JobCancelledError(f"Job {self.job_id} was cancelled")
+        if self.exception is not None:
+            raise self.exception
+        return self.result
+
+    def to_dict(self, include_result=True):
+        """JSON-ready view of the job state"""
+        job = {
+            'job_id': self.job_id,
+            'dataset_id': self.dataset_id,
+            'operation': self.operation,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'error': self.error,
+            'cancel_requested': self.cancel_requested,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+        if include_result:
+            job['result'] = self.result
+        return job
+
+
+class JobExecutor:
+    """Bounded background executor for dataset operations.
+
+    Jobs run on a fixed pool of worker threads. Jobs of the same dataset run one
+    at a time in submission order, while jobs of different datasets run in
+    parallel. At most ``max_pending`` jobs may be queued or running at once.
+    Finished jobs are retained for ``result_ttl`` (and at most ``max_retained``
+    of them) so clients can fetch their results.
+    """
+
+    def __init__(self, max_workers=4, max_pending=100, result_ttl=timedelta(hours=1), max_retained=1000):
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.max_retained = max_retained
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dataset-job')
+        self._jobs = OrderedDict()  # job_id -> Job, in submission order
+        self._waiting = {}  # dataset_id -> deque of queued jobs
+        self._active = set()  # dataset_ids with a job on a worker
+        self._lock = threading.Lock()
+
+    def submit(self, dataset_id, operation, func):
+        """Queue func() as a job of the dataset and return the Job"""
+        job = Job(dataset_id, operation, func)
+        with self._lock:
+            self._prune()
+            pending = sum(1 for queued in self._jobs.values() if not queued.finished)
+            if pending >= self.max_pending:
+                raise JobQueueFullError(f"Too many pending jobs ({pending}). Try again later.")
+            self._jobs[job.job_id] = job
+            self._waiting.setdefault(dataset_id, deque()).append(job)
+            self._dispatch(dataset_id)
+        return job
+
+    def get(self, job_id):
+        """Job by id, or None if unknown or no longer retained"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs_for(self, dataset_id):
+        """Retained jobs of a dataset, oldest first"""
+        with self._lock:
+            return [job for job in self._jobs.values() if job.dataset_id == dataset_id]
+
+    def cancel(self, job_id):
+        """Request cancellation; a queued job is dropped, a running one stops at its next checkpoint"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return job
+            job._cancel.set()
+            waiting = self._waiting.get(job.dataset_id)
+            if waiting is not None and job in waiting:
+                waiting.remove(job)
+                self._finish(job, CANCELLED, message='Cancelled before it started')
+            else:
+                job.message = 'Cancellation requested'
+            return job
+
+    def cancel_dataset(self, dataset_id):
+        """Cancel every unfinished job of a dataset, e.g. when it is removed"""
+        for job in self.jobs_for(dataset_id):
+            self.cancel(job.job_id)
+
+    def shutdown(self, wait=True):
+        """Stop accepting work and optionally wait for running jobs"""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _dispatch(self, dataset_id):
+        """Hand the next queued job of a dataset to the pool unless one is running (lock held)"""
+        if dataset_id in self._active:
+            return
+        waiting = self._waiting.get(dataset_id)
+        if not waiting:
+            self._waiting.pop(dataset_id, None)
+            return
+        job = waiting.popleft()
+        self._active.add(dataset_id)
+        self._pool.submit(self._run, job)
+
+    def _run(self, job):
+        with self._lock:
+            if job.cancel_requested:
+                # Cancelled after being handed to the pool but before it started
+                self._finish(job, CANCELLED, message='Cancelled before it started')
+                self._active.discard(job.dataset_id)
+                self._dispatch(job.dataset_id)
+                return
+            job.status = RUNNING
+            job.started_at = datetime.now()
+            job.message = 'Running'
+        _current.job = job
+        try:
+            result = job.func()
+        except JobCancelledError:
+            status, result, error = CANCELLED, None, None
+        except Exception as e:
+            logger.error(f"Job {job.job_id} ({job.operation}) failed: {str(e)}")
+            status, result, error = FAILED, None, str(e)
+            job.exception = e
+        else:
+            status, error = COMPLETED, None
+        finally:
+            _current.job = None
+
+        with self._lock:
+            self._finish(job, status, result=result, error=error)
+            self._active.discard(job.dataset_id)
+            self._dispatch(job.dataset_id)
+
+    def _finish(self, job, status, result=None, error=None, message=None):
+        """Record the final state of a job (lock held)"""
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = datetime.now()
+        if status == COMPLETED:
+            job.progress = 100
+            job.message = message or 'Completed'
+        elif status == CANCELLED:
+            job.message = message or 'Cancelled'
+        else:
+            job.message = message or 'Failed'
+        job.func = None
+        job._done.set()
+
+    def _prune(self):
+        """Forget finished jobs past their retention (lock held)"""
+        cutoff = datetime.now() - self.result_ttl
+        finished = [job for job in self._jobs.values() if job.finished]
+        excess = len(finished) - self.max_retained
+        for job in finished:
+            if excess > 0 or job.finished_at < cutoff:
+                del self._jobs[job.job_id]
+                excess -= 1
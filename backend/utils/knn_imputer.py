@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import NearestNeighbors
+from utils.sampler import RowPermutation
+from config.config import Config
+
+
+class KNNImputation:
+    """Nearest-neighbour imputation of numerical columns from other numerical features.
+
+    Features are standardized once for the whole frame (missing feature values
+    sit at the column mean). For each target column the rows holding a value
+    are the donors, capped at max_donors by a seeded random sample; they are
+    indexed with NearestNeighbors (a KD or ball tree where that pays off) and
+    the rows missing the target are queried in batches of Config.KNN_BATCH_ROWS.
+    A missing value becomes the mean target value of its nearest donors, as
+    with sklearn's KNNImputer. Memory stays O(rows x features) instead of the
+    rows x rows distance matrix KNNImputer builds.
+    """
+
+    @staticmethod
+    def impute(df, targets, features=None, n_neighbors=None, max_donors=None, seed=0, progress=None):
+        """Return ({col: imputed Series}, {col: result}) for the numerical target columns.
+
+        features defaults to every numerical column; a target is never its own
+        feature. progress(done, total) is called after every batch of rows.
+        """
+        n_neighbors = n_neighbors or Config.KNN_NEIGHBORS
+        max_donors = max_donors or Config.KNN_MAX_DONORS
+        if n_neighbors < 1 or max_donors < 1:
+            raise ValueError("n_neighbors and max_donors must be positive")
+
+        numerical = set(df.select_dtypes(include=[np.number]).columns)
+        features = [col for col in df.columns if col in numerical] if features is None else list(features)
+        invalid = [col for col in list(targets) + features if col not in numerical]
+        if invalid:
+            raise ValueError(f"Columns {invalid} are not numeric")
+
+        scaled = KNNImputation._standardize(df, features)
+        missing = {col: df[col].isna().to_numpy() for col in targets}
+        total = int(sum(mask.sum() for mask in missing.values()))
+        done = 0
+
+        imputed = {}
+        results = {}
+        for col in targets:
+            feature_idx = [j for j, feature in enumerate(features) if feature != col]
+            recipients = np.flatnonzero(missing[col])
+            donors = np.flatnonzero(~missing[col])
+            values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+
+            if len(donors) == 0:
+                results[col] = {'status': 'skipped', 'reason': 'all_null'}
+                done += len(recipients)
+                continue
+            if not feature_idx:
+                # Nothing to measure distance on; every row is equally near
+                values = values.copy()
+                values[recipients] = values[donors].mean()
+                imputed[col] = pd.Series(values, index=df.index, name=col)
+                results[col] = {'status': 'filled', 'filled': int(len(recipients)), 'strategy': 'knn',
+                                'fill_value': float(values[donors].mean()), 'reason': 'no_features'}
+                done += len(recipients)
+                continue
+
+            if len(donors) > max_donors:
+                donors = np.sort(donors[RowPermutation(len(donors), seed).positions(0, max_donors)])
+            k = min(n_neighbors, len(donors))
+            points = scaled[:, feature_idx]
+            index = NearestNeighbors(n_neighbors=k).fit(points[donors])
+            donor_values = values[donors]
+
+            filled = values.copy()
+            for start in range(0, len(recipients), Config.KNN_BATCH_ROWS):
+                batch = recipients[start:start + Config.KNN_BATCH_ROWS]
+                neighbors = index.kneighbors(points[batch], return_distance=False)
+                filled[batch] = donor_values[neighbors].mean(axis=1)
+                done += len(batch)
+                if progress:
+                    progress(done, total)
+
+            imputed[col] = pd.Series(filled, index=df.index, name=col)
+            results[col] = {
+                'status': 'filled',
+                'filled': int(len(recipients)),
+                'strategy': 'knn',
+                'fill_value': None,
+                'features': [features[j] for j in feature_idx],
+                'n_neighbors': k,
+                'donors': int(len(donors))
+            }
+
+        return imputed, results
+
+    @staticmethod
+    def _standardize(df, features):
+        """Features as float64 z-scores, missing values at 0 (the mean)"""
+        if not features:
+            return np.empty((len(df), 0))
+        block = df[features].to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            counts = (~np.isnan(block)).sum(axis=0)
+            means = np.nansum(block, axis=0) / counts
+            stds = np.sqrt(np.nansum((block - means) ** 2, axis=0) / counts)
+        # Constant or empty features carry no distance
+        stds = np.where(stds > 0, stds, 1.0)
+        means = np.where(counts > 0, means, 0.0)
+        block -= means
+        block /= stds
+        block[np.isnan(block)] = 0.0
+        return block
@@ -0,0 +1,250 @@
+import threading
+from contextlib import contextmanager
+from utils.outlier_engine import FLAG_COLUMN
+
+# Operation -> name of its column-list parameter
+COLUMN_PARAMS = {
+    'handle_missing_values': 'columns',
+    'normalize_data': 'columns',
+    'scale_data': 'columns',
+    'encode_categorical': 'columns',
+    'remove_outliers': 'columns',
+    'remove_nulls': 'columns',
+    'remove_duplicates': 'subset'
+}
+
+# Row filters a column transform can be moved behind without changing which
+# rows they drop: scaling is affine (outlier masks are unchanged), keeps
+# missing values missing and keeps distinct values distinct; label codes keep
+# distinct values distinct; the outlier flag neither adds nulls nor splits
+# equal rows. Imputation and expanding encodings change what filters see.
+TRANSPARENT_TO = {
+    'scale': {'outliers', 'nulls', 'duplicates'},
+    'label': {'duplicates'},
+    'flag': {'nulls', 'duplicates'},
+    'impute': set(),
+    'expand': set()
+}
+
+
+def _union(first, second):
+    """Ordered union of two column lists; None (all columns) absorbs any list"""
+    if first is None or second is None:
+        return None
+    return list(first) + [col for col in second if col not in first]
+
+
+class PlanStep:
+    """One deferred operation: the preprocessor method and its keyword arguments"""
+
+    def __init__(self, operation, params):
+        if operation not in COLUMN_PARAMS:
+            raise ValueError(f"Operation {operation} cannot be planned")
+        self.operation = operation
+        self.params = dict(params)
+
+    @property
+    def columns(self):
+        """Columns the operation was asked for; None means all (eligible) columns"""
+        return self.params.get(COLUMN_PARAMS[self.operation])
+
+    @property
+    def kind(self):
+        """'filter' for operations that only drop rows, else the kind of column transform"""
+        op = self.operation
+        if op in ('remove_nulls', 'remove_duplicates'):
+            return 'filter'
+        if op == 'remove_outliers':
+            return 'filter' if self.params.get('mode', 'remove') == 'remove' else 'flag'
+        if op == 'handle_missing_values':
+            return 'impute'
+        if op == 'encode_categorical':
+            return 'label' if self.params.get('method', 'label') == 'label' else 'expand'
+        return 'scale'
+
+    @property
+    def filter_kind(self):
+        return {'remove_nulls': 'nulls', 'remove_duplicates': 'duplicates', 'remove_outliers': 'outliers'}[self.operation]
+
+    @property
+    def reads(self):
+        """Columns the step's result depends on, or None for every column"""
+        if self.operation == 'handle_missing_values' and self.params.get('strategy') == 'knn':
+            features = self.params.get('features')
+            return None if features is None or self.columns is None else _union(self.columns, features)
+        return self.columns
+
+    @property
+    def writes(self):
+        """Columns the step rewrites, or None when they are not known before it runs"""
+        kind = self.kind
+        if kind == 'filter':
+            return []
+        if kind == 'flag':
+            return [FLAG_COLUMN]
+        if kind == 'expand':
+            return None
+        return self.columns
+
+    def commutes_with(self, transform):
+        """Whether this filter drops the same rows before transform as after it"""
+        writes, reads = transform.writes, self.reads
+        overlaps = writes is None or reads is None or bool(set(writes) & set(reads))
+        return not overlaps or self.filter_kind in TRANSPARENT_TO[transform.kind]
+
+    def fuse(self, other):
+        """One step doing this step and then other, or None when they cannot be merged exactly.
+
+        Filters of nulls merge into one dropna; imputation and scaling are
+        per-column and idempotent, so same-parameter steps merge into one call
+        over both column lists; encodings merge only over disjoint columns.
+        """
+        if other.operation != self.operation:
+            return None
+        key = COLUMN_PARAMS[self.operation]
+        rest = {k: v for k, v in self.params.items() if k != key}
+        if rest != {k: v for k, v in other.params.items() if k != key}:
+            return None
+        if self.operation == 'handle_missing_values' and self.params.get('strategy') == 'knn':
+            # Later columns are imputed from the earlier fills
+            return None
+        if self.operation == 'encode_categorical':
+            if self.columns is None or other.columns is None or set(self.columns) & set(other.columns):
+                return None
+        elif self.operation not in ('remove_nulls', 'handle_missing_values', 'normalize_data', 'scale_data'):
+            return None
+        return PlanStep(self.operation, {**rest, key: _union(self.columns, other.columns)})
+
+    def to_dict(self):
+        return {'operation': self.operation, **self.params}
+
+
+class OperationPlan:
+    """Operations recorded by a lazy preprocessor, run when data is read.
+
+    While lazy, operation methods record a PlanStep instead of rewriting the
+    working frame. When a preview, summary or export needs the data, the plan
+    is optimized and run through the preprocessor's own (eager) methods, so
+    every executed step is logged, versioned and undoable as usual.
+
+    Optimization moves each row filter ahead of the column transforms it
+    commutes with (see TRANSPARENT_TO), so transforms process only surviving
+    rows and are fitted on them; filters keep their order among themselves.
+    Adjacent steps that can be merged exactly are then fused into one call.
+    A read of some columns only runs the steps those columns depend on, on a
+    scratch copy of the needed columns, and leaves the plan pending.
+    """
+
+    def __init__(self, lazy=False):
+        self.lazy = lazy
+        self.steps = []
+        self._executing = threading.local()
+
+    @property
+    def recording(self):
+        """Whether operations are recorded now rather than run"""
+        return self.lazy and not getattr(self._executing, 'active', False)
+
+    @property
+    def pending(self):
+        return len(self.steps)
+
+    def record(self, operation, **params):
+        """Defer an operation; returns the operation's response while it is pending"""
+        self.steps.append(PlanStep(operation, params))
+        return {
+            'status': 'planned',
+            'operation': operation,
+            'pending_operations': len(self.steps)
+        }
+
+    def pop(self):
+        """Forget the most recently recorded step; returns its operation"""
+        return self.steps.pop().operation
+
+    def clear(self):
+        self.steps = []
+
+    def optimize(self, steps=None):
+        """Steps in execution order: filters pushed down, then adjacent steps fused"""
+        ordered = []
+        for step in (self.steps if steps is None else steps):
+            position = len(ordered)
+            if step.kind == 'filter':
+                while position > 0 and ordered[position - 1].kind != 'filter' \
+                        and step.commutes_with(ordered[position - 1]):
+                    position -= 1
+            ordered.insert(position, step)
+
+        fused = []
+        for step in ordered:
+            merged = fused[-1].fuse(step) if fused else None
+            if merged is not None:
+                fused[-1] = merged
+            else:
+                fused.append(step)
+        return fused
+
+    @staticmethod
+    def prune(steps, columns):
+        """(steps needed to compute columns, input columns they read, or None for all)"""
+        needed = set(columns)
+        kept = []
+        for step in reversed(steps):
+            writes = step.writes
+            if step.kind == 'filter' or writes is None or needed is None or needed & set(writes):
+                kept.append(step)
+                reads = step.reads
+                needed = None if needed is None or reads is None else needed | set(reads)
+        return kept[::-1], needed
+
+    def describe(self):
+        """Pending steps as recorded and in the order they would run"""
+        return {
+            'lazy': self.lazy,
+            'pending': [step.to_dict() for step in self.steps],
+            'optimized': [step.to_dict() for step in self.optimize()]
+        }
+
+    @contextmanager
+    def executing(self):
+        """Let operation methods run eagerly, e.g. while the plan is being executed"""
+        previous = getattr(self._executing, 'active', False)
+        self._executing.active = True
+        try:
+            yield
+        finally:
+            self._executing.active = previous
+
+    def execute(self, target):
+        """Run the optimized plan on target; returns each executed step with its results.
+
+        The plan is emptied first: a step that fails discards the steps after
+        it, while the steps before it stay applied.
+        """
+        steps, self.steps = self.optimize(), []
+        executed = []
+        with self.executing():
+            for step in steps:
+                try:
+                    results = getattr(target, step.operation)(**step.params)
+                except ValueError as e:
+                    raise ValueError(f"Planned operation {step.operation} failed: {str(e)}")
+                executed.append({**step.to_dict(), 'results': results})
+        return executed
+
+    def project(self, frame, columns, scratch):
+        """Columns of the planned result, computed without touching the working frame.
+
+        scratch(df) must return an eager preprocessor over df.
+        """
+        steps, needed = self.prune(self.optimize(), columns)
+        if needed is not None:
+            frame = frame[[col for col in frame.columns if col in needed]]
+        target = scratch(frame.copy(deep=False))
+        for step in steps:
+            getattr(target, step.operation)(**step.params)
+        missing = [col for col in columns if col not in target.df.columns]
+        if missing:
+            raise ValueError(f"Invalid columns: {missing}")
+        return target.df[list(columns)]
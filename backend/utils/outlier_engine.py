@@ -0,0 +1,99 @@
+import numpy as np
+from utils.summary_engine import MAX_BATCH_CELLS
+
+OUTLIER_METHODS = ('iqr', 'zscore', 'mad')
+OUTLIER_MODES = ('remove', 'flag')
+
+# Boolean column written by flag mode
+FLAG_COLUMN = 'is_outlier'
+
+# Scales the median absolute deviation to the standard deviation of normal data
+MAD_SCALE = 1.4826
+
+
+class OutlierEngine:
+    """Multi-column outlier detection in one vectorized pass.
+
+    Bounds of every column are computed on the same (unfiltered) rows, so the
+    result does not depend on column order. The per-column masks are ORed into
+    one row mask, which the caller applies once. Missing values are never
+    outliers.
+    """
+
+    @staticmethod
+    def detect(df, columns, method='iqr', threshold=1.5, mode='remove', progress=None):
+        """Return (row mask, {col: result}) for the given numerical columns.
+
+        mode only names the per-column count in the results; progress(done) is
+        called after each batch of columns.
+        """
+        if method not in OUTLIER_METHODS:
+            raise ValueError(f"Invalid method. Must be one of: {list(OUTLIER_METHODS)}")
+        if mode not in OUTLIER_MODES:
+            raise ValueError(f"Invalid mode. Must be one of: {list(OUTLIER_MODES)}")
+
+        columns = list(columns)
+        combined = np.zeros(len(df), dtype=bool)
+        results = {}
+        if not columns or len(df) == 0:
+            return combined, {col: OutlierEngine._result(method, threshold, mode, 0, np.nan, np.nan) for col in columns}
+
+        batch_size = max(1, MAX_BATCH_CELLS // len(df))
+        for start in range(0, len(columns), batch_size):
+            batch = columns[start:start + batch_size]
+            block = df[batch].to_numpy(dtype=np.float64, na_value=np.nan)
+            lower, upper = OutlierEngine._bounds(block, method, threshold)
+            with np.errstate(invalid='ignore'):
+                mask = (block < lower) | (block > upper)
+            combined |= mask.any(axis=1)
+            counts = mask.sum(axis=0)
+            for j, col in enumerate(batch):
+                results[col] = OutlierEngine._result(method, threshold, mode, counts[j], lower[j], upper[j])
+            if progress:
+                progress(start + len(batch))
+
+        return combined, results
+
+    @staticmethod
+    def _bounds(block, method, threshold):
+        """Per-column lower and upper bounds; NaN bounds flag nothing"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if method == 'iqr':
+                q1, q3 = OutlierEngine._nanquantiles(block, (0.25, 0.75))
+                # No spread between the quartiles (e.g. a mostly-constant column): no outliers
+                iqr = np.where(q3 - q1 > 0, q3 - q1, np.nan)
+                return q1 - threshold * iqr, q3 + threshold * iqr
+
+            if method == 'zscore':
+                counts = (~np.isnan(block)).sum(axis=0)
+                center = np.nansum(block, axis=0) / counts
+                variance = np.nansum((block - center) ** 2, axis=0) / (counts - 1)
+                spread = threshold * np.sqrt(np.where(counts > 1, variance, np.nan))
+            else:
+                center, = OutlierEngine._nanquantiles(block, (0.5,))
+                mad, = OutlierEngine._nanquantiles(np.abs(block - center), (0.5,))
+                spread = threshold * MAD_SCALE * mad
+
+            # A constant column has no outliers
+            spread = np.where(spread > 0, spread, np.nan)
+            return center - spread, center + spread
+
+    @staticmethod
+    def _nanquantiles(block, quantiles):
+        """Linear-interpolation quantiles of each column ignoring NaN; all-missing columns get NaN"""
+        empty = np.isnan(block).all(axis=0)
+        values = np.full((len(quantiles), block.shape[1]), np.nan)
+        if not empty.all():
+            values[:, ~empty] = np.nanquantile(block[:, ~empty] if empty.any() else block, quantiles, axis=0)
+        return list(values)
+
+    @staticmethod
+    def _result(method, threshold, mode, count, lower, upper):
+        return {
+            'status': 'success',
+            'method': method,
+            'outliers_flagged' if mode == 'flag' else 'outliers_removed': int(count),
+            'threshold': threshold,
+            'lower_bound': None if np.isnan(lower) else float(lower),
+            'upper_bound': None if np.isnan(upper) else float(upper)
+        }
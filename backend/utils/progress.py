@@ -0,0 +1,162 @@
+import itertools
+import json
+import time
+from datetime import datetime
+from flask import Response, stream_with_context
+from config.config import Config
+
+
+def format_event(data, event=None, event_id=None):
+    """Encode one server-sent event"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event:
+        lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def sse_response(events):
+    """Flask response streaming server-sent events"""
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+class ProgressChannel:
+    """Progress updates of one dataset, kept in a fixed-size ring buffer.
+
+    Publishing never takes a lock: an event gets its id from an atomic counter,
+    is stored in its ring slot and becomes the latest snapshot with plain
+    reference assignments. Readers check each slot's id, so a slot that is not
+    written yet or was already overwritten is detected instead of misread.
+
+    Consecutive "processing" updates are coalesced: within min_interval of the
+    last buffered event only the latest snapshot is replaced, so a long
+    operation buffers a bounded number of events. State changes (completed,
+    error, idle, ...) are always buffered.
+    """
+
+    def __init__(self, capacity=None, min_interval=None):
+        self.capacity = capacity or Config.PROGRESS_BUFFER_SIZE
+        self.min_interval = Config.PROGRESS_MIN_INTERVAL if min_interval is None else min_interval
+        self._slots = [None] * self.capacity
+        self._ids = itertools.count()
+        self._next_id = 0
+        self._last_buffered = float('-inf')
+        self.coalesced = 0
+        self.latest = {'status': 'idle', 'progress': 0, 'message': '', 'timestamp': datetime.now().isoformat()}
+
+    @property
+    def next_id(self):
+        """Id the next buffered event will get"""
+        return self._next_id
+
+    def publish(self, status, progress=0, message="", **details):
+        """Record an update; returns whether it was buffered rather than coalesced"""
+        event = {
+            'status': status,
+            'progress': progress,
+            'message': message,
+            'timestamp': datetime.now().isoformat(),
+            **details
+        }
+        now = time.monotonic()
+        if status == "processing" and now - self._last_buffered < self.min_interval:
+            self.latest = event
+            self.coalesced += 1
+            return False
+
+        event_id = next(self._ids)
+        event['id'] = event_id
+        self._slots[event_id % self.capacity] = event
+        self._next_id = max(self._next_id, event_id + 1)
+        self._last_buffered = now
+        self.latest = event
+        return True
+
+    def events_since(self, cursor):
+        """Buffered events with id >= cursor; returns (events, next cursor)"""
+        events = []
+        # Events older than the ring's capacity were overwritten
+        cursor = max(cursor, self._next_id - self.capacity)
+        while True:
+            event = self._slots[cursor % self.capacity]
+            if event is None or event['id'] < cursor:
+                # Not written yet
+                break
+            if event['id'] > cursor:
+                # Overwritten while reading; continue from the oldest event still buffered
+                cursor = max(cursor + 1, self._next_id - self.capacity)
+                continue
+            events.append(event)
+            cursor += 1
+        return events, cursor
+
+    def stream(self, cursor=None, until=None, poll_interval=None, heartbeat=None):
+        """Generate server-sent events: the current state, then every update.
+
+        cursor resumes after a Last-Event-ID; the stream ends once until()
+        returns True or the client disconnects. Coalesced updates are sent
+        without an id so they do not move a client's resume position.
+        """
+        poll_interval = poll_interval or self.min_interval or Config.PROGRESS_MIN_INTERVAL
+        heartbeat = heartbeat or Config.PROGRESS_HEARTBEAT
+        if cursor is None:
+            cursor = self._next_id
+
+        sent = self.latest
+        yield format_event(sent, event='status')
+        last_write = time.monotonic()
+
+        while True:
+            events, cursor = self.events_since(cursor)
+            wrote = bool(events)
+            for event in events:
+                yield format_event(event, event='progress', event_id=event['id'])
+                sent = event
+            latest = self.latest
+            if latest is not sent and 'id' not in latest:
+                yield format_event(latest, event='progress')
+                sent = latest
+                wrote = True
+            if wrote:
+                last_write = time.monotonic()
+
+            if until is not None and until():
+                yield format_event(self.latest, event='end')
+                return
+            if time.monotonic() - last_write >= heartbeat:
+                yield ': keep-alive\n\n'
+                last_write = time.monotonic()
+            time.sleep(poll_interval)
+
+
+def stream_snapshots(snapshot, finished, poll_interval=None, heartbeat=None):
+    """Generate server-sent events from a polled state, e.g. a background job.
+
+    An event is sent whenever snapshot() changes; the stream ends with an
+    'end' event once finished() returns True.
+    """
+    poll_interval = poll_interval or Config.PROGRESS_MIN_INTERVAL
+    heartbeat = heartbeat or Config.PROGRESS_HEARTBEAT
+    sent = None
+    last_write = time.monotonic()
+
+    while True:
+        done = finished()
+        state = snapshot()
+        if done:
+            yield format_event(state, event='end')
+            return
+        if state != sent:
+            yield format_event(state, event='progress')
+            sent = state
+            last_write = time.monotonic()
+        elif time.monotonic() - last_write >= heartbeat:
+            yield ': keep-alive\n\n'
+            last_write = time.monotonic()
+        time.sleep(poll_interval)
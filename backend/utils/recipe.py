@@ -0,0 +1,311 @@
+import os
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler, MinMaxScaler, MaxAbsScaler
+from utils.encoding import LabelMapping, CategoricalEncoder
+from utils.ingestion import fillna_preserving_categories, iter_file_chunks
+from utils.outlier_engine import FLAG_COLUMN, OUTLIER_MODES
+from utils.exporter import DatasetExporter
+from config.config import Config
+
+# Layout version of Recipe.to_dict()
+RECIPE_FORMAT = 1
+
+# Files the batch runner picks up from a directory
+RECIPE_INPUT_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+
+
+def scaler_params(scaler):
+    """(center, scale) of a fitted one-column sklearn scaler: it maps x to (x - center) / scale"""
+    if isinstance(scaler, StandardScaler):
+        return scaler.mean_[0], scaler.scale_[0]
+    if isinstance(scaler, MinMaxScaler):
+        return scaler.data_min_[0], 1 / scaler.scale_[0]
+    if isinstance(scaler, MaxAbsScaler):
+        return 0.0, scaler.scale_[0]
+    return scaler.center_[0], scaler.scale_[0]
+
+
+def _require(chunk, columns):
+    missing = [col for col in columns if col not in chunk.columns]
+    if missing:
+        raise ValueError(f"Columns {missing} required by the recipe are missing from the data")
+
+
+# Compilers: one operations_log entry -> recipe steps with the parameters fitted on the dataset
+
+def _compile_missing_values(entry):
+    fill, ffill = {}, []
+    for col, result in entry['results'].items():
+        if result.get('status') != 'filled':
+            continue
+        value = result.get('fill_value')
+        if value is None:
+            raise ValueError(f"Column {col} was imputed by {result.get('strategy')}, which has no fitted value to replay")
+        if entry['strategy'] not in ('mode', 'constant') and isinstance(value, str):
+            # Text columns were forward filled before the constant fill
+            ffill.append(col)
+        fill[col] = value
+    return [{'step': 'fill_missing', 'values': fill, 'ffill': ffill}] if fill else []
+
+
+def _compile_remove_nulls(entry):
+    return [{'step': 'drop_nulls', 'columns': entry.get('columns')}]
+
+
+def _compile_scale(entry):
+    params = {}
+    for col, result in entry['results'].items():
+        if result.get('status') != 'success':
+            continue
+        if 'center' not in result:
+            raise ValueError(f"Scaling of column {col} was logged without its fitted parameters")
+        params[col] = [result['center'], result['scale']]
+    return [{'step': 'scale', 'params': params}] if params else []
+
+
+def _compile_encode(entry):
+    method = entry['method']
+    encoded = {col: result for col, result in entry['results'].items() if result.get('status') == 'success'}
+    if not encoded:
+        return []
+    if method == 'label':
+        return [{'step': 'label', 'classes': {col: result['classes'] for col, result in encoded.items()}}]
+    if method == 'onehot':
+        return [{'step': 'onehot', 'columns': {col: result['new_columns'] for col, result in encoded.items()}}]
+    if method == 'hashing':
+        return [{'step': 'hashing', 'columns': list(encoded), 'n_buckets': entry['n_buckets']}]
+    return [{'step': 'binary', 'classes': {col: result['classes'] for col, result in encoded.items()}}]
+
+
+def _compile_outliers(entry):
+    bounds = {col: [result['lower_bound'], result['upper_bound']] for col, result in entry['results'].items()}
+    return [{'step': 'outliers', 'bounds': bounds, 'mode': entry['mode']}]
+
+
+def _compile_duplicates(entry):
+    result = entry['result']
+    if result['keep'] != 'first':
+        # Which copy survives depends on rows not read yet
+        raise ValueError("Only duplicate removal keeping the first copy can be replayed chunk by chunk")
+    return [{'step': 'drop_duplicates', 'subset': result['subset']}]
+
+
+COMPILERS = {
+    'handle_missing_values': _compile_missing_values,
+    'remove_nulls': _compile_remove_nulls,
+    'normalize_data': _compile_scale,
+    'scale_data': _compile_scale,
+    'encode_categorical': _compile_encode,
+    'remove_outliers': _compile_outliers,
+    'remove_duplicates': _compile_duplicates
+}
+
+
+# Steps: rewrite columns of one chunk. Rows are never removed by a step; they are
+# cleared from the alive mask and filtered once per chunk. state is the step's own
+# dict, kept across the chunks of one file.
+
+def _fill_missing(chunk, alive, step, state):
+    _require(chunk, step['values'])
+    for col, value in step['values'].items():
+        series = chunk[col]
+        if col in step['ffill']:
+            # Removed rows must not pass their values on
+            series = series.where(alive).ffill()
+            if col in state:
+                # Leading gaps continue the previous chunk's last value
+                series = fillna_preserving_categories(series, state[col])
+            last = series[alive].last_valid_index()
+            if last is not None:
+                state[col] = series[last]
+        chunk[col] = fillna_preserving_categories(series, value)
+    return chunk
+
+
+def _drop_nulls(chunk, alive, step, state):
+    columns = step['columns'] or list(chunk.columns)
+    _require(chunk, columns)
+    alive &= chunk[columns].notna().all(axis=1).to_numpy()
+    return chunk
+
+
+def _scale(chunk, alive, step, state):
+    _require(chunk, step['params'])
+    for col, (center, scale) in step['params'].items():
+        values = chunk[col].to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+        values -= center
+        values /= scale
+        chunk[col] = values
+    return chunk
+
+
+def _label(chunk, alive, step, state):
+    _require(chunk, step['classes'])
+    for col, classes in step['classes'].items():
+        chunk[col] = LabelMapping(classes).transform(chunk[col])
+    return chunk
+
+
+def _onehot(chunk, alive, step, state):
+    _require(chunk, step['columns'])
+    blocks = [CategoricalEncoder.onehot_transform(chunk[col], names) for col, names in step['columns'].items()]
+    return pd.concat([chunk.drop(columns=list(step['columns'])), *blocks], axis=1)
+
+
+def _hashing(chunk, alive, step, state):
+    _require(chunk, step['columns'])
+    blocks = [CategoricalEncoder.hashing(chunk[col], step['n_buckets'])[0] for col in step['columns']]
+    return pd.concat([chunk.drop(columns=step['columns']), *blocks], axis=1)
+
+
+def _binary(chunk, alive, step, state):
+    _require(chunk, step['classes'])
+    blocks = [CategoricalEncoder.binary_transform(chunk[col], LabelMapping(classes))
+              for col, classes in step['classes'].items()]
+    return pd.concat([chunk.drop(columns=list(step['classes'])), *blocks], axis=1)
+
+
+def _outliers(chunk, alive, step, state):
+    _require(chunk, step['bounds'])
+    mask = np.zeros(len(chunk), dtype=bool)
+    for col, (lower, upper) in step['bounds'].items():
+        values = chunk[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        # Missing bounds (empty or constant columns) flag nothing; NaN compares False
+        with np.errstate(invalid='ignore'):
+            if lower is not None:
+                mask |= values < lower
+            if upper is not None:
+                mask |= values > upper
+    if step['mode'] == 'flag':
+        chunk[FLAG_COLUMN] = mask
+    else:
+        alive &= ~mask
+    return chunk
+
+
+def _drop_duplicates(chunk, alive, step, state):
+    subset = step['subset'] or list(chunk.columns)
+    _require(chunk, subset)
+    rows = np.flatnonzero(alive)
+    hashes = _value_hashes(chunk.iloc[rows][subset])
+    seen = state.get('seen', np.empty(0, dtype=np.uint64))
+    # First copies within this chunk that no earlier chunk has seen
+    positions = np.minimum(np.searchsorted(seen, hashes), max(len(seen) - 1, 0))
+    repeated = (seen[positions] == hashes) if len(seen) else np.zeros(len(hashes), dtype=bool)
+    repeated |= pd.Series(hashes).duplicated().to_numpy()
+    alive[rows[repeated]] = False
+    state['seen'] = np.sort(np.concatenate([seen, hashes[~repeated]]), kind='mergesort')
+    return chunk
+
+
+def _value_hashes(frame):
+    """Row hashes from the values themselves, so equal rows match across chunks"""
+    frame = frame.copy(deep=False)
+    for col in frame.columns:
+        series = frame[col]
+        if isinstance(series.dtype, pd.SparseDtype):
+            series = series.sparse.to_dense()
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            # A column parsed as int in one chunk and float in another holds the same values
+            series = series.astype(np.float64)
+        frame[col] = series
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+STEPS = {
+    'fill_missing': _fill_missing,
+    'drop_nulls': _drop_nulls,
+    'scale': _scale,
+    'label': _label,
+    'onehot': _onehot,
+    'hashing': _hashing,
+    'binary': _binary,
+    'outliers': _outliers,
+    'drop_duplicates': _drop_duplicates
+}
+
+
+class Recipe:
+    """A dataset's operations_log compiled to replayable steps with fitted parameters.
+
+    Every step carries what the operation learned from the dataset (fill values,
+    scaling centers and scales, encoding classes, outlier bounds), so new data
+    is transformed exactly as the dataset was, never refitted. A chunk goes
+    through all steps in one pass: steps rewrite its columns, rows to drop are
+    collected in one mask and the chunk is filtered once at the end. State that
+    spans chunks (forward-fill carries, seen duplicates) is kept per file,
+    so a file gives the same rows whatever its chunk size.
+    """
+
+    def __init__(self, steps):
+        for step in steps:
+            if step.get('step') not in STEPS:
+                raise ValueError(f"Unknown recipe step: {step.get('step')}")
+        self.steps = steps
+
+    @staticmethod
+    def compile(operations_log):
+        """Recipe replaying the logged operations, in order"""
+        steps = []
+        for i, entry in enumerate(operations_log):
+            compiler = COMPILERS.get(entry.get('operation'))
+            if compiler is None:
+                raise ValueError(f"Operation {i + 1} ({entry.get('operation')}) cannot be replayed")
+            try:
+                steps.extend(compiler(entry))
+            except ValueError as e:
+                raise ValueError(f"Operation {i + 1} ({entry['operation']}) cannot be replayed: {str(e)}")
+        return Recipe(steps)
+
+    def to_dict(self):
+        return {'format': RECIPE_FORMAT, 'steps': self.steps}
+
+    @staticmethod
+    def from_dict(data):
+        """Recipe from to_dict() output, or from a whole recipe endpoint response"""
+        if isinstance(data, dict) and 'steps' not in data and isinstance(data.get('data'), dict):
+            data = data['data']
+        if not isinstance(data, dict) or not isinstance(data.get('steps'), list):
+            raise ValueError("A recipe must be an object with a list of steps")
+        if data.get('format', RECIPE_FORMAT) != RECIPE_FORMAT:
+            raise ValueError(f"Unsupported recipe format: {data.get('format')}")
+        if any(step.get('step') == 'outliers' and step.get('mode') not in OUTLIER_MODES for step in data['steps']):
+            raise ValueError(f"Invalid mode. Must be one of: {list(OUTLIER_MODES)}")
+        return Recipe(data['steps'])
+
+    def transform(self, chunk, state):
+        """Apply every step to one chunk; state carries what later chunks of the file depend on"""
+        chunk = chunk.copy(deep=False)
+        alive = np.ones(len(chunk), dtype=bool)
+        for i, step in enumerate(self.steps):
+            chunk = STEPS[step['step']](chunk, alive, step, state.setdefault(i, {}))
+        return chunk if alive.all() else chunk[alive]
+
+    def apply(self, chunks):
+        """Transform a stream of chunks of one file"""
+        state = {}
+        for chunk in chunks:
+            yield self.transform(chunk, state)
+
+    def apply_file(self, source, destination, fmt='csv', chunk_rows=None):
+        """Transform a CSV or Excel file chunk by chunk into destination; returns row counts"""
+        counts = {'rows_in': 0, 'rows_out': 0}
+
+        def counted(frames, key):
+            for frame in frames:
+                counts[key] += len(frame)
+                yield frame
+
+        chunks = counted(iter_file_chunks(source, source, chunk_rows or Config.INGEST_CHUNK_ROWS), 'rows_in')
+        chunks, _, _ = DatasetExporter.stream_frames(counted(self.apply(chunks), 'rows_out'), fmt)
+        partial = f'{destination}.partial'
+        try:
+            with open(partial, 'wb') as out:
+                for data in chunks:
+                    out.write(data)
+            os.replace(partial, destination)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        return counts
@@ -1,5 +1,5 @@
-from flask import jsonify
 from datetime import datetime
+from utils.serializer import json_response
 
 def standardize_response(success=True, data=None, message="", error=None, status_code=200):
     """Standardize all API responses"""
@@ -14,4 +14,4 @@ def standardize_response(success=True, data=None, message="", error=None, status
     else:
         response["error"] = error or message
         
-    return jsonify(response), status_code
+    return json_response(response, status_code)
@@ -0,0 +1,156 @@
+import threading
+import numpy as np
+import pandas as pd
+from config.config import Config
+
+DUPLICATE_KEEP = ('first', 'last', False)
+
+
+def _mix(values):
+    """splitmix64 finalizer: a bijection on uint64 that spreads nearby codes apart"""
+    with np.errstate(over='ignore'):
+        values = (values ^ (values >> np.uint64(30))) * np.uint64(0xbf58476d1ce4e5b9)
+        values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94d049bb133111eb)
+    return values ^ (values >> np.uint64(31))
+
+
+def _column_hashes(series, col):
+    """Per-row hashes of one column; equal exactly when DataFrame.duplicated sees equal values"""
+    # factorize is what DataFrame.duplicated compares rows by
+    codes, _ = pd.factorize(series)
+    salt = pd.util.hash_array(np.array([str(col)], dtype=object))[0]
+    return _mix(codes.astype(np.int64).view(np.uint64) ^ salt)
+
+
+def _sparse_column_hashes(series, col):
+    """_column_hashes of a sparse column as (fill hash, stored positions, stored hashes)"""
+    array = series.array
+    # The fill goes first, so equal stored values share its code
+    codes, _ = pd.factorize(np.concatenate([[array.fill_value], array.sp_values]))
+    salt = pd.util.hash_array(np.array([str(col)], dtype=object))[0]
+    hashes = _mix(codes.astype(np.int64).view(np.uint64) ^ salt)
+    return hashes[0], array.sp_index.indices, hashes[1:]
+
+
+class RowHashIndex:
+    """64-bit hash of every row, kept in step with a dataset's frame.
+
+    A row hash is the wrapping sum of per-column hashes, each a bijective mix of
+    the column's factorize code salted with the column name, so rows collide
+    only with probability ~rows**2 / 2**65. Removed rows are dropped from the
+    index by label, and a rewritten column only swaps its own contribution. Per-
+    column hashes are kept up to Config.ROW_INDEX_MAX_CELLS cells; past that a
+    rewritten column rebuilds the row hashes from all columns.
+    """
+
+    def __init__(self):
+        self._labels = None  # frame index the arrays below are aligned with
+        self._columns = {}  # col -> uint64 hashes
+        self._rows = None  # sum of the hashes of _row_columns
+        self._row_columns = ()
+        self._lock = threading.Lock()
+
+    def invalidate(self, columns):
+        """Columns were rewritten; their hashes are recomputed on next use"""
+        with self._lock:
+            for col in columns:
+                hashes = self._columns.pop(col, None)
+                if self._rows is None or col not in self._row_columns:
+                    continue
+                if hashes is None:
+                    self._rows = None
+                else:
+                    self._rows = self._rows - hashes
+                    self._row_columns = tuple(c for c in self._row_columns if c != col)
+
+    def copy(self):
+        """Independent index starting from this one's hashes, which are shared (they are never written in place)"""
+        index = RowHashIndex()
+        with self._lock:
+            index._labels = self._labels
+            index._columns = dict(self._columns)
+            index._rows = self._rows
+            index._row_columns = self._row_columns
+        return index
+
+    def clear(self):
+        """Forget every hash, e.g. after the frame was replaced by another version"""
+        with self._lock:
+            self._labels = None
+            self._columns = {}
+            self._rows = None
+            self._row_columns = ()
+
+    def row_hashes(self, df, subset=None):
+        """uint64 hash of every row of df, over all columns or the subset"""
+        with self._lock:
+            self._align(df)
+            for col in [col for col in self._columns if col not in df.columns]:
+                del self._columns[col]
+            if subset is not None:
+                return self._sum(df, list(subset))
+
+            columns = tuple(df.columns)
+            if self._rows is not None and set(self._row_columns) <= set(columns):
+                added = [col for col in columns if col not in set(self._row_columns)]
+                if added:
+                    self._rows = self._rows + self._sum(df, added)
+                    self._row_columns = self._row_columns + tuple(added)
+            else:
+                self._rows = self._sum(df, list(columns))
+                self._row_columns = columns
+            return self._rows
+
+    def duplicated(self, df, subset=None, keep='first'):
+        """Boolean mask of duplicate rows, like DataFrame.duplicated"""
+        if keep not in DUPLICATE_KEEP:
+            raise ValueError(f"Invalid keep. Must be one of: {list(DUPLICATE_KEEP)}")
+        hashes = self.row_hashes(df, subset)
+        return pd.Series(hashes, copy=False).duplicated(keep=keep).to_numpy()
+
+    def duplicate_count(self, df, subset=None):
+        """Number of rows equal to an earlier row"""
+        hashes = self.row_hashes(df, subset)
+        return len(hashes) - len(pd.unique(hashes))
+
+    def _sum(self, df, columns):
+        keep_columns = len(df) * len(df.columns) <= Config.ROW_INDEX_MAX_CELLS
+        total = np.zeros(len(df), dtype=np.uint64)
+        for col in columns:
+            hashes = self._columns.get(col)
+            if hashes is None and not keep_columns and isinstance(df[col].dtype, pd.SparseDtype):
+                # Only the stored values differ from the fill's hash
+                fill_hash, positions, stored_hashes = _sparse_column_hashes(df[col], col)
+                total += fill_hash
+                with np.errstate(over='ignore'):
+                    total[positions] += stored_hashes - fill_hash
+                continue
+            if hashes is None:
+                hashes = _column_hashes(df[col], col)
+                if keep_columns:
+                    self._columns[col] = hashes
+            total += hashes
+        return total
+
+    def _align(self, df):
+        """Follow row removals by label; anything else resets the index (lock held)"""
+        labels = df.index
+        if self._labels is labels:
+            return
+        if self._labels is not None and len(self._labels) == len(labels) and self._labels.equals(labels):
+            self._labels = labels
+            return
+        positions = None
+        if self._labels is not None and self._labels.is_unique and labels.is_unique:
+            positions = self._labels.get_indexer(labels)
+            if (positions < 0).any():
+                positions = None
+        if positions is None:
+            self._columns = {}
+            self._rows = None
+            self._row_columns = ()
+        else:
+            self._columns = {col: hashes[positions] for col, hashes in self._columns.items()}
+            if self._rows is not None:
+                self._rows = self._rows[positions]
+        self._labels = labels
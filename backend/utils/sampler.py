@@ -0,0 +1,145 @@
+import secrets
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from config.config import Config
+
+
+def new_seed():
+    """Random seed for a sampler that was not given one"""
+    return secrets.randbits(32)
+
+
+def _check_seed(seed):
+    if isinstance(seed, bool) or not isinstance(seed, (int, np.integer)) or seed < 0:
+        raise ValueError("Seed must be a non-negative integer")
+    return int(seed)
+
+
+class RowPermutation:
+    """Seeded random permutation of row positions 0..rows-1, drawn lazily.
+
+    Positions come from a Fisher-Yates shuffle run only as far as requested, in
+    chunks of Config.SAMPLE_CHUNK_ROWS; only swapped positions are remembered,
+    so drawing k positions costs O(k) time and memory whatever the row count.
+    Chunks are always drawn in order, so the permutation depends on the seed
+    and row count alone, not on which positions were asked for first.
+    """
+
+    def __init__(self, rows, seed):
+        self.rows = rows
+        self.chunk_size = Config.SAMPLE_CHUNK_ROWS
+        self._rng = np.random.default_rng(seed)
+        self._chunks = []
+        self._swaps = {}  # position -> row moved there by an earlier swap
+
+    @property
+    def drawn(self):
+        return min(len(self._chunks) * self.chunk_size, self.rows)
+
+    def positions(self, start, stop):
+        """Row positions at permutation indices start..stop-1"""
+        stop = min(stop, self.rows)
+        if start >= stop:
+            return np.empty(0, dtype=np.int64)
+        while self.drawn < stop:
+            self._draw_chunk()
+        first, last = start // self.chunk_size, (stop - 1) // self.chunk_size
+        drawn = np.concatenate(self._chunks[first:last + 1])
+        offset = first * self.chunk_size
+        return drawn[start - offset:stop - offset]
+
+    def _draw_chunk(self):
+        begin = self.drawn
+        end = min(begin + self.chunk_size, self.rows)
+        targets = self._rng.integers(np.arange(begin, end), self.rows)
+        swaps = self._swaps
+        chunk = []
+        for i, j in zip(range(begin, end), targets.tolist()):
+            # Position i is never read again, so its entry can go
+            current = swaps.pop(i, i)
+            if j == i:
+                chunk.append(current)
+            else:
+                chunk.append(swaps.get(j, j))
+                swaps[j] = current
+        self._chunks.append(np.array(chunk, dtype=np.int64))
+
+
+class RowSampler:
+    """Reproducible random samples of a dataset's rows.
+
+    Random pages are consecutive slices of one RowPermutation, so page N of a
+    seed always shows the same rows and pages never overlap. Permutations
+    depend only on the seed and row count; they are kept per (seed, rows) and
+    stay valid across versions that only rewrite columns. Without an explicit
+    seed the sampler's own seed is used, which stays fixed for the dataset.
+    """
+
+    def __init__(self, seed=None):
+        self.seed = new_seed() if seed is None else _check_seed(seed)
+        self._permutations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def page(self, df, page=1, per_page=10, seed=None):
+        """Rows of the given 1-based page of the random order of df"""
+        seed = self.seed if seed is None else _check_seed(seed)
+        start = (max(1, page) - 1) * per_page
+        with self._lock:
+            positions = self._permutation(len(df), seed).positions(start, start + per_page)
+        return df.iloc[positions]
+
+    def stratified(self, df, n, column, seed=None):
+        """Random sample of n rows with each value of column in proportion to its count.
+
+        Returns the sample (in frame order) and the number of rows drawn per value.
+        Allocations are rounded by largest remainder; missing values are a stratum
+        of their own. Each stratum is drawn from its own permutation, so the cost
+        is one factorize of the column plus O(n).
+        """
+        seed = self.seed if seed is None else _check_seed(seed)
+        if column not in df.columns:
+            raise ValueError(f"Invalid columns: {[column]}")
+        rows = len(df)
+        n = min(max(0, n), rows)
+        if n == 0:
+            return df.iloc[:0], {}
+
+        try:
+            codes, uniques = pd.factorize(df[column], sort=True, use_na_sentinel=False)
+        except TypeError:
+            # Mixed types that cannot be ordered
+            codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+        counts = np.bincount(codes, minlength=len(uniques))
+
+        quotas = counts * n / rows
+        allocation = np.floor(quotas).astype(np.int64)
+        remainder = n - int(allocation.sum())
+        if remainder:
+            allocation[np.argsort(allocation - quotas, kind='stable')[:remainder]] += 1
+
+        members = np.argsort(codes, kind='stable')
+        bounds = np.concatenate([[0], np.cumsum(counts)])
+        picked = []
+        strata = {}
+        for stratum in np.flatnonzero(allocation):
+            stratum_rows = members[bounds[stratum]:bounds[stratum + 1]]
+            permutation = RowPermutation(len(stratum_rows), [seed, int(stratum)])
+            picked.append(stratum_rows[permutation.positions(0, int(allocation[stratum]))])
+            strata[str(uniques[stratum])] = int(allocation[stratum])
+
+        return df.iloc[np.sort(np.concatenate(picked))], strata
+
+    def _permutation(self, rows, seed):
+        """Cached permutation of rows positions for seed (lock held)"""
+        key = (seed, rows)
+        permutation = self._permutations.get(key)
+        if permutation is None:
+            permutation = RowPermutation(rows, seed)
+            self._permutations[key] = permutation
+            while len(self._permutations) > Config.SAMPLE_CACHED_PERMUTATIONS:
+                self._permutations.popitem(last=False)
+        else:
+            self._permutations.move_to_end(key)
+        return permutation
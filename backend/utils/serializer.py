@@ -0,0 +1,93 @@
+import json
+import math
+import uuid
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+from flask import Response
+
+# Payload shapes of DataFrame slices
+FRAME_SHAPES = ('records', 'columns')
+
+# Decimal places of floats encoded by pandas' JSON writer (its maximum)
+FRAME_DOUBLE_PRECISION = 15
+
+
+class RawJSON:
+    """Already encoded JSON that dumps() embeds verbatim"""
+
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+
+def frame_json(df, shape='records'):
+    """Encode a DataFrame slice with pandas' C JSON writer.
+
+    Missing values become null, NumPy scalars and timestamps (ISO 8601) are
+    written natively, and no per-row Python objects are created. 'records' is
+    a list of {column: value} objects; 'columns' lists the column names once
+    and the rows as arrays: {"columns": [...], "data": [[...], ...]}.
+    """
+    if shape not in FRAME_SHAPES:
+        raise ValueError(f"Invalid shape. Must be one of: {list(FRAME_SHAPES)}")
+    orient = 'records' if shape == 'records' else 'values'
+    data = df.to_json(orient=orient, date_format='iso', double_precision=FRAME_DOUBLE_PRECISION,
+                      default_handler=str)
+    if shape == 'records':
+        return RawJSON(data)
+    columns = json.dumps([str(col) for col in df.columns])
+    return RawJSON(f'{{"columns":{columns},"data":{data}}}')
+
+
+def _finite(obj):
+    """Copy of obj with NaN and infinite floats replaced by None"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(item) for item in obj]
+    return obj
+
+
+def dumps(obj):
+    """Encode a response payload to JSON text.
+
+    The payload is encoded by the C encoder; NumPy values are converted as they
+    are reached and RawJSON fragments are spliced in afterwards. NaN and
+    infinity become null, which the stdlib would otherwise write as invalid
+    JSON; only payloads that contain them take a second, sanitizing pass.
+    """
+    fragments = []
+    token = uuid.uuid4().hex
+
+    def default(value):
+        if isinstance(value, RawJSON):
+            fragments.append(value.text)
+            return f'\x00{token}:{len(fragments) - 1}\x00'
+        if isinstance(value, np.generic):
+            return value.item()
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        if value is pd.NaT or value is pd.NA:
+            return None
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        return str(value)
+
+    try:
+        text = json.dumps(obj, default=default, allow_nan=False)
+    except ValueError:
+        fragments.clear()
+        text = json.dumps(_finite(obj), default=lambda value: _finite(default(value)), allow_nan=False)
+
+    for i, fragment in enumerate(fragments):
+        text = text.replace(f'"\\u0000{token}:{i}\\u0000"', fragment, 1)
+    return text
+
+
+def json_response(payload, status_code=200):
+    """Flask response carrying the payload encoded by dumps()"""
+    return Response(dumps(payload), status=status_code, mimetype='application/json')
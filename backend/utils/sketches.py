@@ -0,0 +1,322 @@
+import numpy as np
+import pandas as pd
+from config.config import Config
+
+
+def _bit_length(values):
+    """Number of significant bits of each uint64"""
+    values = values.copy()
+    lengths = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        wide = values >= (np.uint64(1) << np.uint64(shift))
+        lengths[wide] += shift
+        values[wide] >>= np.uint64(shift)
+    return lengths + (values > 0)
+
+
+class KLLSketch:
+    """Mergeable quantile sketch (KLL).
+
+    Items live in levels; an item on level h stands for 2**h inputs. A level
+    over its capacity is sorted and every other item (random offset) moves up,
+    so memory stays around 3k items for any number of inputs. A rank query is
+    off by at most about rank_error() * count with 99% confidence.
+    """
+
+    def __init__(self, k=None, seed=None):
+        self.k = k or Config.SKETCH_QUANTILE_K
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def rank_error(self):
+        """Normalized rank error of a single quantile (empirical KLL bound)"""
+        return 2.296 / self.k ** 0.9723
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.count += len(values)
+        self._compress()
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+
+    def quantiles(self, quantiles):
+        """Approximate values at the given quantiles; NaN when empty"""
+        if self.count == 0:
+            return [float('nan')] * len(quantiles)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2 ** level) for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items = items[order]
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(quantiles) * cumulative[-1], side='left')
+        return [float(items[min(position, len(items) - 1)]) for position in positions]
+
+    def _capacity(self, level):
+        # Lower levels get geometrically smaller capacities
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (len(self.levels) - level - 1))))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item stays behind so the promoted half carries the full weight
+                leftover = len(items) % 2
+                promoted = items[leftover + self._rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = items[:leftover]
+            level += 1
+
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch over 64-bit hashes.
+
+    The estimate has a relative standard error of 1.04 / sqrt(2**precision).
+    """
+
+    def __init__(self, precision=None):
+        self.precision = precision or Config.SKETCH_HLL_PRECISION
+        self.registers = np.zeros(2 ** self.precision, dtype=np.uint8)
+
+    def relative_error(self):
+        return 1.04 / np.sqrt(len(self.registers))
+
+    def update(self, hashes):
+        """Add uint64 hashes of the values"""
+        if len(hashes) == 0:
+            return
+        precision = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - precision)).astype(np.int64)
+        remainder = hashes << precision
+        # Position of the first set bit after the index bits
+        rank = np.minimum(65 - _bit_length(remainder), 65 - self.precision)
+        # Sorted keys put the highest rank of every register last, which wins the assignment
+        keys = np.unique(index * 128 + rank)
+        index, rank = keys // 128, (keys % 128).astype(np.uint8)
+        self.registers[index] = np.maximum(self.registers[index], rank)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and empty:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * np.log(m / empty)
+        return float(estimate)
+
+
+class MisraGries:
+    """Mergeable heavy-hitters sketch.
+
+    Keeps at most `capacity` counters. A reported count is never above the
+    true count and at most `error` below it, where error <= total / (capacity + 1).
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity or Config.SKETCH_HEAVY_HITTERS
+        self.counters = pd.Series(dtype=np.int64)
+        self.total = 0
+        self.error = 0
+
+    def update(self, value_counts):
+        """Add exact counts of a batch, e.g. a chunk's value_counts()"""
+        self.total += int(value_counts.sum())
+        self._absorb(value_counts)
+
+    def merge(self, other):
+        self.total += other.total
+        self.error += other.error
+        self._absorb(other.counters)
+
+    def top(self, n):
+        return self.counters.sort_values(ascending=False, kind='stable').head(n)
+
+    def _absorb(self, counts):
+        counters = self.counters.add(counts.astype(np.int64), fill_value=0).astype(np.int64)
+        if len(counters) > self.capacity:
+            # Subtracting the (capacity + 1)-th largest count leaves at most capacity counters
+            threshold = int(counters.nlargest(self.capacity + 1).iloc[-1])
+            counters = counters - threshold
+            counters = counters[counters > 0]
+            self.error += threshold
+        self.counters = counters
+
+
+class ColumnSketch:
+    """Sketches of one column; kind is 'numerical', 'categorical' or None (no statistics)"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.rows = 0
+        self.missing = 0
+        # Chunks disagreed on the column's kind, so its statistics cannot be trusted
+        self.conflict = False
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float('nan')
+        self.max = float('nan')
+        self.quantiles = KLLSketch() if kind == 'numerical' else None
+        self.distinct = HyperLogLog() if kind == 'categorical' else None
+        self.top_values = MisraGries() if kind == 'categorical' else None
+
+    @staticmethod
+    def from_series(series, kind):
+        sketch = ColumnSketch(kind)
+        sketch.rows = len(series)
+        present = series.dropna()
+        sketch.missing = len(series) - len(present)
+        if kind == 'numerical':
+            values = present.to_numpy(dtype=np.float64)
+            sketch.count = len(values)
+            if sketch.count:
+                sketch.mean = float(values.mean())
+                sketch.m2 = float(((values - sketch.mean) ** 2).sum())
+                sketch.min = float(values.min())
+                sketch.max = float(values.max())
+                sketch.quantiles.update(values)
+        elif kind == 'categorical':
+            sketch.count = len(present)
+            value_counts = present.value_counts()
+            value_counts = value_counts[value_counts > 0]
+            # Only the distinct values need hashing
+            sketch.distinct.update(pd.util.hash_pandas_object(value_counts.index).to_numpy())
+            sketch.top_values.update(value_counts)
+        return sketch
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.missing += other.missing
+        self.conflict = self.conflict or other.conflict
+        # A chunk without values (e.g. all missing, parsed as float) does not decide the kind
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self._adopt(other)
+            return
+        if self.kind != other.kind:
+            self.conflict = True
+            return
+        if self.kind == 'numerical':
+            self._merge_moments(other)
+            self.quantiles.merge(other.quantiles)
+        elif self.kind == 'categorical':
+            self.count += other.count
+            self.distinct.merge(other.distinct)
+            self.top_values.merge(other.top_values)
+
+    def _adopt(self, other):
+        for name in ('kind', 'count', 'mean', 'm2', 'min', 'max', 'quantiles', 'distinct', 'top_values'):
+            setattr(self, name, getattr(other, name))
+
+    def _merge_moments(self, other):
+        """Combine counts, means and squared deviations (Chan et al.)"""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def numerical_stats(self, quantiles):
+        """Summary statistics in SummaryEngine's format; None without values"""
+        if self.count == 0:
+            return None
+        q25, q50, q75 = self.quantiles.quantiles(quantiles)
+        return {
+            'count': int(self.count),
+            'mean': self.mean,
+            'std': float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else float('nan'),
+            'min': self.min,
+            # Sketch quantiles may not be monotone with the exact extremes
+            '25%': min(max(q25, self.min), self.max),
+            '50%': min(max(q50, self.min), self.max),
+            '75%': min(max(q75, self.min), self.max),
+            'max': self.max
+        }
+
+    def categorical_stats(self, limit):
+        """Cardinality and top values in SummaryEngine's format; None without values"""
+        if self.count == 0:
+            return None
+        top = self.top_values.top(limit)
+        unique = int(round(self.distinct.estimate()))
+        return {
+            'unique_count': min(max(unique, len(top)), int(self.count)),
+            'top_values': {str(k): int(v) for k, v in top.items()}
+        }
+
+
+class DatasetSketch:
+    """Column sketches of a whole dataset, built chunk by chunk during ingestion.
+
+    Each chunk is sketched on its own and merged in, so the sketches never hold
+    more than one chunk of raw values. Every sketch is mergeable and bounded in
+    size, which makes summaries from them independent of the row count.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = {}
+
+    def update(self, chunk):
+        self.merge(DatasetSketch.from_frame(chunk))
+
+    @staticmethod
+    def from_frame(df):
+        sketch = DatasetSketch()
+        sketch.rows = len(df)
+        numerical = set(df.select_dtypes(include=[np.number]).columns)
+        categorical = set(df.select_dtypes(include=['object', 'category']).columns)
+        for col in df.columns:
+            kind = 'numerical' if col in numerical else 'categorical' if col in categorical else None
+            sketch.columns[col] = ColumnSketch.from_series(df[col], kind)
+        return sketch
+
+    def merge(self, other):
+        self.rows += other.rows
+        for col, column_sketch in other.columns.items():
+            if col in self.columns:
+                self.columns[col].merge(column_sketch)
+            else:
+                self.columns[col] = column_sketch
+
+    def usable_columns(self, df):
+        """{col: sketch} for columns of df the sketches still describe"""
+        if self.rows != len(df):
+            return {}
+        numerical = set(df.select_dtypes(include=[np.number]).columns)
+        categorical = set(df.select_dtypes(include=['object', 'category']).columns)
+        usable = {}
+        for col, column_sketch in self.columns.items():
+            if col not in df.columns or column_sketch.conflict or column_sketch.kind is None:
+                continue
+            kind = 'numerical' if col in numerical else 'categorical' if col in categorical else None
+            if kind == column_sketch.kind:
+                usable[col] = column_sketch
+        return usable
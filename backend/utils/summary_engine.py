@@ -0,0 +1,378 @@
+import numpy as np
+import pandas as pd
+from config.config import Config
+from utils.row_index import RowHashIndex
+
+# Quantiles reported for every numerical column
+SUMMARY_QUANTILES = (0.25, 0.50, 0.75)
+
+# Number of most frequent values reported for categorical columns
+TOP_VALUES_LIMIT = 10
+
+# Upper bound on cells per numeric batch so a wide block stays bounded in memory
+MAX_BATCH_CELLS = 8_000_000
+
+
+class SummaryEngine:
+    """Vectorized statistics behind the dataset summary responses.
+
+    Numerical statistics are computed column-batched with NumPy: one multi-point
+    partition of the numeric block yields min, max and every quantile, and the
+    moments come from axis reductions over the same block. Categorical statistics
+    come from a single value_counts per column, which also gives the cardinality.
+    """
+
+    @staticmethod
+    def compute_summary(df):
+        """Build the comprehensive summary dictionary for a DataFrame"""
+        missing_counts = df.isnull().sum()
+
+        summary = {
+            'shape': df.shape,
+            'columns': df.columns.tolist(),
+            'dtypes': {col: str(dtype) for col, dtype in df.dtypes.items()},
+            'missing_values': {col: int(count) for col, count in missing_counts.items()},
+            'memory_usage': f"{df.memory_usage(deep=True).sum() / 1024:.2f} KB",
+            'duplicate_rows': int(df.duplicated().sum())
+        }
+
+        numerical_cols = df.select_dtypes(include=[np.number]).columns
+        if len(numerical_cols) > 0:
+            summary['numerical_stats'] = SummaryEngine.numerical_stats(df, numerical_cols)
+
+        categorical_cols = df.select_dtypes(include=['object', 'category']).columns
+        if len(categorical_cols) > 0:
+            summary['categorical_stats'] = SummaryEngine.categorical_stats(df, categorical_cols)
+
+        return summary
+
+    @staticmethod
+    def numerical_stats(df, columns):
+        """Compute count, moments, extremes and quartiles for numerical columns"""
+        columns = list(columns)
+        stats = {}
+        if not columns or len(df) == 0:
+            return stats
+
+        # Sparse columns (e.g. one-hot indicators) are summarized from their stored values
+        sparse = [col for col in columns if isinstance(df[col].dtype, pd.SparseDtype)]
+        for col in sparse:
+            col_stats = SummaryEngine._sparse_stats(df[col])
+            if col_stats is not None:
+                stats[col] = col_stats
+        dense = [col for col in columns if col not in set(sparse)]
+
+        batch_size = max(1, MAX_BATCH_CELLS // len(df))
+        for start in range(0, len(dense), batch_size):
+            batch = dense[start:start + batch_size]
+            block = df[batch].to_numpy(dtype=np.float64, na_value=np.nan)
+            stats.update(SummaryEngine._block_stats(block, batch))
+
+        # Preserve the column order of the request
+        return {col: stats[col] for col in columns if col in stats}
+
+    @staticmethod
+    def _block_stats(block, columns):
+        """Statistics for a 2-D float block, one column of the block per name"""
+        nan_mask = np.isnan(block)
+        counts = block.shape[0] - nan_mask.sum(axis=0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.nansum(block, axis=0) / counts
+            squared_dev = np.nansum((block - means) ** 2, axis=0)
+            stds = np.where(counts > 1, squared_dev / (counts - 1), np.nan) ** 0.5
+
+        # Order statistics: missing cells become +inf so the first `count` rows of a
+        # partitioned column are its values. Columns sharing a non-null count share
+        # the same partition points and are partitioned together.
+        filled = np.where(nan_mask, np.inf, block)
+        order_stats = np.full((2 + len(SUMMARY_QUANTILES), block.shape[1]), np.nan)
+        for count in np.unique(counts):
+            if count == 0:
+                continue
+            group = np.flatnonzero(counts == count)
+            positions = [q * (count - 1) for q in SUMMARY_QUANTILES]
+            kth = {0, int(count) - 1}
+            for position in positions:
+                kth.update({int(np.floor(position)), min(int(np.floor(position)) + 1, int(count) - 1)})
+            parted = np.partition(filled[:, group], sorted(kth), axis=0)
+
+            order_stats[0, group] = parted[0]
+            order_stats[1, group] = parted[count - 1]
+            for i, position in enumerate(positions):
+                lower = int(np.floor(position))
+                upper = min(lower + 1, int(count) - 1)
+                fraction = position - lower
+                low_values = parted[lower]
+                order_stats[2 + i, group] = low_values + (parted[upper] - low_values) * fraction
+
+        stats = {}
+        for j, col in enumerate(columns):
+            if counts[j] == 0:
+                continue
+            stats[col] = {
+                'count': int(counts[j]),
+                'mean': float(means[j]),
+                'std': float(stds[j]),
+                'min': float(order_stats[0, j]),
+                '25%': float(order_stats[2, j]),
+                '50%': float(order_stats[3, j]),
+                '75%': float(order_stats[4, j]),
+                'max': float(order_stats[1, j])
+            }
+        return stats
+
+    @staticmethod
+    def sparse_values(series):
+        """(sorted non-missing stored values, fill value, non-missing fill count) of a sparse column"""
+        array = series.array
+        stored = np.asarray(array.sp_values, dtype=np.float64)
+        values = np.sort(stored[~np.isnan(stored)])
+        fill = float(array.fill_value)
+        fill_count = 0 if np.isnan(fill) else len(array) - len(stored)
+        return values, fill, fill_count
+
+    @staticmethod
+    def _sparse_stats(series):
+        """_block_stats of one sparse column in O(stored values); None without values"""
+        values, fill, fill_count = SummaryEngine.sparse_values(series)
+        count = len(values) + fill_count
+        if count == 0:
+            return None
+        mean = (values.sum() + fill * fill_count) / count
+        squared_dev = ((values - mean) ** 2).sum() + fill_count * (fill - mean) ** 2
+        below = np.searchsorted(values, fill) if fill_count else len(values)
+
+        def order_stat(k):
+            # Sorted column: stored values below the fill, the fills, the rest
+            if k < below:
+                return values[k]
+            if k < below + fill_count:
+                return fill
+            return values[k - fill_count]
+
+        quartiles = []
+        for q in SUMMARY_QUANTILES:
+            position = q * (count - 1)
+            lower = int(np.floor(position))
+            upper = min(lower + 1, count - 1)
+            low_value = order_stat(lower)
+            quartiles.append(low_value + (order_stat(upper) - low_value) * (position - lower))
+
+        return {
+            'count': int(count),
+            'mean': float(mean),
+            'std': float(np.sqrt(squared_dev / (count - 1))) if count > 1 else float('nan'),
+            'min': float(order_stat(0)),
+            '25%': float(quartiles[0]),
+            '50%': float(quartiles[1]),
+            '75%': float(quartiles[2]),
+            'max': float(order_stat(count - 1))
+        }
+
+    @staticmethod
+    def categorical_stats(df, columns):
+        """Compute cardinality and most frequent values for categorical columns"""
+        stats = {}
+        for col in columns:
+            # One hashing pass per column gives both the cardinality and the top values
+            value_counts = df[col].value_counts()
+            value_counts = value_counts[value_counts > 0]
+            if value_counts.empty:
+                continue
+            stats[col] = {
+                'unique_count': int(len(value_counts)),
+                'top_values': {str(k): int(v) for k, v in value_counts.head(TOP_VALUES_LIMIT).items()}
+            }
+        return stats
+
+
+class SummaryCache:
+    """Per-column summary pieces reused across operations.
+
+    Every column carries a version counter. Operations invalidate the columns they
+    rewrote, and build() recomputes only stale columns before assembling the same
+    summary dictionary as SummaryEngine.compute_summary.
+
+    Sketches attached at ingestion stand in for the exact pieces of large
+    datasets until a column is rewritten; such summaries list the approximated
+    columns and the error bounds under 'approximate'.
+    """
+
+    def __init__(self):
+        self.column_versions = {}
+        self._pieces = {}
+        self._row_count = None
+        self._duplicate_rows = None
+        self._sketches = {}  # col -> (ColumnSketch, memory bytes) of columns not rewritten since ingestion
+        # Row hashes behind duplicate counts and duplicate removal
+        self.row_index = RowHashIndex()
+
+    def invalidate(self, columns, preserves_duplicates=False):
+        """Mark columns as rewritten.
+
+        preserves_duplicates is for element-wise injective transforms (scaling,
+        encoding), which cannot create or break duplicate rows.
+        """
+        self._forget(columns)
+        self.row_index.invalidate(columns)
+        if not preserves_duplicates:
+            self._duplicate_rows = None
+
+    def invalidate_rows(self):
+        """Rows were removed without changing the values of the rows that remain"""
+        self._forget(list(self._pieces))
+        self._sketches = {}
+        self._duplicate_rows = None
+        self._row_count = None
+
+    def invalidate_all(self):
+        """Mark every column as rewritten, e.g. after the frame was replaced by another version"""
+        self.invalidate_rows()
+        self.row_index.clear()
+
+    def _forget(self, columns):
+        for col in columns:
+            self.column_versions[col] = self.column_versions.get(col, 0) + 1
+            self._pieces.pop(col, None)
+            self._sketches.pop(col, None)
+
+    def copy(self):
+        """Independent cache starting from this one's pieces, e.g. for another dataset over the same frame"""
+        cache = SummaryCache()
+        cache.column_versions = dict(self.column_versions)
+        cache._pieces = dict(self._pieces)
+        cache._row_count = self._row_count
+        cache._duplicate_rows = self._duplicate_rows
+        cache._sketches = dict(self._sketches)
+        cache.row_index = self.row_index.copy()
+        return cache
+
+    def attach_sketches(self, sketch, df):
+        """Use a DatasetSketch of df for approximate summaries of its columns"""
+        usable = sketch.usable_columns(df)
+        memory = df[list(usable)].memory_usage(deep=True, index=False)
+        self._sketches = {col: (column_sketch, int(memory[col])) for col, column_sketch in usable.items()}
+        self._row_count = len(df)
+
+    def build(self, df, exact=None):
+        """Assemble the comprehensive summary, recomputing only stale columns.
+
+        exact=None approximates from sketches once the dataset has
+        Config.APPROXIMATE_SUMMARY_MIN_ROWS rows, exact=False whenever sketches
+        are available and exact=True never.
+        """
+        if self._row_count != len(df):
+            self.invalidate_rows()
+            self._row_count = len(df)
+
+        current = set(df.columns)
+        for col in [col for col in self._pieces if col not in current]:
+            del self._pieces[col]
+
+        stale = [col for col in df.columns
+                 if col not in self._pieces or self._pieces[col][0] != self.column_versions.get(col, 0)]
+        if exact is None:
+            exact = len(df) < Config.APPROXIMATE_SUMMARY_MIN_ROWS
+        approximated = [col for col in stale if col in self._sketches] if not exact else []
+        if approximated:
+            sketched = set(approximated)
+            stale = [col for col in stale if col not in sketched]
+        if stale:
+            self._refresh(df, stale)
+
+        if self._duplicate_rows is None:
+            self._duplicate_rows = int(self.row_index.duplicate_count(df))
+
+        sketch_pieces = {col: self._sketch_piece(df, col) for col in approximated}
+        pieces = [sketch_pieces[col] if col in sketch_pieces else self._pieces[col][1] for col in df.columns]
+        memory_bytes = df.index.memory_usage(deep=True) + sum(piece['memory'] for piece in pieces)
+
+        summary = {
+            'shape': df.shape,
+            'columns': df.columns.tolist(),
+            'dtypes': {col: piece['dtype'] for col, piece in zip(df.columns, pieces)},
+            'missing_values': {col: piece['missing'] for col, piece in zip(df.columns, pieces)},
+            'memory_usage': f"{memory_bytes / 1024:.2f} KB",
+            'duplicate_rows': self._duplicate_rows
+        }
+
+        numerical_stats = {col: piece['stats'] for col, piece in zip(df.columns, pieces)
+                           if piece['kind'] == 'numerical' and piece['stats'] is not None}
+        if any(piece['kind'] == 'numerical' for piece in pieces):
+            summary['numerical_stats'] = numerical_stats
+
+        categorical_stats = {col: piece['stats'] for col, piece in zip(df.columns, pieces)
+                             if piece['kind'] == 'categorical' and piece['stats'] is not None}
+        if any(piece['kind'] == 'categorical' for piece in pieces):
+            summary['categorical_stats'] = categorical_stats
+
+        if approximated:
+            summary['approximate'] = self._error_bounds(approximated)
+
+        return summary
+
+    def _sketch_piece(self, df, col):
+        """Summary piece of a column computed from its ingestion sketch"""
+        column_sketch, memory = self._sketches[col]
+        if column_sketch.kind == 'numerical':
+            stats = column_sketch.numerical_stats(SUMMARY_QUANTILES)
+        else:
+            stats = column_sketch.categorical_stats(TOP_VALUES_LIMIT)
+        return {
+            'dtype': str(df[col].dtype),
+            'missing': int(column_sketch.missing),
+            'memory': memory,
+            'kind': column_sketch.kind,
+            'stats': stats
+        }
+
+    def _error_bounds(self, columns):
+        """Which columns were approximated and how far off their statistics may be"""
+        sketches = [self._sketches[col][0] for col in columns]
+        numerical = [sketch for sketch in sketches if sketch.kind == 'numerical']
+        categorical = [sketch for sketch in sketches if sketch.kind == 'categorical']
+        bounds = {
+            'columns': list(columns),
+            'exact': ['count', 'mean', 'std', 'min', 'max', 'missing_values', 'duplicate_rows']
+        }
+        if numerical:
+            # Fraction of rows by which a reported quartile's rank may be off (99% confidence)
+            bounds['quantile_rank_error'] = round(numerical[0].quantiles.rank_error(), 4)
+        if categorical:
+            # Relative standard error of unique_count
+            bounds['unique_count_relative_error'] = round(categorical[0].distinct.relative_error(), 4)
+            # Reported top-value counts are at most this much below the true counts
+            bounds['top_values_max_undercount'] = {
+                col: int(sketch.top_values.error) for col, sketch in zip(columns, sketches)
+                if sketch.kind == 'categorical'
+            }
+        return bounds
+
+    def _refresh(self, df, columns):
+        """Recompute the pieces of the given columns in one batched pass"""
+        subset = df[columns]
+        missing_counts = subset.isnull().sum()
+        memory = subset.memory_usage(deep=True, index=False)
+
+        numerical_cols = subset.select_dtypes(include=[np.number]).columns
+        categorical_cols = subset.select_dtypes(include=['object', 'category']).columns
+        numerical_stats = SummaryEngine.numerical_stats(subset, numerical_cols)
+        categorical_stats = SummaryEngine.categorical_stats(subset, categorical_cols)
+        numerical_set = set(numerical_cols)
+        categorical_set = set(categorical_cols)
+
+        for col in columns:
+            if col in numerical_set:
+                kind, stats = 'numerical', numerical_stats.get(col)
+            elif col in categorical_set:
+                kind, stats = 'categorical', categorical_stats.get(col)
+            else:
+                kind, stats = None, None
+            self._pieces[col] = (self.column_versions.get(col, 0), {
+                'dtype': str(subset[col].dtype),
+                'missing': int(missing_counts[col]),
+                'memory': int(memory[col]),
+                'kind': kind,
+                'stats': stats
+            })